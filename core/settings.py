@@ -338,8 +338,148 @@ if EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend':
     else:
         print("⚠️ Email backend is SMTP but EMAIL_HOST_USER or PASSWORD are empty")
 
+# Gunicorn kills a worker after GUNICORN_TIMEOUT seconds; the Procfile passes
+# it as --timeout and is the only place the web worker timeout is set. Every
+# wait inside a request below is derived from it, so it ends with its own
+# error path (503, replay, fallback) before the worker is killed.
+GUNICORN_TIMEOUT = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# PDF output cache (content-addressed by HTML + template CSS, LRU-evicted by size)
+PDF_CACHE = {
+    'BACKEND': os.getenv('PDF_CACHE_BACKEND', 'resume.pdf_cache.LocalPDFCacheStorage'),
+    'LOCATION': os.getenv('PDF_CACHE_DIR', str(BASE_DIR / 'pdf_cache')),
+    'MAX_SIZE': int(os.getenv('PDF_CACHE_MAX_SIZE', str(256 * 1024 * 1024))),  # bytes
+    # Seconds between full listings of the cache to pick up other processes' writes
+    'RESCAN_INTERVAL': float(os.getenv('PDF_CACHE_RESCAN_INTERVAL', '60')),
+}
+
+# Out-of-process PDF rendering pool (per web worker). WORKERS=0 renders inline.
+PDF_RENDER_POOL = {
+    'WORKERS': int(os.getenv('PDF_RENDER_WORKERS', '2')),
+    'TIMEOUT': float(os.getenv('PDF_RENDER_TIMEOUT', str(GUNICORN_TIMEOUT * 0.5))),  # seconds per render
+    'MAX_QUEUE': int(os.getenv('PDF_RENDER_MAX_QUEUE', '8')),  # renders waiting for a worker
+}
+
+# Background PDF render jobs (POST to a download URL). Only enable when a
+# `python manage.py run_pdf_worker` process shares the PDF cache storage with
+# the web service; otherwise the POST renders the job inside the request.
+PDF_JOB_QUEUE_ENABLED = os.getenv('PDF_JOB_QUEUE_ENABLED', 'False') == 'True'
+
+# Parallel renders per bulk ZIP export request
+PDF_EXPORT_CONCURRENCY = int(os.getenv('PDF_EXPORT_CONCURRENCY', '2'))
+
+# Render a resume/cover letter PDF in the background as soon as it is saved
+PDF_PRERENDER_ON_SAVE = os.getenv('PDF_PRERENDER_ON_SAVE', 'False') == 'True'
+PDF_PRERENDER_THREADS = int(os.getenv('PDF_PRERENDER_THREADS', '1'))
+
+# Fit-to-pages downloads (?fit_pages=N): largest N accepted, and how long the
+# winning scale factor per document is remembered in the default cache
+PDF_FIT_MAX_PAGES = int(os.getenv('PDF_FIT_MAX_PAGES', '5'))
+PDF_FIT_SCALE_CACHE_TIMEOUT = int(os.getenv('PDF_FIT_SCALE_CACHE_TIMEOUT', str(30 * 24 * 3600)))  # seconds
+
 # OpenAI API Key (set in environment variables)
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+# OpenAI-compatible endpoint to call instead of api.openai.com, e.g. the local
+# stub from `python manage.py run_llm_stub` (http://127.0.0.1:8001/v1)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+
+# Shared OpenAI HTTP connection pool (per process) and timeouts in seconds
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))
+OPENAI_READ_TIMEOUT = float(os.getenv('OPENAI_READ_TIMEOUT', str(GUNICORN_TIMEOUT * 0.5)))
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '10'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '5'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+
+# OpenAI resilience. All attempts of one API call must finish within
+# OPENAI_REQUEST_DEADLINE (80% of GUNICORN_TIMEOUT), leaving time to save and respond.
+# Transient errors are retried with jittered backoff; OPENAI_BREAKER_FAILURE_THRESHOLD
+# consecutive failures open the circuit breaker for OPENAI_BREAKER_RESET_TIMEOUT
+# seconds, during which generations use the non-AI fallback.
+OPENAI_REQUEST_DEADLINE = float(os.getenv('OPENAI_REQUEST_DEADLINE', str(GUNICORN_TIMEOUT * 0.8)))
+OPENAI_MAX_ATTEMPTS = int(os.getenv('OPENAI_MAX_ATTEMPTS', '3'))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv('OPENAI_RETRY_BASE_DELAY', '0.5'))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv('OPENAI_RETRY_MAX_DELAY', '4'))
+OPENAI_BREAKER_FAILURE_THRESHOLD = int(os.getenv('OPENAI_BREAKER_FAILURE_THRESHOLD', '5'))
+OPENAI_BREAKER_RESET_TIMEOUT = float(os.getenv('OPENAI_BREAKER_RESET_TIMEOUT', '30'))
+
+# Background AI generation. When enabled, the generate views queue a job for
+# `python manage.py run_generation_worker` instead of calling OpenAI inline.
+GENERATION_QUEUE_ENABLED = os.getenv('GENERATION_QUEUE_ENABLED', 'False') == 'True'
+GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv('GENERATION_JOB_MAX_ATTEMPTS', '3'))
+GENERATION_JOB_VISIBILITY_TIMEOUT = int(os.getenv('GENERATION_JOB_VISIBILITY_TIMEOUT', '300'))  # seconds a worker holds a job
+GENERATION_JOB_RETRY_DELAY = int(os.getenv('GENERATION_JOB_RETRY_DELAY', '10'))  # seconds, doubled per attempt
+
+# Duplicate generate submissions. A resubmitted form (same idempotency key) is
+# sent to the first submission's result or status page at once; a pending
+# submission older than IDEMPOTENCY_PENDING_LEASE was killed with its worker
+# and its key can be reused. Identical generations already running in this
+# process are joined for up to LLM_SINGLE_FLIGHT_TIMEOUT (the leader's own
+# call cannot take longer than OPENAI_REQUEST_DEADLINE).
+IDEMPOTENCY_PENDING_LEASE = int(os.getenv('IDEMPOTENCY_PENDING_LEASE', str(GUNICORN_TIMEOUT)))  # seconds
+LLM_SINGLE_FLIGHT_TIMEOUT = float(os.getenv('LLM_SINGLE_FLIGHT_TIMEOUT', str(OPENAI_REQUEST_DEADLINE)))  # seconds
+
+# Admission control for inline generations (shared by all workers through the
+# database): at most LLM_MAX_CONCURRENT at once, LLM_MAX_WAITING more may wait
+# LLM_ADMISSION_WAIT seconds for a slot, and each user gets a token bucket of
+# LLM_USER_BURST generations refilled at LLM_USER_RATE_PER_MINUTE. Rejected
+# requests get a 429. A slot is leased for LLM_ADMISSION_LEASE seconds (a
+# request cannot outlive the gunicorn timeout), so slots of killed workers free
+# themselves; buckets idle for LLM_USER_BUCKET_TTL seconds are deleted.
+LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', '4'))
+LLM_MAX_WAITING = int(os.getenv('LLM_MAX_WAITING', '8'))
+LLM_ADMISSION_WAIT = float(os.getenv('LLM_ADMISSION_WAIT', '2'))  # seconds
+LLM_ADMISSION_LEASE = int(os.getenv('LLM_ADMISSION_LEASE', str(GUNICORN_TIMEOUT)))  # seconds
+LLM_USER_BURST = int(os.getenv('LLM_USER_BURST', '3'))
+LLM_USER_RATE_PER_MINUTE = float(os.getenv('LLM_USER_RATE_PER_MINUTE', '6'))
+LLM_USER_BUCKET_TTL = int(os.getenv('LLM_USER_BUCKET_TTL', '3600'))  # seconds
+
+# Templates generated at once by one "compare templates" request (each is a
+# separate OpenAI call on the shared connection pool)
+LLM_BATCH_CONCURRENCY = int(os.getenv('LLM_BATCH_CONCURRENCY', '3'))
+
+# Default of the "only rewrite the sections I changed" option on the resume
+# form: generate per section and re-prompt only sections whose rows changed
+RESUME_SECTION_GENERATION = os.getenv('RESUME_SECTION_GENERATION', 'False') == 'True'
+
+# Estimated input tokens allowed per resume prompt. Longer profiles have the
+# descriptions of older / less relevant entries shortened, then those entries
+# left out (see resume/prompt_builder.py). 0 disables compaction.
+RESUME_PROMPT_TOKEN_BUDGET = int(os.getenv('RESUME_PROMPT_TOKEN_BUDGET', '2000'))
+
+# Job-description keyword extraction (resume/keywords.py): IDF statistics come
+# from up to KEYWORD_CORPUS_MAX_DOCS stored cover-letter job descriptions,
+# reloaded every KEYWORD_CORPUS_TTL seconds
+KEYWORD_CORPUS_TTL = int(os.getenv('KEYWORD_CORPUS_TTL', '3600'))
+KEYWORD_CORPUS_MAX_DOCS = int(os.getenv('KEYWORD_CORPUS_MAX_DOCS', '2000'))
+
+# LLM usage accounting: every OpenAI call is stored as an LLMUsage row, written
+# in batches of LLM_USAGE_BATCH_SIZE or every LLM_USAGE_FLUSH_INTERVAL seconds.
+# LLM_PRICING gives USD per 1K (prompt, completion) tokens for cost estimates.
+LLM_USAGE_BATCH_SIZE = int(os.getenv('LLM_USAGE_BATCH_SIZE', '20'))
+LLM_USAGE_FLUSH_INTERVAL = float(os.getenv('LLM_USAGE_FLUSH_INTERVAL', '5'))  # seconds
+LLM_PRICING = {
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.0025, 0.01),
+}
+
+# Caches. 'llm_responses' holds OpenAI completions keyed by profile snapshot,
+# template, prompt version and model parameters (TTL + max entries eviction).
+# Point LLM_CACHE_BACKEND/LLM_CACHE_LOCATION at a shared cache (e.g. database
+# or Redis) to share completions between gunicorn workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm_responses': {
+        'BACKEND': os.getenv('LLM_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('LLM_CACHE_LOCATION', 'llm-responses'),
+        'TIMEOUT': int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600))),  # seconds
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000')),
+        },
+    },
+}
 
 # Theme settings removed: site fixed to light theme and theme toggle removed
 
@@ -6,7 +6,8 @@ from django.utils.html import format_html
 from django.urls import reverse
 
 # Import all models
-from resume.models import Profile, Education, Experience, Project, GeneratedResume, CoverLetter
+from resume.models import Profile, Education, Experience, Project, GeneratedResume, CoverLetter, PDFRenderJob, GenerationJob, GenerationRequest, ResumeSection, LLMUsage
+from resume.llm_usage import usage_summary
 
 
 # ==================== RESUME APP ====================
@@ -292,6 +293,125 @@ class CoverLetterAdmin(admin.ModelAdmin):
     get_user_link.short_description = 'Link to User'
 
 
+@admin.register(PDFRenderJob)
+class PDFRenderJobAdmin(admin.ModelAdmin):
+    """Admin interface for background PDF render jobs."""
+    list_display = [
+        'id',
+        'get_user_email',
+        'document_type',
+        'template',
+        'status',
+        'created_at',
+        'finished_at'
+    ]
+    search_fields = ['user__email', 'filename', 'cache_key']
+    list_filter = ['status', 'document_type', 'created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'cache_key']
+    date_hierarchy = 'created_at'
+    
+    def get_user_email(self, obj):
+        return obj.user.email
+    get_user_email.short_description = 'User Email'
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    """Admin interface for background AI generation jobs."""
+    list_display = [
+        'id',
+        'get_user_email',
+        'document_type',
+        'template',
+        'status',
+        'attempts',
+        'created_at',
+        'finished_at'
+    ]
+    search_fields = ['user__email', 'error']
+    list_filter = ['status', 'document_type', 'created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_until', 'result_id']
+    date_hierarchy = 'created_at'
+    
+    def get_user_email(self, obj):
+        return obj.user.email
+    get_user_email.short_description = 'User Email'
+
+
+@admin.register(GenerationRequest)
+class GenerationRequestAdmin(admin.ModelAdmin):
+    """Admin interface for generate form idempotency keys."""
+    list_display = ['key', 'get_user_email', 'document_type', 'result_id', 'job', 'created_at']
+    search_fields = ['user__email', 'key']
+    list_filter = ['document_type', 'created_at']
+    readonly_fields = ['created_at']
+    
+    def get_user_email(self, obj):
+        return obj.user.email
+    get_user_email.short_description = 'User Email'
+
+
+@admin.register(ResumeSection)
+class ResumeSectionAdmin(admin.ModelAdmin):
+    """Admin interface for stored per-section resume HTML."""
+    list_display = ['get_user_email', 'template', 'section', 'updated_at']
+    search_fields = ['user__email']
+    list_filter = ['template', 'section', 'updated_at']
+    readonly_fields = ['fingerprint', 'updated_at']
+    
+    def get_user_email(self, obj):
+        return obj.user.email
+    get_user_email.short_description = 'User Email'
+
+
+@admin.register(LLMUsage)
+class LLMUsageAdmin(admin.ModelAdmin):
+    """Admin interface for per-call OpenAI usage with per day/template/user totals."""
+    change_list_template = 'admin/resume/llmusage/change_list.html'
+    list_display = [
+        'created_at',
+        'get_user_email',
+        'kind',
+        'template',
+        'model',
+        'outcome',
+        'prompt_tokens',
+        'completion_tokens',
+        'latency_ms',
+        'ttft_ms',
+        'cost'
+    ]
+    search_fields = ['user__email', 'kind']
+    list_filter = ['outcome', 'model', 'template', 'stream', 'created_at']
+    date_hierarchy = 'created_at'
+    
+    def get_user_email(self, obj):
+        return obj.user.email if obj.user else '-'
+    get_user_email.short_description = 'User Email'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            queryset = response.context_data['cl'].queryset
+        except (AttributeError, KeyError):
+            # Redirects and error responses have no changelist
+            return response
+        response.context_data['usage_summaries'] = [
+            {
+                'group': group,
+                'rows': [
+                    dict(row, value=row[group])
+                    for row in usage_summary(group, days=None, queryset=queryset)[:20]
+                ],
+            }
+            for group in ('day', 'template', 'user')
+        ]
+        return response
+
+
 # ==================== CUSTOMIZE ADMIN SITE ====================
 
 # Customize the admin site header and title
@@ -0,0 +1,331 @@
+"""
+Admission control for inline AI generations.
+
+A generation holds a web worker for as long as the API takes, so at most
+LLM_MAX_CONCURRENT of them run at a time across all gunicorn workers.
+Further requests wait up to LLM_ADMISSION_WAIT seconds, but only
+LLM_MAX_WAITING of them; the rest are turned away at once. Each user also has
+a token bucket (LLM_USER_BURST generations, refilled at
+LLM_USER_RATE_PER_MINUTE), so one user or script cannot take every slot.
+
+The limits are shared through the database, like the generation queue:
+slots are AdmissionSlot rows claimed with conditional UPDATEs and leased for
+LLM_ADMISSION_LEASE seconds, so a slot held by a killed worker frees itself,
+and buckets are UserRateBucket rows updated the same way. Buckets idle for
+LLM_USER_BUCKET_TTL seconds are deleted (a missing bucket is a full one).
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import AdmissionSlot, UserRateBucket
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to claim a slot while waiting
+ADMISSION_POLL_INTERVAL = 0.1
+
+# Attempts to update a bucket that other workers keep changing
+BUCKET_UPDATE_ATTEMPTS = 5
+
+
+class AdmissionRejected(Exception):
+    """A generation was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UserRateLimited(AdmissionRejected):
+    """The user's token bucket is empty."""
+
+
+class Overloaded(AdmissionRejected):
+    """All generation slots are busy and the wait queue is full or timed out."""
+
+
+def refill(tokens, elapsed, capacity, rate):
+    """Tokens in a bucket `elapsed` seconds after it held `tokens`."""
+    return min(capacity, tokens + max(0.0, elapsed) * rate)
+
+
+class AdmissionTicket:
+    """
+    Slot held by an admitted generation; release() it exactly once when the
+    generation ends (also usable as a context manager).
+    """
+
+    def __init__(self, controller, slot, holder):
+        self._controller = controller
+        self._slot = slot
+        self._holder = holder
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._free(self._slot, self._holder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Global concurrency cap with a bounded wait queue, plus per-user token buckets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Slot rows known to exist: kind -> count
+        self._slots_created = {}
+        self._pruned_at = 0.0
+        # Outcomes in this process
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    @property
+    def max_concurrent(self):
+        return getattr(settings, 'LLM_MAX_CONCURRENT', 4)
+
+    @property
+    def max_waiting(self):
+        return getattr(settings, 'LLM_MAX_WAITING', 8)
+
+    def _take_token(self, user_id, count=1):
+        """
+        Take `count` tokens from the user's bucket (all or none).
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until enough are available
+        """
+        capacity = getattr(settings, 'LLM_USER_BURST', 3)
+        rate = getattr(settings, 'LLM_USER_RATE_PER_MINUTE', 6) / 60.0
+        for _ in range(BUCKET_UPDATE_ATTEMPTS):
+            now = timezone.now()
+            bucket = UserRateBucket.objects.filter(user_id=user_id).first()
+            if bucket is None:
+                if capacity < count:
+                    return 60
+                try:
+                    with transaction.atomic():
+                        UserRateBucket.objects.create(user_id=user_id, tokens=capacity - count, updated_at=now)
+                    return 0
+                except IntegrityError:
+                    # Created by a concurrent request; charge that row
+                    continue
+
+            tokens = refill(bucket.tokens, (now - bucket.updated_at).total_seconds(), capacity, rate)
+            if tokens < count:
+                return (count - tokens) / rate if rate > 0 else 60
+            # Only applies if no other request changed the bucket since it was read
+            if UserRateBucket.objects.filter(
+                pk=bucket.pk, tokens=bucket.tokens, updated_at=bucket.updated_at
+            ).update(tokens=tokens - count, updated_at=now):
+                return 0
+        # Several concurrent generations by this user; ask them to slow down
+        return 1
+
+    def _refund(self, user_id, count=1):
+        UserRateBucket.objects.filter(user_id=user_id).update(
+            tokens=Least(F('tokens') + count, float(getattr(settings, 'LLM_USER_BURST', 3)))
+        )
+
+    def _prune_buckets(self):
+        """Delete buckets idle for LLM_USER_BUCKET_TTL seconds (at most once a minute per process)."""
+        ttl = getattr(settings, 'LLM_USER_BUCKET_TTL', 3600)
+        if time.monotonic() - self._pruned_at < min(60, ttl):
+            return
+        self._pruned_at = time.monotonic()
+        deleted, _ = UserRateBucket.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=ttl)).delete()
+        if deleted:
+            logger.debug(f"Deleted {deleted} idle generation rate bucket(s)")
+
+    def check_rate(self, user, count=1):
+        """
+        Charge `count` generations to the user's token bucket.
+
+        Raises:
+            UserRateLimited: The user has fewer than `count` tokens left
+        """
+        self._prune_buckets()
+        retry_after = self._take_token(user.pk, count)
+        if retry_after:
+            with self._lock:
+                self.rate_limited += 1
+            logger.info(f"Generation rate limit hit by user {user.pk}")
+            raise UserRateLimited(
+                'You are generating documents too quickly. Please wait a moment and try again.',
+                retry_after,
+            )
+
+    def admit(self, user, wait=None):
+        """
+        Admit an inline generation for `user`.
+
+        Args:
+            user: Requesting user (charged one token)
+            wait: Seconds to wait for a free slot (defaults to settings.LLM_ADMISSION_WAIT)
+
+        Returns:
+            AdmissionTicket to release when the generation ends
+
+        Raises:
+            UserRateLimited: The user's bucket is empty
+            Overloaded: No slot became free in time, or too many requests are already waiting
+        """
+        self.check_rate(user)
+        try:
+            return self.acquire(wait)
+        except Overloaded:
+            # The user was not served; do not charge them
+            self._refund(user.pk)
+            raise
+
+    def admit_batch(self, user, count, concurrency, wait=None):
+        """
+        Admit a batch of `count` generations for `user`, e.g. one resume in
+        several templates.
+
+        The user is charged one token per generation. One slot is taken like
+        admit() does; up to `concurrency - 1` more are taken only if they are
+        free right now, so a batch never waits for, or queues behind, more
+        than one slot.
+
+        Returns:
+            List of 1 to `concurrency` AdmissionTickets; run at most that many
+            generations at once and release every ticket when the batch ends
+
+        Raises:
+            UserRateLimited: The user has fewer than `count` tokens left
+            Overloaded: Not even one slot became free in time
+        """
+        self.check_rate(user, count)
+        try:
+            tickets = [self.acquire(wait)]
+        except Overloaded:
+            self._refund(user.pk, count)
+            raise
+
+        lease = getattr(settings, 'LLM_ADMISSION_LEASE', 30)
+        while len(tickets) < concurrency:
+            holder = uuid.uuid4().hex
+            slot = self._claim(AdmissionSlot.KIND_ACTIVE, self.max_concurrent, holder, lease)
+            if slot is None:
+                break
+            tickets.append(AdmissionTicket(self, slot, holder))
+        with self._lock:
+            self.admitted += len(tickets) - 1
+        return tickets
+
+    def _ensure_slots(self, kind, count, force=False):
+        """
+        Create the first `count` slot rows of `kind` unless this process
+        already did (force=True creates them again, e.g. after they were deleted).
+        """
+        if not force and self._slots_created.get(kind, 0) >= count:
+            return
+        AdmissionSlot.objects.bulk_create(
+            [AdmissionSlot(kind=kind, number=number) for number in range(count)],
+            ignore_conflicts=True,
+        )
+        self._slots_created[kind] = count
+
+    def _claim(self, kind, count, holder, lease):
+        """
+        Claim a free slot among the first `count` of `kind` for `lease` seconds.
+
+        Returns:
+            Primary key of the claimed slot, or None if all are held
+        """
+        if count <= 0:
+            return None
+        self._ensure_slots(kind, count)
+        slot = self._claim_free(kind, count, holder, lease)
+        if slot is None and AdmissionSlot.objects.filter(kind=kind, number__lt=count).count() < count:
+            # Rows were deleted (or rolled back) since this process created them
+            self._ensure_slots(kind, count, force=True)
+            slot = self._claim_free(kind, count, holder, lease)
+        return slot
+
+    def _claim_free(self, kind, count, holder, lease):
+        now = timezone.now()
+        free = (
+            AdmissionSlot.objects.filter(kind=kind, number__lt=count)
+            .filter(Q(lease_until__isnull=True) | Q(lease_until__lte=now))
+            .values_list('pk', 'lease_until')
+        )
+        for pk, lease_until in free:
+            # Fails if another worker claimed the slot since it was read
+            if AdmissionSlot.objects.filter(pk=pk, lease_until=lease_until).update(
+                holder=holder, lease_until=now + timedelta(seconds=lease)
+            ):
+                return pk
+        return None
+
+    def _free(self, slot, holder):
+        AdmissionSlot.objects.filter(pk=slot, holder=holder).update(holder='', lease_until=None)
+
+    def _overloaded(self):
+        with self._lock:
+            self.overloaded += 1
+        return Overloaded('The AI service is busy. Please try again shortly.', 5)
+
+    def acquire(self, wait=None):
+        """
+        Take a global generation slot without charging a user (see admit()).
+        """
+        if wait is None:
+            wait = getattr(settings, 'LLM_ADMISSION_WAIT', 2.0)
+        lease = getattr(settings, 'LLM_ADMISSION_LEASE', 30)
+        holder = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+
+        slot = self._claim(AdmissionSlot.KIND_ACTIVE, self.max_concurrent, holder, lease)
+        if slot is None:
+            place = self._claim(AdmissionSlot.KIND_WAITING, self.max_waiting, holder, wait + lease)
+            if place is None:
+                raise self._overloaded()
+            try:
+                while slot is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._overloaded()
+                    time.sleep(min(ADMISSION_POLL_INTERVAL, remaining))
+                    slot = self._claim(AdmissionSlot.KIND_ACTIVE, self.max_concurrent, holder, lease)
+            finally:
+                self._free(place, holder)
+
+        with self._lock:
+            self.admitted += 1
+        return AdmissionTicket(self, slot, holder)
+
+    def stats(self):
+        now = timezone.now()
+        held = AdmissionSlot.objects.filter(lease_until__gt=now)
+        return {
+            'active': held.filter(kind=AdmissionSlot.KIND_ACTIVE, number__lt=self.max_concurrent).count(),
+            'waiting': held.filter(kind=AdmissionSlot.KIND_WAITING, number__lt=self.max_waiting).count(),
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+            'admitted': self.admitted,
+            'rate_limited': self.rate_limited,
+            'overloaded': self.overloaded,
+        }
+
+
+llm_admission = AdmissionController()
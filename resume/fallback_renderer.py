@@ -0,0 +1,189 @@
+"""
+Non-AI resume HTML.
+
+Used when no API key is set or the AI service is unavailable. Each resume
+template lists the sections it shows (LAYOUTS); the sections are built with
+plain string joins from the data dict built by
+AIResumeGenerator._gather_user_data, as the original per-template builders
+did. Every profile field is HTML-escaped. When the data targets a job
+description (data['target']), skills and projects are listed most relevant
+first; experience and education stay in date order.
+"""
+from html import escape
+
+from .keywords import order_by_relevance
+
+
+FALLBACK_TEMPLATES = ('modern', 'classic', 'creative', 'minimal', 'executive', 'technical')
+
+# Contact details shown in each template's header: (field, prefix)
+CONTACT_FIELDS = {
+    'modern': (('email', '📧 '), ('phone', '📱 '), ('location', '📍 '), ('linkedin', '🔗 ')),
+    # Minimal shows the location on its own line
+    'minimal': (('email', ''), ('phone', '')),
+}
+DEFAULT_CONTACT_FIELDS = (('email', ''), ('phone', ''), ('location', ''))
+
+
+def _header(data, profile, contact, template):
+    name = escape(str(data['name'] or 'Your Name'))
+    html = '<div class="header">\n'
+    if template == 'technical':
+        html += f'<h1>&lt;{name} /&gt;</h1>\n'
+    else:
+        html += f'<h1>{name}</h1>\n'
+    if template == 'minimal' and profile.get('location'):
+        html += f'<p>{escape(str(profile["location"]))}</p>\n'
+    if contact:
+        separator = ' · ' if template == 'minimal' else ' | '
+        html += f'<div class="contact-info">{escape(separator.join(contact))}</div>\n'
+    return html + '</div>\n\n'
+
+
+def _text_section(title, text):
+    if not text:
+        return ''
+    return f'<div class="section">\n<h2>{title}</h2>\n<p>{escape(str(text))}</p>\n</div>\n\n'
+
+
+def _experience(title, experience):
+    if not experience:
+        return ''
+    html = f'<div class="section">\n<h2>{title}</h2>\n'
+    for exp in experience:
+        html += (
+            f'<div class="item">\n<h3>{escape(exp["position"])}</h3>\n'
+            f'<p class="company">{escape(exp["company"])}</p>\n'
+            f'<p class="date-range">{escape(exp["start_date"])} - {escape(exp["end_date"])}</p>\n'
+            f'<p>{escape(exp["description"])}</p>\n</div>\n'
+        )
+    return html + '</div>\n\n'
+
+
+def _education(title, education, show_grade=False):
+    if not education:
+        return ''
+    html = f'<div class="section">\n<h2>{title}</h2>\n'
+    for edu in education:
+        html += (
+            f'<div class="item">\n<h3>{escape(edu["degree"])} in {escape(edu["field"])}</h3>\n'
+            f'<p class="institution">{escape(edu["institution"])}</p>\n'
+            f'<p class="date-range">{escape(edu["start_date"])} - {escape(edu["end_date"])}</p>\n'
+        )
+        if show_grade and edu['grade']:
+            html += f'<p>Grade: {escape(edu["grade"])}</p>\n'
+        html += '</div>\n'
+    return html + '</div>\n\n'
+
+
+def _skills(title, skills):
+    if not skills:
+        return ''
+    html = f'<div class="section">\n<h2>{title}</h2>\n<ul class="skills-list">\n'
+    for skill in skills:
+        html += f'<li>{escape(skill)}</li>\n'
+    return html + '</ul>\n</div>\n\n'
+
+
+def _projects(title, projects, technologies_label):
+    if not projects:
+        return ''
+    html = f'<div class="section">\n<h2>{title}</h2>\n'
+    for proj in projects:
+        html += f'<div class="item">\n<h3>{escape(proj["title"])}</h3>\n'
+        if proj['technologies']:
+            html += f'<p>{technologies_label}: {escape(", ".join(proj["technologies"]))}</p>\n'
+        html += f'<p>{escape(proj["description"])}</p>\n</div>\n'
+    return html + '</div>\n\n'
+
+
+# Sections of each template in order: (section, heading, *extra builder arguments)
+LAYOUTS = {
+    'modern': (
+        ('summary', 'Professional Summary'),
+        ('experience', 'Work Experience'),
+        ('education', 'Education', True),
+        ('skills', 'Skills'),
+        ('projects', 'Projects', 'Technologies'),
+    ),
+    'classic': (
+        ('career_objective', 'Career Objective'),
+        ('summary', 'Professional Summary'),
+        ('experience', 'Work Experience'),
+        ('education', 'Education'),
+        ('skills', 'Skills'),
+    ),
+    'creative': (
+        ('summary', 'About Me'),
+        ('experience', 'Experience'),
+        ('education', 'Education'),
+        ('skills', 'Skills'),
+    ),
+    'minimal': (
+        ('summary', 'Summary'),
+        ('experience', 'Experience'),
+        ('education', 'Education'),
+        ('skills', 'Skills'),
+    ),
+    'executive': (
+        ('summary', 'Executive Summary'),
+        ('experience', 'Professional Experience'),
+        ('education', 'Education'),
+        ('skills', 'Core Competencies'),
+    ),
+    'technical': (
+        ('summary', '// Technical Summary'),
+        ('skills', '// Technical Skills'),
+        ('experience', '// Work Experience'),
+        ('projects', '// Projects', 'Tech Stack'),
+        ('education', '// Education'),
+    ),
+}
+
+
+def render_fallback_resume(data, template='modern'):
+    """
+    Render a resume without AI.
+
+    Args:
+        data: User data dict from AIResumeGenerator._gather_user_data
+        template: Template ID (unknown IDs use modern)
+
+    Returns:
+        Resume HTML
+    """
+    if template not in FALLBACK_TEMPLATES:
+        template = 'modern'
+    profile = data['profile'] or {}
+    projects = data['projects']
+    skills = profile.get('skills')
+    target = data.get('target')
+    if target:
+        if skills:
+            skills = order_by_relevance(skills, target['skills'])
+        projects = order_by_relevance(projects, target['projects'])
+    values = {
+        'email': data['email'],
+        'phone': data['phone'],
+        'location': profile.get('location'),
+        'linkedin': profile.get('linkedin'),
+    }
+    contact = [
+        f'{prefix}{values[field]}'
+        for field, prefix in CONTACT_FIELDS.get(template, DEFAULT_CONTACT_FIELDS)
+        if values[field]
+    ]
+
+    html = _header(data, profile, contact, template)
+    for section, title, *extra in LAYOUTS[template]:
+        if section == 'experience':
+            html += _experience(title, data['experience'])
+        elif section == 'education':
+            html += _education(title, data['education'], *extra)
+        elif section == 'skills':
+            html += _skills(title, skills)
+        elif section == 'projects':
+            html += _projects(title, projects, *extra)
+        else:
+            html += _text_section(title, profile.get(section))
+    return html
@@ -0,0 +1,299 @@
+"""
+Background AI generation jobs.
+
+With settings.GENERATION_QUEUE_ENABLED the generate views store a
+GenerationJob instead of calling OpenAI inside the request, and the
+`run_generation_worker` management command runs the jobs. The database is the
+queue (no external broker): jobs are claimed with conditional UPDATEs, which
+works the same on SQLite and PostgreSQL. A claimed job is leased for the
+visibility timeout; failures are retried with backoff up to max_attempts.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Profile, Education, Experience, Project, GeneratedResume, CoverLetter, GenerationJob
+from .services import AIResumeGenerator
+
+
+logger = logging.getLogger(__name__)
+
+RESUME_TEMPLATE_NAMES = {
+    'modern': 'Modern Professional',
+    'classic': 'Classic Traditional',
+    'creative': 'Creative Bold',
+    'minimal': 'Minimal Clean',
+    'executive': 'Executive Premium',
+    'technical': 'Technical Expert',
+}
+
+
+def save_generated_resume(user, template_id, content):
+    """
+    Store generated resume content with a title naming the template.
+    """
+    template_name = RESUME_TEMPLATE_NAMES.get(template_id, 'Modern Professional')
+    return GeneratedResume.objects.create(
+        user=user,
+        title=f"Resume - {user.get_full_name()} ({template_name})",
+        content=content,
+        template=template_id
+    )
+
+
+def save_generated_resumes(user, contents):
+    """
+    Store several generated resumes in one transaction.
+    
+    Args:
+        contents: Dict of template ID -> resume content
+    
+    Returns:
+        List of GeneratedResume in the order of `contents`
+    """
+    with transaction.atomic():
+        return [save_generated_resume(user, template_id, content) for template_id, content in contents.items()]
+
+
+def save_cover_letter(user, template, company_name, position, job_description, content):
+    """
+    Store generated cover letter content.
+    """
+    return CoverLetter.objects.create(
+        user=user,
+        title=f"Cover Letter - {company_name} - {position}",
+        company_name=company_name,
+        position=position,
+        job_description=job_description,
+        content=content,
+        template=template
+    )
+
+
+def cover_letter_user_data(user, company_name, position, job_description):
+    """
+    Collect the data a cover letter is generated from.
+    """
+    profile, created = Profile.objects.get_or_create(user=user)
+    return {
+        'name': user.get_full_name() or user.email,
+        'email': user.email,
+        'profile': {
+            'summary': profile.summary or '',
+            'skills': profile.get_skills_list() if hasattr(profile, 'get_skills_list') else [],
+            'career_objective': profile.career_objective or '',
+        },
+        'education': list(Education.objects.filter(user=user).values()),
+        'experience': list(Experience.objects.filter(user=user).values()),
+        'projects': list(Project.objects.filter(user=user).values()),
+        'company_name': company_name,
+        'position': position,
+        'job_description': job_description,
+    }
+
+
+def enqueue_generation_job(user, document_type, template, params=None):
+    """
+    Queue an AI generation for the worker.
+
+    Args:
+        user: Owner of the generated document
+        document_type: 'resume' or 'cover_letter'
+        template: Template ID
+        params: Extra inputs (force_refresh; sections and an optional job_description for resumes;
+            company_name/position/job_description for cover letters)
+
+    Returns:
+        GenerationJob instance
+    """
+    return GenerationJob.objects.create(
+        user=user,
+        document_type=document_type,
+        template=template,
+        params=params or {},
+        max_attempts=getattr(settings, 'GENERATION_JOB_MAX_ATTEMPTS', 3),
+    )
+
+
+def claim_next_generation_job(visibility_timeout=None):
+    """
+    Lease the next runnable job: a queued job whose backoff has passed, or
+    a running job whose lease expired because its worker died.
+
+    The claim is a conditional UPDATE on the job's previous status and lease,
+    so concurrent workers never run the same job twice within one lease.
+
+    Args:
+        visibility_timeout: Lease length in seconds (defaults to settings.GENERATION_JOB_VISIBILITY_TIMEOUT)
+
+    Returns:
+        The claimed GenerationJob, or None if nothing is runnable
+    """
+    if visibility_timeout is None:
+        visibility_timeout = getattr(settings, 'GENERATION_JOB_VISIBILITY_TIMEOUT', 300)
+
+    while True:
+        now = timezone.now()
+        job = GenerationJob.objects.filter(
+            Q(status=GenerationJob.STATUS_QUEUED, run_after__lte=now)
+            | Q(status=GenerationJob.STATUS_RUNNING, locked_until__lt=now)
+        ).order_by('run_after', 'created_at').first()
+        if job is None:
+            return None
+
+        unchanged = GenerationJob.objects.filter(pk=job.pk, status=job.status, locked_until=job.locked_until)
+
+        if job.attempts >= job.max_attempts:
+            # Its last attempt's worker died mid-run; do not try again
+            if unchanged.update(
+                status=GenerationJob.STATUS_FAILED,
+                error=job.error or 'Worker stopped before the job finished',
+                finished_at=now,
+            ):
+                logger.warning(f"Generation job {job.pk} failed after {job.attempts} attempt(s)")
+            continue
+
+        locked_until = now + timedelta(seconds=visibility_timeout)
+        claimed = unchanged.update(
+            status=GenerationJob.STATUS_RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=locked_until,
+            started_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker took it first; try the next one
+
+
+def _generate(job, visibility_timeout):
+    """
+    Run the AI generation for a job.
+
+    Args:
+        visibility_timeout: Length in seconds of the lease the job was claimed with
+
+    Returns:
+        Callable that stores the generated document and returns it; the
+        caller runs it only while it still holds the job's lease
+    """
+    # Not bound by the gunicorn timeout, but must finish well within the lease
+    deadline = visibility_timeout / 2
+    generator = AIResumeGenerator(job.user, deadline=deadline)
+    force_refresh = bool(job.params.get('force_refresh'))
+
+    if job.document_type == 'resume':
+        success, content, error = generator.generate_resume(
+            template=job.template,
+            force_refresh=force_refresh,
+            sections=bool(job.params.get('sections')),
+            job_description=job.params.get('job_description', ''),
+        )
+        if not (success and content):
+            raise RuntimeError(error or 'Unknown error occurred')
+        return lambda: save_generated_resume(job.user, job.template, content)
+
+    if job.document_type == 'cover_letter':
+        company_name = job.params.get('company_name', '')
+        position = job.params.get('position', '')
+        job_description = job.params.get('job_description', '')
+        user_data = cover_letter_user_data(job.user, company_name, position, job_description)
+        content = generator.generate_cover_letter(user_data, force_refresh=force_refresh)
+        return lambda: save_cover_letter(job.user, job.template, company_name, position, job_description, content)
+
+    raise ValueError(f"Unknown document type: {job.document_type}")
+
+
+def run_generation_job(job, visibility_timeout=None):
+    """
+    Run a claimed job and record the outcome.
+
+    Args:
+        job: Job returned by claim_next_generation_job
+        visibility_timeout: Lease length in seconds the job was claimed with
+            (defaults to settings.GENERATION_JOB_VISIBILITY_TIMEOUT); bounds
+            the generation and is the length of the renewed lease
+
+    Failures are requeued with exponential backoff (GENERATION_JOB_RETRY_DELAY
+    seconds, doubled per attempt) until max_attempts is reached.
+
+    The document is only saved while the job is still leased to this worker:
+    the lease is renewed after the generation, and the document is created in
+    the same transaction as the conditional UPDATE that completes the job,
+    which rolls back if another worker reclaimed it in the meantime.
+    """
+    if visibility_timeout is None:
+        visibility_timeout = getattr(settings, 'GENERATION_JOB_VISIBILITY_TIMEOUT', 300)
+    lease = GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.STATUS_RUNNING, locked_until=job.locked_until)
+
+    try:
+        save = _generate(job, visibility_timeout)
+
+        locked_until = timezone.now() + timedelta(seconds=visibility_timeout)
+        if not lease.update(locked_until=locked_until):
+            logger.warning(f"Generation job {job.pk} lease expired before it finished; result discarded")
+            return job
+        job.locked_until = locked_until
+        lease = GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.STATUS_RUNNING, locked_until=locked_until)
+
+        with transaction.atomic():
+            obj = save()
+            now = timezone.now()
+            updated = lease.update(
+                status=GenerationJob.STATUS_DONE,
+                result_id=obj.pk,
+                error='',
+                locked_until=None,
+                finished_at=now,
+            )
+            if not updated:
+                transaction.set_rollback(True)
+        if not updated:
+            logger.warning(f"Generation job {job.pk} lease expired before it was saved; result discarded")
+            return job
+
+        job.status = GenerationJob.STATUS_DONE
+        job.result_id = obj.pk
+        job.error = ''
+        job.locked_until = None
+        job.finished_at = now
+        return job
+    except Exception as e:
+        logger.exception(f"Generation job {job.pk} attempt {job.attempts} failed")
+        now = timezone.now()
+        job.error = str(e)
+        if job.attempts < job.max_attempts:
+            delay = getattr(settings, 'GENERATION_JOB_RETRY_DELAY', 10) * 2 ** (job.attempts - 1)
+            job.status = GenerationJob.STATUS_QUEUED
+            job.run_after = now + timedelta(seconds=delay)
+        else:
+            job.status = GenerationJob.STATUS_FAILED
+            job.finished_at = now
+
+    updated = lease.update(
+        status=job.status,
+        result_id=job.result_id,
+        error=job.error,
+        run_after=job.run_after,
+        locked_until=None,
+        finished_at=job.finished_at,
+    )
+    if not updated:
+        logger.warning(f"Generation job {job.pk} lease expired before it finished; result not recorded")
+    return job
+
+
+def get_job_result_url(job):
+    """
+    Return the URL of the document a finished job created, or None.
+    """
+    from django.urls import reverse
+
+    if job.status != GenerationJob.STATUS_DONE or job.result_id is None:
+        return None
+    view_name = 'resume_view' if job.document_type == 'resume' else 'cover_letter_view'
+    return reverse(view_name, args=[job.result_id])
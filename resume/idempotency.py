@@ -0,0 +1,131 @@
+"""
+Idempotency keys for the generate forms.
+
+Each generate form carries a random `idempotency_key`. The first POST with
+a key inserts a GenerationRequest row (the unique constraint makes the
+insert the lock); a second POST with the same key, from a double click or a
+browser resubmit, is answered with the first one's result, or with a status
+page while it is still generating, instead of calling OpenAI again and
+saving a duplicate document. The duplicate never waits on the request thread.
+
+A pending row older than IDEMPOTENCY_PENDING_LEASE seconds belongs to a
+worker that was killed mid-generation (a request cannot outlive the gunicorn
+timeout), so the next submission with its key takes it over.
+"""
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import GenerationRequest
+
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def get_idempotency_key(request):
+    """
+    Return the idempotency key of a POST (form field, or the Idempotency-Key
+    header for API clients), or None if missing or malformed.
+    """
+    key = request.POST.get('idempotency_key') or request.headers.get('Idempotency-Key', '')
+    return key if IDEMPOTENCY_KEY_RE.match(key) else None
+
+
+def is_stale(record):
+    """True if a pending record outlived its lease (its worker was killed)."""
+    lease = getattr(settings, 'IDEMPOTENCY_PENDING_LEASE', 120)
+    return record.is_pending and record.created_at < timezone.now() - timedelta(seconds=lease)
+
+
+def claim_generation_request(user, key, document_type):
+    """
+    Register a generation under `key`, or find the earlier one that used it.
+
+    Never waits: an earlier submission that is still generating is returned
+    as a replay straight away (see get_request_result_url). A stale pending
+    record is taken over by this call.
+
+    Args:
+        user: Submitting user
+        key: Key from get_idempotency_key (None disables the check)
+        document_type: 'resume' or 'cover_letter'
+
+    Returns:
+        Tuple (record, replay). replay is False when this call claimed the key
+        and should generate (record is None when no key was sent); True when
+        record belongs to an earlier submission whose result should be shown.
+    """
+    if not key:
+        return None, False
+
+    while True:
+        try:
+            with transaction.atomic():
+                return GenerationRequest.objects.create(user=user, key=key, document_type=document_type), False
+        except IntegrityError:
+            pass
+
+        existing = GenerationRequest.objects.filter(user=user, key=key).first()
+        if existing is None:
+            # The earlier submission failed and released the key
+            continue
+        if is_stale(existing):
+            # Renew the lease; only one resubmission can win this UPDATE
+            now = timezone.now()
+            if GenerationRequest.objects.filter(
+                pk=existing.pk, created_at=existing.created_at, result_id__isnull=True, job__isnull=True
+            ).update(created_at=now, document_type=document_type):
+                logger.warning(f"Took over stale {document_type} generation request {key} for user {user.pk}")
+                existing.created_at = now
+                existing.document_type = document_type
+                return existing, False
+            continue
+        logger.info(f"Replaying {document_type} generation request {key} for user {user.pk}")
+        return existing, True
+
+
+def complete_generation_request(record, obj=None, job=None):
+    """
+    Record the document (or queued job) produced for a claimed key.
+    """
+    if record is None:
+        return
+    record.result_id = obj.pk if obj is not None else None
+    record.job = job
+    record.save(update_fields=['result_id', 'job'])
+
+
+def release_generation_request(record):
+    """
+    Forget a claimed key after a failed generation so the form can be resubmitted.
+    """
+    if record is not None and record.pk is not None:
+        record.delete()
+
+
+def get_request_result_url(record):
+    """
+    Return the URL answering a replayed request: the generated document, the
+    status page of its queued job, or None while it is still generating.
+    """
+    if record.result_id is not None:
+        view_name = 'resume_view' if record.document_type == 'resume' else 'cover_letter_view'
+        return reverse(view_name, args=[record.result_id])
+    if record.job_id is not None:
+        return reverse('generation_job_status', args=[record.job_id])
+    return None
+
+
+def get_request_status_url(record):
+    """
+    Return the URL to send a replayed request to: its result, or the status
+    page that refreshes until the earlier submission finishes.
+    """
+    return get_request_result_url(record) or reverse('generation_request_status', args=[record.pk])
@@ -0,0 +1,232 @@
+"""
+Offline keyword extraction from job descriptions and relevance ranking of
+profile entries.
+
+A job description is tokenized, stopwords are removed and unigrams plus
+bigrams are weighted by TF-IDF; a bigram only counts as a keyword when it
+repeats in the description or occurs in the corpus, which keeps accidental
+word pairs ("design data") out. Document frequencies come from the job
+descriptions stored on cover letters, loaded once per process and refreshed
+every KEYWORD_CORPUS_TTL seconds, so rare, specific terms ("kubernetes",
+"data pipelines") outweigh ones every posting uses. Each experience, project
+and skill is then scored by the share of the weighted keywords it mentions,
+computed for all entries at once with NumPy. Ranking a profile takes about a
+millisecond and makes no API or database call once the corpus is loaded.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Keywords kept per job description
+KEYWORD_LIMIT = 40
+
+TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+# Bigrams do not span sentence or list boundaries
+CHUNK_RE = re.compile(r'[,;:!?()\[\]\n•/|]+|\.\s')
+
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each either else etc even ever every few for from
+further get gets had has have having he her here hers him his how however i if in into is it its itself just
+least less let like may me might more most much must my no nor not of off on once one only or other our ours
+out over own per please rather same shall she should so some such than that the their theirs them then there
+these they this those through to too under until up upon us very via was we well were what when where which
+while who whom why will with within without would yet you your yours
+ability able apply applicant applicants candidate candidates career company day description desired duties
+environment excellent experience experienced familiarity good great ideal include includes including job join
+knowledge looking new opportunity plus position preferred related required requirement requirements
+responsibilities responsible role skills strong team teams understanding work working year years
+build building create help hire hiring make need needs nice offer run seeking use using want ensure
+""".split())
+
+
+def tokenize(text):
+    """Lower-case word tokens of text; technical names (c++, c#, node.js) are kept whole."""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def extract_terms(text):
+    """
+    Unigrams and bigrams of text, without stopwords or numbers.
+
+    Returns:
+        List of terms in order of appearance (with repeats)
+    """
+    terms = []
+    for chunk in CHUNK_RE.split((text or '').lower()):
+        previous = None
+        for token in TOKEN_RE.findall(chunk):
+            if token in STOPWORDS or token.isdigit() or len(token) < 2 and token not in ('c', 'r'):
+                previous = None
+                continue
+            terms.append(token)
+            if previous is not None:
+                terms.append(f'{previous} {token}')
+            previous = token
+    return terms
+
+
+class KeywordCorpus:
+    """
+    Document frequencies of terms over a set of job descriptions.
+    """
+
+    def __init__(self, documents=()):
+        self.df = Counter()
+        self.documents = 0
+        for document in documents:
+            self.df.update(set(extract_terms(document)))
+            self.documents += 1
+        self.built_at = time.monotonic()
+
+    def idf(self, term):
+        """Smoothed inverse document frequency (1.0 for an empty corpus)."""
+        return math.log((1 + self.documents) / (1 + self.df.get(term, 0))) + 1.0
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_keyword_corpus():
+    """
+    Process-wide corpus of stored job descriptions, rebuilt after
+    settings.KEYWORD_CORPUS_TTL seconds.
+    """
+    global _corpus
+    ttl = getattr(settings, 'KEYWORD_CORPUS_TTL', 3600)
+    corpus = _corpus
+    if corpus is not None and time.monotonic() - corpus.built_at < ttl:
+        return corpus
+
+    with _corpus_lock:
+        if _corpus is None or time.monotonic() - _corpus.built_at >= ttl:
+            from .models import CoverLetter
+
+            started = time.monotonic()
+            descriptions = (
+                CoverLetter.objects.exclude(job_description='')
+                .order_by('-created_at')
+                .values_list('job_description', flat=True)[:getattr(settings, 'KEYWORD_CORPUS_MAX_DOCS', 2000)]
+            )
+            _corpus = KeywordCorpus(descriptions)
+            logger.info(
+                f"Built keyword corpus from {_corpus.documents} job description(s) "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+        return _corpus
+
+
+def extract_keywords(text, corpus=None, limit=KEYWORD_LIMIT):
+    """
+    Weighted keywords of a job description.
+
+    Args:
+        text: Job description
+        corpus: KeywordCorpus for IDF (defaults to get_keyword_corpus())
+        limit: Keywords to return
+
+    Returns:
+        List of (term, weight) pairs, highest first, weights scaled to 0..1
+    """
+    counts = Counter(extract_terms(text))
+    corpus = corpus if corpus is not None else get_keyword_corpus()
+    terms = [term for term in counts if ' ' not in term or counts[term] > 1 or term in corpus.df]
+    if not terms:
+        return []
+    tf = 1.0 + np.log(np.fromiter((counts[term] for term in terms), dtype=float, count=len(terms)))
+    idf = np.fromiter((corpus.idf(term) for term in terms), dtype=float, count=len(terms))
+    weights = tf * idf
+    top = np.argsort(-weights, kind='stable')[:limit]
+    peak = weights[top[0]]
+    return [(terms[i], round(float(weights[i] / peak), 4)) for i in top]
+
+
+def score_texts(texts, keywords):
+    """
+    Relevance of each text to weighted keywords: the share of the total
+    keyword weight whose terms appear in the text.
+
+    Args:
+        texts: Entry texts
+        keywords: (term, weight) pairs from extract_keywords
+
+    Returns:
+        NumPy array of scores in 0..1, one per text
+    """
+    if not texts or not keywords:
+        return np.zeros(len(texts))
+    index = {term: i for i, (term, weight) in enumerate(keywords)}
+    weights = np.array([weight for term, weight in keywords])
+    hits = np.zeros((len(texts), len(keywords)))
+    for row, text in enumerate(texts):
+        columns = [index[term] for term in set(extract_terms(text)) if term in index]
+        hits[row, columns] = 1.0
+    return hits @ weights / weights.sum()
+
+
+def _entry_text(section, entry):
+    if section == 'experience':
+        return f"{entry.get('position', '')} {entry.get('description', '')}"
+    technologies = entry.get('technologies', '')
+    if not isinstance(technologies, str):
+        technologies = ', '.join(technologies)
+    return f"{entry.get('title', '')}, {technologies}, {entry.get('description', '')}"
+
+
+def rank_profile(data, job_description, corpus=None):
+    """
+    Score a profile's experience, projects and skills against a job description.
+
+    Args:
+        data: User data dict (from _gather_user_data or cover_letter_user_data)
+        job_description: Text of the job posting
+        corpus: KeywordCorpus for IDF (defaults to get_keyword_corpus())
+
+    Returns:
+        Dict with 'keywords' ([term, weight] pairs) and, for 'experience',
+        'projects' and 'skills', one relevance score per entry in data order
+        (0..1, scaled so the best entry of each section is 1), or None when
+        the description has no usable keywords
+    """
+    keywords = extract_keywords(job_description, corpus)
+    if not keywords:
+        return None
+    profile = data.get('profile') or {}
+    sections = {
+        'experience': [_entry_text('experience', entry) for entry in data.get('experience') or []],
+        'projects': [_entry_text('projects', entry) for entry in data.get('projects') or []],
+        'skills': list(profile.get('skills') or []),
+    }
+    ranking = {'keywords': [[term, weight] for term, weight in keywords]}
+    for section, texts in sections.items():
+        scores = score_texts(texts, keywords)
+        peak = scores.max() if len(scores) else 0.0
+        if peak > 0:
+            scores = scores / peak
+        ranking[section] = [round(float(score), 4) for score in scores]
+    return ranking
+
+
+def order_by_relevance(items, scores):
+    """Items sorted by descending score, keeping the original order among equals."""
+    if not scores or len(scores) != len(items):
+        return list(items)
+    return [items[i] for i in sorted(range(len(items)), key=lambda i: -scores[i])]
+
+
+def most_relevant(items, scores, limit=None):
+    """Items that match at least one keyword, most relevant first."""
+    if not scores or len(scores) != len(items):
+        return []
+    ranked = sorted((i for i in range(len(items)) if scores[i] > 0), key=lambda i: -scores[i])
+    return [items[i] for i in ranked[:limit]]
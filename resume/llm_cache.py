@@ -0,0 +1,100 @@
+"""
+Cache for OpenAI completions.
+
+Generating again from an unchanged profile with the same template returns
+the earlier completion instead of paying for another API round trip. Keys
+hash the normalized input data together with the prompt version and the
+model parameters, so any profile edit, prompt change or parameter change
+produces a new key. Entries live in a Django cache alias, which provides
+TTL and size-based eviction (see settings.CACHES['llm_responses']).
+"""
+import hashlib
+import json
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+
+LLM_CACHE_ALIAS = 'llm_responses'
+
+
+def llm_cache_key(kind, data, prompt_version, params):
+    """
+    Build a stable cache key for a completion.
+
+    Args:
+        kind: What is generated ('resume', 'cover_letter', ...)
+        data: Input data the prompt is built from (any JSON-serializable structure;
+            dates and other objects are stringified)
+        prompt_version: Version of the prompt wording
+        params: Model parameters (model, max_tokens, temperature, ...)
+
+    Returns:
+        Cache key string
+    """
+    payload = json.dumps(
+        {'kind': kind, 'data': data, 'prompt_version': prompt_version, 'params': params},
+        sort_keys=True,
+        default=str,
+        separators=(',', ':'),
+    )
+    return f"llm:{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class LLMResponseCache:
+    """
+    Completion cache with hit/miss counters and an estimate of the API
+    tokens and latency saved by hits (per process).
+    """
+
+    def __init__(self, alias=LLM_CACHE_ALIAS):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.saved_tokens = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def cache(self):
+        try:
+            return caches[self.alias]
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def get(self, key):
+        """Return the cached completion text, or None."""
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += entry.get('total_tokens', 0)
+            self.saved_seconds += entry.get('latency', 0.0)
+        return entry['content']
+
+    def set(self, key, content, total_tokens=0, latency=0.0):
+        """
+        Store a completion along with what it cost to produce.
+        """
+        self.cache.set(key, {'content': content, 'total_tokens': total_tokens, 'latency': latency})
+
+    def record_refresh(self):
+        """Count a generation where the user asked to skip the cache."""
+        with self._lock:
+            self.refreshes += 1
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'forced_refreshes': self.refreshes,
+            'saved_tokens': self.saved_tokens,
+            'saved_seconds': round(self.saved_seconds, 2),
+        }
+
+
+llm_response_cache = LLMResponseCache()
@@ -0,0 +1,209 @@
+"""
+Deadlines, retries and a circuit breaker for OpenAI calls.
+
+Every generation gets a deadline derived from the gunicorn worker timeout
+(settings.OPENAI_REQUEST_DEADLINE), so a slow upstream cannot hold a worker
+until gunicorn kills it. Transient failures (connection errors, timeouts,
+429 and 5xx responses) are retried with exponential backoff and full jitter
+while the deadline allows. Repeated failures open a per-process circuit
+breaker; while it is open, calls fail immediately with CircuitOpenError and
+callers use their non-AI fallback instead of waiting on a dead upstream.
+"""
+import logging
+import random
+import threading
+import time
+
+import openai
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Failures worth retrying; anything else (bad request, auth) fails at once
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailable(Exception):
+    """The API could not answer within the deadline and retry budget."""
+
+
+class CircuitOpenError(LLMUnavailable):
+    """The circuit breaker is open; the API was not called."""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The request deadline passed before the API answered."""
+
+
+class Deadline:
+    """
+    Point in time after which no further attempt is started.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker.
+
+    Closed: calls go through and consecutive failures are counted. After
+    `failure_threshold` failures it opens and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through
+    (half-open): success closes it, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def failure_threshold(self):
+        if self._failure_threshold is not None:
+            return self._failure_threshold
+        return getattr(settings, 'OPENAI_BREAKER_FAILURE_THRESHOLD', 5)
+
+    @property
+    def reset_timeout(self):
+        if self._reset_timeout is not None:
+            return self._reset_timeout
+        return getattr(settings, 'OPENAI_BREAKER_RESET_TIMEOUT', 30)
+
+    def allow(self):
+        """Return True if a call may be made now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("OpenAI circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.opens += 1
+                logger.warning(f"OpenAI circuit breaker opened after {self.failures} failure(s)")
+
+    def release(self):
+        """End a call that neither succeeded nor failed upstream (e.g. a local error)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opens': self.opens,
+            'rejected': self.rejected,
+        }
+
+
+llm_circuit_breaker = CircuitBreaker()
+
+
+def retry_delay(attempt, base_delay, max_delay):
+    """
+    Backoff before retry number `attempt` (1-based): exponential with full jitter.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def call_with_resilience(fn, deadline, breaker=None, max_attempts=None):
+    """
+    Call `fn(timeout)` until it succeeds, retrying transient API errors.
+
+    Args:
+        fn: Callable taking the seconds left for this attempt (pass it to the
+            client as the request timeout)
+        deadline: Deadline for all attempts together
+        breaker: CircuitBreaker (defaults to the process-wide one)
+        max_attempts: Attempts including the first (defaults to settings.OPENAI_MAX_ATTEMPTS)
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        CircuitOpenError: The breaker rejected the call
+        DeadlineExceeded: No time left for another attempt
+        LLMUnavailable: All attempts failed with retryable errors
+        Any non-retryable error raised by fn
+    """
+    breaker = breaker or llm_circuit_breaker
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'OPENAI_MAX_ATTEMPTS', 3)
+    base_delay = getattr(settings, 'OPENAI_RETRY_BASE_DELAY', 0.5)
+    max_delay = getattr(settings, 'OPENAI_RETRY_MAX_DELAY', 4.0)
+
+    attempt = 0
+    while True:
+        if deadline.expired:
+            raise DeadlineExceeded(f"No answer from the AI service within {deadline.seconds:.0f}s")
+        if not breaker.allow():
+            raise CircuitOpenError("The AI service is failing; skipping the call")
+
+        attempt += 1
+        try:
+            result = fn(deadline.remaining())
+        except RETRYABLE_ERRORS as e:
+            breaker.record_failure()
+            if attempt >= max_attempts:
+                raise LLMUnavailable(f"AI service failed after {attempt} attempt(s): {e}") from e
+            delay = retry_delay(attempt, base_delay, max_delay)
+            if delay >= deadline.remaining():
+                raise DeadlineExceeded(f"No time left to retry the AI service: {e}") from e
+            logger.info(f"OpenAI attempt {attempt} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        except openai.APIError:
+            # The API answered (e.g. 400/401): it is up, the request is wrong
+            breaker.record_success()
+            raise
+        except Exception:
+            breaker.release()
+            raise
+
+        breaker.record_success()
+        return result
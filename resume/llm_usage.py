@@ -0,0 +1,210 @@
+"""
+Per-call accounting of OpenAI usage.
+
+Every API call made by AIResumeGenerator is recorded with its model, token
+counts, wall time, time to first token (streamed calls), outcome and an
+estimated cost from settings.LLM_PRICING. Records are buffered in memory and
+written with one bulk INSERT per LLM_USAGE_BATCH_SIZE records, or by a
+background timer once the oldest buffered record is LLM_USAGE_FLUSH_INTERVAL
+seconds old, so accounting adds no per-request write and an idle worker does
+not hold records back. The buffer is also flushed at exit.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Group-by options of usage_summary: name -> field
+USAGE_GROUPS = {
+    'day': 'day',
+    'template': 'template',
+    'user': 'user__email',
+    'model': 'model',
+    'kind': 'kind',
+}
+
+# Average characters per token of English text for the GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimated cost in USD of a call from settings.LLM_PRICING
+    ({model: (prompt price, completion price) per 1K tokens}); 0 for unknown models.
+    """
+    pricing = getattr(settings, 'LLM_PRICING', {})
+    prices = pricing.get(model)
+    if prices is None:
+        # Dated snapshots (gpt-3.5-turbo-0613) are priced like their longest matching base model
+        prices = next(
+            (pricing[name] for name in sorted(pricing, key=len, reverse=True) if model.startswith(name)),
+            (0, 0),
+        )
+    prompt_price, completion_price = prices
+    cost = (Decimal(str(prompt_price)) * prompt_tokens + Decimal(str(completion_price)) * completion_tokens) / 1000
+    return cost.quantize(Decimal('0.000001'))
+
+
+def estimate_tokens(text):
+    """Rough token count of text (about CHARS_PER_TOKEN characters per token)."""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+class UsageRecorder:
+    """
+    Buffer of LLMUsage rows written in batches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._oldest = None
+        self._timer = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flush_errors = 0
+
+    def record(self, user=None, kind='', template='', model='', stream=False, outcome='ok',
+               prompt_tokens=0, completion_tokens=0, estimated_tokens=False, latency=0.0, ttft=None):
+        """
+        Buffer one call; flushes when the batch is full, otherwise a timer
+        flushes it LLM_USAGE_FLUSH_INTERVAL seconds after the first record.
+
+        Args:
+            latency: Wall time of the call in seconds
+            ttft: Seconds to the first streamed token, or None
+        """
+        from .models import LLMUsage
+
+        row = LLMUsage(
+            user=user if getattr(user, 'pk', None) else None,
+            kind=kind[:40],
+            template=template or '',
+            model=model or '',
+            stream=stream,
+            outcome=outcome,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            estimated_tokens=estimated_tokens,
+            latency_ms=int(latency * 1000),
+            ttft_ms=int(ttft * 1000) if ttft is not None else None,
+            cost=estimate_cost(model or '', prompt_tokens, completion_tokens),
+            created_at=timezone.now(),
+        )
+        interval = getattr(settings, 'LLM_USAGE_FLUSH_INTERVAL', 5)
+        with self._lock:
+            self._buffer.append(row)
+            self.recorded += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._timer = threading.Timer(interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            due = (
+                len(self._buffer) >= getattr(settings, 'LLM_USAGE_BATCH_SIZE', 20)
+                or time.monotonic() - self._oldest >= interval
+            )
+        if due:
+            self.flush()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection; do not leak it
+            connection.close()
+
+    def flush(self):
+        """Write all buffered rows with one bulk INSERT."""
+        from .models import LLMUsage
+
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._oldest = None
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if not rows:
+            return 0
+        try:
+            LLMUsage.objects.bulk_create(rows)
+        except Exception as e:
+            # Accounting must never break a generation
+            with self._lock:
+                self.flush_errors += 1
+            logger.warning(f"Could not write {len(rows)} LLM usage record(s): {e}")
+            return 0
+        with self._lock:
+            self.flushed += len(rows)
+        return len(rows)
+
+    def stats(self):
+        return {
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'buffered': len(self._buffer),
+            'flush_errors': self.flush_errors,
+        }
+
+
+usage_recorder = UsageRecorder()
+atexit.register(usage_recorder.flush)
+
+
+def usage_summary(group_by='day', days=30, queryset=None):
+    """
+    Aggregate usage per day, template, user, model or kind.
+
+    Args:
+        group_by: Key of USAGE_GROUPS
+        days: Only count calls from the last `days` days (None for all)
+        queryset: LLMUsage queryset to aggregate (defaults to all rows)
+
+    Returns:
+        List of dicts with the group value, calls, errors, tokens, cost and
+        average latency / time to first token, largest cost first (latest day
+        first when grouping by day)
+    """
+    from .models import LLMUsage
+
+    field = USAGE_GROUPS[group_by]
+    rows = queryset if queryset is not None else LLMUsage.objects.all()
+    if days is not None:
+        rows = rows.filter(created_at__gte=timezone.now() - timedelta(days=days))
+    if group_by == 'day':
+        rows = rows.annotate(day=TruncDate('created_at'))
+
+    summary = rows.values(field).annotate(
+        calls=Count('id'),
+        errors=Count('id', filter=~Q(outcome=LLMUsage.OUTCOME_OK)),
+        prompt_tokens=Sum('prompt_tokens'),
+        completion_tokens=Sum('completion_tokens'),
+        cost=Sum('cost'),
+        avg_latency_ms=Avg('latency_ms'),
+        avg_ttft_ms=Avg('ttft_ms'),
+    ).order_by(f'-{field}' if group_by == 'day' else '-cost')
+
+    return [
+        {
+            group_by: str(row[field]) if row[field] is not None else '',
+            'calls': row['calls'],
+            'errors': row['errors'],
+            'prompt_tokens': row['prompt_tokens'] or 0,
+            'completion_tokens': row['completion_tokens'] or 0,
+            'cost': float(row['cost'] or 0),
+            'avg_latency_ms': round(row['avg_latency_ms'] or 0),
+            'avg_ttft_ms': round(row['avg_ttft_ms']) if row['avg_ttft_ms'] is not None else None,
+        }
+        for row in summary
+    ]
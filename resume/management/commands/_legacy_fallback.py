@@ -0,0 +1,435 @@
+"""
+The per-template fallback resume builders as they were before
+resume/fallback_renderer.py replaced them.
+
+Kept only as the baseline of the benchmark_fallback command. They do not
+escape profile fields, so never use them to render a resume.
+"""
+
+
+def generate_modern_html(data):
+    """Generate Modern template HTML"""
+    html = '<div class="header">\n'
+    html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
+
+    # Contact info
+    contact = []
+    if data['email']:
+        contact.append(f'📧 {data["email"]}')
+    if data['phone']:
+        contact.append(f'📱 {data["phone"]}')
+    if data['profile'] and data['profile']['location']:
+        contact.append(f'📍 {data["profile"]["location"]}')
+    if data['profile'] and data['profile']['linkedin']:
+        contact.append(f'🔗 {data["profile"]["linkedin"]}')
+
+    if contact:
+        html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Professional Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>Professional Summary</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>Work Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            if edu['grade']:
+                html += f'<p>Grade: {edu["grade"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Skills
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>Skills</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    # Projects
+    if data['projects']:
+        html += '<div class="section">\n'
+        html += '<h2>Projects</h2>\n'
+        for proj in data['projects']:
+            html += '<div class="item">\n'
+            html += f'<h3>{proj["title"]}</h3>\n'
+            if proj['technologies']:
+                html += f'<p>Technologies: {", ".join(proj["technologies"])}</p>\n'
+            html += f'<p>{proj["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+def generate_classic_html(data):
+    """Generate Classic template HTML"""
+    html = '<div class="header">\n'
+    html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
+
+    # Contact info - centered for classic
+    contact = []
+    if data['email']:
+        contact.append(data["email"])
+    if data['phone']:
+        contact.append(data["phone"])
+    if data['profile'] and data['profile']['location']:
+        contact.append(data["profile"]["location"])
+
+    if contact:
+        html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Career Objective
+    if data['profile'] and data['profile']['career_objective']:
+        html += '<div class="section">\n'
+        html += '<h2>Career Objective</h2>\n'
+        html += f'<p>{data["profile"]["career_objective"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Professional Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>Professional Summary</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>Work Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Skills
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>Skills</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+def generate_creative_html(data):
+    """Generate Creative template HTML"""
+    # Creative has colored header
+    html = '<div class="header">\n'
+    html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
+
+    # Contact info
+    contact = []
+    if data['email']:
+        contact.append(data["email"])
+    if data['phone']:
+        contact.append(data["phone"])
+    if data['profile'] and data['profile']['location']:
+        contact.append(data["profile"]["location"])
+
+    if contact:
+        html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Professional Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>About Me</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Skills
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>Skills</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+def generate_minimal_html(data):
+    """Generate Minimal template HTML"""
+    html = '<div class="header">\n'
+    html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
+
+    if data['profile'] and data['profile']['location']:
+        html += f'<p>{data["profile"]["location"]}</p>\n'
+
+    # Contact info
+    contact = []
+    if data['email']:
+        contact.append(data["email"])
+    if data['phone']:
+        contact.append(data["phone"])
+
+    if contact:
+        html += f'<div class="contact-info">{" · ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>Summary</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Skills
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>Skills</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+def generate_executive_html(data):
+    """Generate Executive template HTML"""
+    html = '<div class="header">\n'
+    html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
+
+    # Contact info - centered
+    contact = []
+    if data['email']:
+        contact.append(data["email"])
+    if data['phone']:
+        contact.append(data["phone"])
+    if data['profile'] and data['profile']['location']:
+        contact.append(data["profile"]["location"])
+
+    if contact:
+        html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Executive Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>Executive Summary</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Professional Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>Professional Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Core Competencies
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>Core Competencies</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+def generate_technical_html(data):
+    """Generate Technical template HTML"""
+    # Technical has dark header
+    html = '<div class="header">\n'
+    html += f'<h1>&lt;{data["name"] if data["name"] else "Your Name"} /&gt;</h1>\n'
+
+    # Contact info in header
+    contact = []
+    if data['email']:
+        contact.append(data["email"])
+    if data['phone']:
+        contact.append(data["phone"])
+    if data['profile'] and data['profile']['location']:
+        contact.append(data["profile"]["location"])
+
+    if contact:
+        html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
+    html += '</div>\n\n'
+
+    # Technical Summary
+    if data['profile'] and data['profile']['summary']:
+        html += '<div class="section">\n'
+        html += '<h2>// Technical Summary</h2>\n'
+        html += f'<p>{data["profile"]["summary"]}</p>\n'
+        html += '</div>\n\n'
+
+    # Technical Skills
+    if data['profile'] and data['profile']['skills']:
+        html += '<div class="section">\n'
+        html += '<h2>// Technical Skills</h2>\n'
+        html += '<ul class="skills-list">\n'
+        for skill in data['profile']['skills']:
+            html += f'<li>{skill}</li>\n'
+        html += '</ul>\n'
+        html += '</div>\n\n'
+
+    # Experience
+    if data['experience']:
+        html += '<div class="section">\n'
+        html += '<h2>// Work Experience</h2>\n'
+        for exp in data['experience']:
+            html += '<div class="item">\n'
+            html += f'<h3>{exp["position"]}</h3>\n'
+            html += f'<p class="company">{exp["company"]}</p>\n'
+            html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
+            html += f'<p>{exp["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Projects
+    if data['projects']:
+        html += '<div class="section">\n'
+        html += '<h2>// Projects</h2>\n'
+        for proj in data['projects']:
+            html += '<div class="item">\n'
+            html += f'<h3>{proj["title"]}</h3>\n'
+            if proj['technologies']:
+                html += f'<p>Tech Stack: {", ".join(proj["technologies"])}</p>\n'
+            html += f'<p>{proj["description"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    # Education
+    if data['education']:
+        html += '<div class="section">\n'
+        html += '<h2>// Education</h2>\n'
+        for edu in data['education']:
+            html += '<div class="item">\n'
+            html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
+            html += f'<p class="institution">{edu["institution"]}</p>\n'
+            html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
+            html += '</div>\n'
+        html += '</div>\n\n'
+
+    return html
+
+
+LEGACY_RENDERERS = {
+    'modern': generate_modern_html,
+    'classic': generate_classic_html,
+    'creative': generate_creative_html,
+    'minimal': generate_minimal_html,
+    'executive': generate_executive_html,
+    'technical': generate_technical_html,
+}
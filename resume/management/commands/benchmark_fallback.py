@@ -0,0 +1,101 @@
+import json
+import platform
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from resume.fallback_renderer import FALLBACK_TEMPLATES, render_fallback_resume
+from resume.management.commands._legacy_fallback import LEGACY_RENDERERS
+from resume.management.commands.benchmark_pdf import Command as PDFBenchmarkCommand, summarize
+from resume.services import AIResumeGenerator
+
+
+def peak_allocation_kib(render, data, template):
+    """Peak memory allocated by Python while rendering once, in KiB."""
+    tracemalloc.start()
+    try:
+        render(data, template)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark the fallback resume renderer against the original "
+        "per-template builders (kept in _legacy_fallback.py): render time and "
+        "memory allocated per profile size and template. Synthetic data is "
+        "created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,5,10,25,50",
+            help="Comma-separated number of experience/education/project entries per profile (default: 1,5,10,25,50)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=200,
+            help="Timed renders per implementation, template and size (default: 200)",
+        )
+        parser.add_argument(
+            "--output",
+            default="fallback_benchmark.json",
+            help="Path of the JSON report (default: fallback_benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        repeat = max(1, options["repeat"])
+        implementations = {
+            'baseline': lambda data, template: LEGACY_RENDERERS[template](data),
+            'current': render_fallback_resume,
+        }
+
+        results = []
+        for size in sizes:
+            with transaction.atomic():
+                user = PDFBenchmarkCommand()._create_profile(size)
+                data = AIResumeGenerator(user)._gather_user_data()
+                transaction.set_rollback(True)
+
+            for template in FALLBACK_TEMPLATES:
+                result = {'size': size, 'template': template}
+                for name, render in implementations.items():
+                    # Untimed warm-up render
+                    html = render(data, template)
+                    samples = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        render(data, template)
+                        samples.append(time.perf_counter() - started)
+                    result[name] = dict(
+                        summarize(samples),
+                        peak_kib=peak_allocation_kib(render, data, template),
+                        html_bytes=len(html.encode('utf-8')),
+                    )
+                results.append(result)
+                self.stdout.write(
+                    f"size={size:<3} template={template:<10} "
+                    f"baseline p50={result['baseline']['p50_ms']:>7}ms peak={result['baseline']['peak_kib']:>7}KiB  "
+                    f"current p50={result['current']['p50_ms']:>7}ms peak={result['current']['peak_kib']:>7}KiB"
+                )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'sizes': sizes,
+            'results': results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} result(s) to {options['output']}"))
@@ -0,0 +1,223 @@
+import json
+import math
+import platform
+import resource
+import time
+import tracemalloc
+import uuid
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from resume.models import Profile, Education, Experience, Project, GeneratedResume
+from resume.services import AIResumeGenerator
+from resume.utils import format_resume_for_pdf, create_portfolio_html, render_pdf
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    """p50/p95/mean in milliseconds for a list of durations in seconds."""
+    return {
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+    }
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KiB (Linux reports KiB).
+
+    A lifetime high-water mark: it only says how much the whole run needed,
+    not what any one template or size used.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def peak_render_allocation_kib(html_content, template):
+    """
+    Peak memory allocated by Python during one render, in KiB.
+
+    Measured with tracemalloc on an extra, untimed render, so each result has
+    its own peak; memory allocated by native libraries (Pango, cairo) is not
+    counted.
+    """
+    tracemalloc.start()
+    try:
+        render_pdf(html_content, template).close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark PDF generation (format_resume_for_pdf, create_portfolio_html and "
+        "the WeasyPrint render) for synthetic profiles across all resume templates. "
+        "Synthetic data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,5,10,25,50",
+            help="Comma-separated number of experience/education/project entries per profile (default: 1,5,10,25,50)",
+        )
+        parser.add_argument(
+            "--templates",
+            default="",
+            help="Comma-separated template IDs to run (default: all TEMPLATE_CHOICES)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed iterations per template and size (default: 5)",
+        )
+        parser.add_argument(
+            "--output",
+            default="pdf_benchmark.json",
+            help="Path of the JSON report (default: pdf_benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        all_templates = [choice[0] for choice in GeneratedResume.TEMPLATE_CHOICES]
+        templates = [t.strip() for t in options["templates"].split(",") if t.strip()] or all_templates
+        repeat = max(1, options["repeat"])
+
+        # One untimed render so font loading does not skew the first sample
+        render_pdf('<p>warm up</p>', templates[0]).close()
+
+        results = []
+        for size in sizes:
+            with transaction.atomic():
+                user = self._create_profile(size)
+                for template in templates:
+                    result = self._benchmark(user, size, template, repeat)
+                    results.append(result)
+                    self.stdout.write(
+                        f"size={size:<3} template={template:<10} "
+                        f"render p50={result['render']['p50_ms']:>8}ms "
+                        f"p95={result['render']['p95_ms']:>8}ms "
+                        f"pdf={result['resume_pdf_bytes']:>8}B "
+                        f"alloc={result['render_peak_kib']}KiB"
+                    )
+                transaction.set_rollback(True)
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'sizes': sizes,
+            'templates': templates,
+            'peak_rss_kb': peak_rss_kb(),
+            'results': results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} result(s) to {options['output']}"))
+
+    def _create_profile(self, size):
+        """Create a throwaway user with `size` entries of each kind."""
+        User = get_user_model()
+        token = uuid.uuid4().hex[:12]
+        user = User.objects.create(
+            username=f"bench_{token}",
+            email=f"bench_{token}@example.com",
+            first_name="Bench",
+            last_name="Mark",
+            phone="+1 555 0100",
+        )
+        Profile.objects.create(
+            user=user,
+            career_objective="Build reliable software that helps people do their jobs.",
+            summary="Engineer with experience across backend services, data pipelines and web frontends. " * 3,
+            skills=", ".join(f"Skill {i}" for i in range(20)),
+            location="Berlin, Germany",
+            linkedin_url="https://linkedin.com/in/benchmark",
+            github_url="https://github.com/benchmark",
+        )
+        description = (
+            "Led a team delivering customer-facing features, improved service latency, "
+            "introduced automated testing and mentored junior engineers. "
+        ) * 3
+        for i in range(size):
+            start = date(2000 + i % 24, 1 + i % 12, 1)
+            Experience.objects.create(
+                user=user,
+                company=f"Company {i}",
+                position=f"Senior Engineer {i}",
+                location="Remote",
+                start_date=start,
+                end_date=date(start.year + 1, start.month, 1),
+                description=description,
+            )
+            Education.objects.create(
+                user=user,
+                institution=f"University {i}",
+                degree="bachelor",
+                field_of_study="Computer Science",
+                start_date=start,
+                end_date=date(start.year + 1, start.month, 1),
+                grade="3.8 GPA",
+                description="Coursework in algorithms, distributed systems and databases.",
+            )
+            Project.objects.create(
+                user=user,
+                title=f"Project {i}",
+                description=description,
+                technologies="Python, Django, PostgreSQL, React",
+                project_url=f"https://example.com/project-{i}",
+                start_date=start,
+            )
+        return user
+
+    def _benchmark(self, user, size, template, repeat):
+        """Time each pipeline stage `repeat` times for one template."""
+        success, resume_content, _ = AIResumeGenerator(user)._generate_fallback_resume(template=template)
+
+        format_samples, portfolio_samples, render_samples = [], [], []
+        resume_pdf_bytes = portfolio_pdf_bytes = 0
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            resume_html = format_resume_for_pdf(user, resume_content)
+            format_samples.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            portfolio_html = create_portfolio_html(user)
+            portfolio_samples.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with render_pdf(resume_html, template) as pdf_file:
+                render_samples.append(time.perf_counter() - started)
+                resume_pdf_bytes = pdf_file.seek(0, 2)
+
+            with render_pdf(portfolio_html, template) as pdf_file:
+                portfolio_pdf_bytes = pdf_file.seek(0, 2)
+
+        return {
+            'size': size,
+            'template': template,
+            'format_resume_for_pdf': summarize(format_samples),
+            'create_portfolio_html': summarize(portfolio_samples),
+            'render': summarize(render_samples),
+            'resume_pdf_bytes': resume_pdf_bytes,
+            'portfolio_pdf_bytes': portfolio_pdf_bytes,
+            'render_peak_kib': peak_render_allocation_kib(resume_html, template),
+        }
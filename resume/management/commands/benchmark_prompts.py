@@ -0,0 +1,169 @@
+import json
+import logging
+import platform
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from resume.management.commands.benchmark_pdf import Command as PDFBenchmarkCommand, summarize
+from resume.llm_usage import estimate_tokens
+from resume.services import AIResumeGenerator, RESUME_OUTPUT_FORMAT, TEMPLATE_INSTRUCTIONS
+
+
+def legacy_resume_prompt(data, template='modern'):
+    """
+    The resume prompt as built before PromptBuilder: every entry in full,
+    assembled with repeated string concatenation. Kept as the benchmark baseline.
+    """
+    template_style = TEMPLATE_INSTRUCTIONS.get(template, TEMPLATE_INSTRUCTIONS['modern'])
+    prompt = f"""Create a professional, well-structured resume for the following candidate. 
+
+STYLE REQUIREMENTS: {template_style}
+
+Format it with clear sections and use professional language that highlights key achievements.
+
+PERSONAL INFORMATION:
+Name: {data['name']}
+Email: {data['email']}
+Phone: {data['phone']}
+Location: {data['profile']['location'] if data['profile'] else ''}
+
+"""
+    if data['profile']:
+        if data['profile']['career_objective']:
+            prompt += f"CAREER OBJECTIVE:\n{data['profile']['career_objective']}\n\n"
+        if data['profile']['summary']:
+            prompt += f"PROFESSIONAL SUMMARY:\n{data['profile']['summary']}\n\n"
+        if data['profile']['skills']:
+            prompt += f"SKILLS:\n{', '.join(data['profile']['skills'])}\n\n"
+
+    if data['education']:
+        prompt += "EDUCATION:\n"
+        for edu in data['education']:
+            prompt += f"- {edu['degree']} in {edu['field']}, {edu['institution']} ({edu['start_date']} - {edu['end_date']})\n"
+            if edu['grade']:
+                prompt += f"  Grade: {edu['grade']}\n"
+            if edu['description']:
+                prompt += f"  {edu['description']}\n"
+        prompt += "\n"
+
+    if data['experience']:
+        prompt += "WORK EXPERIENCE:\n"
+        for exp in data['experience']:
+            prompt += f"- {exp['position']} at {exp['company']} ({exp['start_date']} - {exp['end_date']})\n"
+            prompt += f"  {exp['description']}\n"
+        prompt += "\n"
+
+    if data['projects']:
+        prompt += "PROJECTS:\n"
+        for proj in data['projects']:
+            prompt += f"- {proj['title']}\n"
+            prompt += f"  Technologies: {', '.join(proj['technologies'])}\n"
+            prompt += f"  {proj['description']}\n"
+        prompt += "\n"
+
+    prompt += RESUME_OUTPUT_FORMAT
+    return prompt
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the token-budgeted resume prompt builder against the previous "
+        "builder for synthetic profiles: estimated prompt tokens, build time and "
+        "entries trimmed or dropped. Synthetic data is created in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,5,10,25,50",
+            help="Comma-separated number of experience/education/project entries per profile (default: 1,5,10,25,50)",
+        )
+        parser.add_argument(
+            "--budget",
+            type=int,
+            default=None,
+            help="Prompt token budget (default: settings.RESUME_PROMPT_TOKEN_BUDGET)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Timed builds per builder and size (default: 50)",
+        )
+        parser.add_argument(
+            "--output",
+            default="prompt_benchmark.json",
+            help="Path of the JSON report (default: prompt_benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        repeat = max(1, options["repeat"])
+        if options["budget"] is not None:
+            settings.RESUME_PROMPT_TOKEN_BUDGET = options["budget"]
+        # One compaction log line per build would drown the results
+        logging.getLogger('resume.services').setLevel(logging.WARNING)
+
+        results = []
+        for size in sizes:
+            with transaction.atomic():
+                user = PDFBenchmarkCommand()._create_profile(size)
+                result = self._benchmark(user, size, repeat)
+                results.append(result)
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"size={size:<3} "
+                f"legacy={result['legacy']['tokens']:>6} tokens {result['legacy']['build']['p50_ms']:>7}ms  "
+                f"budgeted={result['budgeted']['tokens']:>6} tokens {result['budgeted']['build']['p50_ms']:>7}ms  "
+                f"trimmed={result['budgeted']['trimmed']:<3} dropped={result['budgeted']['dropped']}"
+            )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'sizes': sizes,
+            'results': results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} result(s) to {options['output']}"))
+
+    def _benchmark(self, user, size, repeat):
+        """Time both builders `repeat` times on one profile."""
+        generator = AIResumeGenerator(user)
+        data = generator._gather_user_data()
+
+        legacy_samples, budgeted_samples = [], []
+        legacy_prompt = budgeted_prompt = ''
+        for _ in range(repeat):
+            started = time.perf_counter()
+            legacy_prompt = legacy_resume_prompt(data)
+            legacy_samples.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            budgeted_prompt = generator._build_prompt(data, 'resume')
+            budgeted_samples.append(time.perf_counter() - started)
+
+        return {
+            'size': size,
+            'legacy': {
+                'tokens': estimate_tokens(legacy_prompt),
+                'chars': len(legacy_prompt),
+                'build': summarize(legacy_samples),
+            },
+            'budgeted': {
+                'tokens': estimate_tokens(budgeted_prompt),
+                'chars': len(budgeted_prompt),
+                'build': summarize(budgeted_samples),
+                'trimmed': sum(1 for c in generator.prompt_compaction if c['action'] == 'trimmed'),
+                'dropped': sum(1 for c in generator.prompt_compaction if c['action'] == 'dropped'),
+            },
+        }
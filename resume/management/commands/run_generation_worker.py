@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from resume.generation_jobs import claim_next_generation_job, run_generation_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued AI generation jobs from the database. Runs until stopped "
+        "unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=2,
+            help="Jobs processed in parallel (default: 2)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty (default: 1.0)",
+        )
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=None,
+            help="Seconds a claimed job stays leased before another worker may retry it "
+                 "(default: settings.GENERATION_JOB_VISIBILITY_TIMEOUT)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the current queue and exit instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.processed = 0
+
+        self.stdout.write(self.style.SUCCESS(f"Generation worker started with {concurrency} slot(s)."))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            slots = [executor.submit(self._run_slot, options) for _ in range(concurrency)]
+            try:
+                while not all(slot.done() for slot in slots):
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING("Interrupted, finishing running jobs..."))
+                self._stop.set()
+            for slot in slots:
+                slot.result()
+
+        self.stdout.write(self.style.SUCCESS(f"Generation worker stopped after {self.processed} job(s)."))
+
+    def _run_slot(self, options):
+        """Claim and run jobs one at a time until stopped (or the queue is empty with --once)."""
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                job = claim_next_generation_job(options["visibility_timeout"])
+                if job is None:
+                    if options["once"]:
+                        break
+                    self._stop.wait(options["poll_interval"])
+                    continue
+
+                started = time.monotonic()
+                job = run_generation_job(job, options["visibility_timeout"])
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self.processed += 1
+
+                if job.status == job.STATUS_DONE:
+                    self.stdout.write(self.style.SUCCESS(f"Generated {job} in {elapsed:.2f}s"))
+                elif job.status == job.STATUS_QUEUED:
+                    self.stdout.write(self.style.WARNING(f"Retrying {job} later: {job.error}"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"Failed {job}: {job.error}"))
+        finally:
+            close_old_connections()
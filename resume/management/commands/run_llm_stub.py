@@ -0,0 +1,268 @@
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+RESUME_SECTIONS = ['Professional Summary', 'Work Experience', 'Education', 'Projects', 'Skills']
+WORDS = (
+    'designed built led shipped improved scaled automated reduced latency throughput reliability '
+    'team platform service pipeline customers revenue migration architecture python django postgres '
+    'aws kubernetes react testing delivery mentoring roadmap stakeholders analytics dashboards'
+).split()
+
+
+def stub_completion_tokens(system_prompt, count, rng):
+    """
+    Build `count` tokens of plausible output: resume-shaped HTML when the
+    system prompt asks for a resume, plain paragraphs otherwise.
+    """
+    tokens = []
+    html = 'resume' in system_prompt.lower()
+    section = 0
+    if html:
+        tokens += ['<div class="header">', '<h1>Stub Candidate</h1>', '</div>']
+    while len(tokens) < count:
+        if html:
+            tokens += ['<div class="section">', f'<h2>{RESUME_SECTIONS[section % len(RESUME_SECTIONS)]}</h2>', '<p>']
+            section += 1
+        tokens += [f'{rng.choice(WORDS)} ' for _ in range(40)]
+        tokens += ['</p>', '</div>'] if html else ['\n\n']
+    return tokens[:count]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible endpoint: POST /v1/chat/completions (plain
+    and streamed) and GET /v1/models.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': self.server.config['model'], 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}})
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+            return
+
+        started = time.monotonic()
+        rng = random.Random()
+        time.sleep(max(0.0, config['latency'] + rng.uniform(-config['jitter'], config['jitter'])))
+
+        if rng.random() < config['error_rate']:
+            status = config['error_status']
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            self._send_json(status, {'error': {'message': 'Simulated failure from the LLM stub', 'type': 'server_error'}}, headers)
+            self.server.record(self, status, 0, started)
+            return
+
+        messages = body.get('messages', [])
+        system_prompt = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+        count = min(config['completion_tokens'], body.get('max_tokens') or config['completion_tokens'])
+        tokens = stub_completion_tokens(system_prompt, count, rng)
+        model = body.get('model') or config['model']
+        completion_id = f'chatcmpl-stub-{uuid.uuid4().hex[:12]}'
+        per_token = 1.0 / config['tokens_per_second'] if config['tokens_per_second'] > 0 else 0.0
+
+        if body.get('stream'):
+            sent = self._stream(completion_id, model, tokens, per_token)
+            self.server.record(self, 200, sent, started, stream=True)
+            return
+
+        time.sleep(per_token * len(tokens))
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': ''.join(tokens)},
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(tokens),
+                'total_tokens': prompt_tokens + len(tokens),
+            },
+        })
+        self.server.record(self, 200, len(tokens), started)
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, completion_id, model, tokens, per_token):
+        """
+        Send tokens as chat.completion.chunk events; returns how many were
+        sent before the client disconnected.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+
+        sent = 0
+        try:
+            event({'role': 'assistant', 'content': ''})
+            for token in tokens:
+                time.sleep(per_token)
+                event({'content': token})
+                sent += 1
+            event({}, 'stop')
+            self._write_chunk(b'data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        return sent
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config, log):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.log = log
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def handle_error(self, request, client_address):
+        # Clients closing idle keep-alive connections are not errors
+        exc = sys.exc_info()[1]
+        if not isinstance(exc, (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def record(self, handler, status, tokens, started, stream=False):
+        with self._lock:
+            self.requests += 1
+            if status >= 400:
+                self.errors += 1
+        self.log(status, f"{handler.command} {handler.path} {status} "
+                         f"{'stream ' if stream else ''}{tokens} tokens {time.monotonic() - started:.2f}s")
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local OpenAI-compatible chat completions server with simulated "
+        "latency, token throughput and errors. Point OPENAI_BASE_URL at it "
+        "(e.g. http://127.0.0.1:8001/v1) to exercise the generation code "
+        "without spending tokens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+        parser.add_argument("--port", type=int, default=8001, help="Port to listen on (default: 8001)")
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.5,
+            help="Seconds before the first token (default: 0.5)",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=0.1,
+            help="Random +/- seconds added to --latency (default: 0.1)",
+        )
+        parser.add_argument(
+            "--tokens-per-second",
+            type=float,
+            default=50.0,
+            help="Output throughput; 0 sends everything at once (default: 50)",
+        )
+        parser.add_argument(
+            "--completion-tokens",
+            type=int,
+            default=400,
+            help="Tokens per completion, capped by the request's max_tokens (default: 400)",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests answered with an error (default: 0)",
+        )
+        parser.add_argument(
+            "--error-status",
+            type=int,
+            default=500,
+            help="HTTP status of simulated errors, e.g. 429 or 503 (default: 500)",
+        )
+        parser.add_argument("--model", default="gpt-3.5-turbo", help="Model name reported by the stub")
+        parser.add_argument("--quiet", action="store_true", help="Do not log each request")
+
+    def handle(self, *args, **options):
+        config = {
+            'latency': options["latency"],
+            'jitter': options["jitter"],
+            'tokens_per_second': options["tokens_per_second"],
+            'completion_tokens': max(1, options["completion_tokens"]),
+            'error_rate': options["error_rate"],
+            'error_status': options["error_status"],
+            'model': options["model"],
+        }
+
+        def log(status, line):
+            if options["quiet"]:
+                return
+            style = self.style.SUCCESS if status < 400 else self.style.ERROR
+            self.stdout.write(style(line))
+
+        server = StubServer((options["host"], options["port"]), config, log)
+        self.stdout.write(self.style.SUCCESS(
+            f"LLM stub listening on http://{options['host']}:{server.server_port}/v1 "
+            f"(latency {config['latency']}s, {config['tokens_per_second']} tokens/s, error rate {config['error_rate']})"
+        ))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.WARNING(
+                f"LLM stub stopped after {server.requests} request(s), {server.errors} error(s)."
+            ))
@@ -0,0 +1,64 @@
+import time
+from django.core.management.base import BaseCommand
+
+from resume.pdf_jobs import claim_next_pdf_job, run_pdf_job, requeue_stale_pdf_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued PDF render jobs from the database. Runs until stopped "
+        "unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty (default: 1.0)",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=600,
+            help="Requeue jobs that have been running longer than this many seconds (default: 600)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the current queue and exit instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options["poll_interval"]
+        stale_after = options["stale_after"]
+        processed = 0
+
+        self.stdout.write(self.style.SUCCESS("PDF worker started."))
+
+        try:
+            while True:
+                job = claim_next_pdf_job()
+                if job is None:
+                    requeued = requeue_stale_pdf_jobs(stale_after)
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale job(s)."))
+                        continue
+                    if options["once"]:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                started = time.monotonic()
+                job = run_pdf_job(job)
+                elapsed = time.monotonic() - started
+                processed += 1
+
+                if job.status == job.STATUS_DONE:
+                    self.stdout.write(self.style.SUCCESS(f"Rendered {job} in {elapsed:.2f}s"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"Failed {job}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrupted."))
+
+        self.stdout.write(self.style.SUCCESS(f"PDF worker stopped after {processed} job(s)."))
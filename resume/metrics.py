@@ -0,0 +1,170 @@
+"""
+In-process timing metrics for the PDF pipeline.
+
+Each download records how long it spent in every stage (ORM queries, HTML
+assembly, cache lookup, CSS, WeasyPrint layout, PDF write) in a
+PDFRenderTrace. Finishing the trace feeds per-stage histograms and emits a
+single structured log line. Histograms are per process, so with several
+gunicorn workers each one reports its own numbers.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (milliseconds) of the histogram buckets; larger values go to an overflow bucket
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in milliseconds.
+
+    Percentiles are estimated as the upper bound of the bucket that contains
+    them, which keeps memory constant regardless of traffic.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value_ms
+            self.max = max(self.max, value_ms)
+
+    def percentile(self, pct):
+        """Return the estimated value at `pct` (0-100), or None when empty."""
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean_ms': round(self.total / self.count, 2) if self.count else None,
+                'p50_ms': _round(self.percentile(50)),
+                'p95_ms': _round(self.percentile(95)),
+                'p99_ms': _round(self.percentile(99)),
+                'max_ms': round(self.max, 2),
+                'buckets': {
+                    (f"le_{bound}" if i < len(self.buckets) else 'inf'): count
+                    for i, (bound, count) in enumerate(zip(self.buckets + (None,), self._counts))
+                },
+            }
+
+
+class MetricsRegistry:
+    """
+    Named histograms for this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, value_ms):
+        self.histogram(name).observe(value_ms)
+
+    def snapshot(self):
+        """Return a JSON-serializable view of every histogram."""
+        return {name: self._histograms[name].snapshot() for name in sorted(self._histograms)}
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {}
+
+
+metrics_registry = MetricsRegistry()
+
+
+class PDFRenderTrace:
+    """
+    Stage timings for one PDF download.
+
+    Durations are collected in `timings` (seconds), which is also the dict
+    handed to the render functions so worker-side stages end up here too.
+    """
+
+    def __init__(self, document_type, template=None):
+        self.document_type = document_type
+        self.template = template
+        self.timings = {}
+        self._started = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block and add it to stage `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def finish(self, outcome, **fields):
+        """
+        Record the trace in the histograms and log it. Later calls are ignored.
+
+        Args:
+            outcome: How the request ended (hit, miss, not_modified, busy, ...)
+            **fields: Extra values to include in the log line
+        """
+        if self._finished:
+            return
+        self._finished = True
+
+        total_ms = (time.perf_counter() - self._started) * 1000
+        stages_ms = {name: round(seconds * 1000, 2) for name, seconds in self.timings.items()}
+
+        for name, value_ms in stages_ms.items():
+            metrics_registry.observe(f"pdf.stage.{name}", value_ms)
+        metrics_registry.observe(f"pdf.total.{self.document_type}", total_ms)
+        metrics_registry.observe(f"pdf.outcome.{outcome}", total_ms)
+
+        record = {
+            'event': 'pdf_render',
+            'document_type': self.document_type,
+            'template': self.template,
+            'outcome': outcome,
+            'total_ms': round(total_ms, 2),
+            'stages_ms': stages_ms,
+        }
+        record.update(fields)
+        logger.info(json.dumps(record, sort_keys=True))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resume', '0010_generationrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template', models.CharField(choices=[('modern', 'Modern Professional'), ('classic', 'Classic Traditional'), ('creative', 'Creative Bold'), ('minimal', 'Minimal Clean'), ('executive', 'Executive Premium'), ('technical', 'Technical Expert')], max_length=50)),
+                ('section', models.CharField(choices=[('header', 'Header'), ('summary', 'Summary'), ('experience', 'Experience'), ('education', 'Education'), ('projects', 'Projects'), ('skills', 'Skills')], max_length=20)),
+                ('fingerprint', models.CharField(max_length=128)),
+                ('content', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resume_sections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resume Section',
+                'verbose_name_plural': 'Resume Sections',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumesection',
+            constraint=models.UniqueConstraint(fields=('user', 'template', 'section'), name='unique_resume_section'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resume', '0011_resumesection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='What was generated (resume, cover_letter, resume_section:<name>)', max_length=40)),
+                ('template', models.CharField(blank=True, max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('stream', models.BooleanField(default=False)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('error', 'Error'), ('unavailable', 'Unavailable'), ('timeout', 'Deadline exceeded'), ('circuit_open', 'Circuit open'), ('cancelled', 'Cancelled')], default='ok', max_length=20)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('estimated_tokens', models.BooleanField(default=False, help_text='Token counts estimated (streamed responses carry no usage)')),
+                ('latency_ms', models.PositiveIntegerField(default=0, help_text='Wall time of the call')),
+                ('ttft_ms', models.PositiveIntegerField(blank=True, help_text='Time to first token (streamed calls)', null=True)),
+                ('cost', models.DecimalField(decimal_places=6, default=0, help_text='Estimated cost in USD', max_digits=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'LLM Usage',
+                'verbose_name_plural': 'LLM Usage',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='resume_llmu_created_6b44f6_idx')],
+            },
+        ),
+    ]
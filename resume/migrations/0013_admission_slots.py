@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resume', '0012_llmusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('active', 'Generating'), ('waiting', 'Waiting')], max_length=10)),
+                ('number', models.PositiveSmallIntegerField()),
+                ('holder', models.CharField(blank=True, help_text='Random ID of the request holding the slot', max_length=32)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Admission Slot',
+                'verbose_name_plural': 'Admission Slots',
+                'ordering': ['kind', 'number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserRateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='generation_rate_bucket', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Rate Bucket',
+                'verbose_name_plural': 'User Rate Buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='admissionslot',
+            constraint=models.UniqueConstraint(fields=('kind', 'number'), name='unique_admission_slot'),
+        ),
+        migrations.AddIndex(
+            model_name='userratebucket',
+            index=models.Index(fields=['updated_at'], name='resume_user_updated_763ae4_idx'),
+        ),
+    ]
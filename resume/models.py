@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import URLValidator
+from django.utils import timezone
 
 
 class Profile(models.Model):
@@ -199,6 +200,40 @@ class GeneratedResume(models.Model):
         return f"{self.title} - {self.user.get_full_name()}"
 
 
+class ResumeSection(models.Model):
+    """
+    AI-generated HTML of one resume section for a user and template.
+    `fingerprint` hashes the section's source rows together with the prompt
+    version and model parameters; section-mode generation only re-prompts
+    sections whose fingerprint changed and reuses the stored HTML otherwise.
+    """
+    SECTION_CHOICES = [
+        ('header', 'Header'),
+        ('summary', 'Summary'),
+        ('experience', 'Experience'),
+        ('education', 'Education'),
+        ('projects', 'Projects'),
+        ('skills', 'Skills'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resume_sections')
+    template = models.CharField(max_length=50, choices=GeneratedResume.TEMPLATE_CHOICES)
+    section = models.CharField(max_length=20, choices=SECTION_CHOICES)
+    fingerprint = models.CharField(max_length=128)
+    content = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resume Section'
+        verbose_name_plural = 'Resume Sections'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'template', 'section'], name='unique_resume_section'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_section_display()} ({self.template}) - {self.user.email}"
+
+
 class CoverLetter(models.Model):
     """
     Stores AI-generated cover letters for users.
@@ -233,3 +268,233 @@ class CoverLetter(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.company_name} - {self.user.get_full_name()}"
+
+
+class PDFRenderJob(models.Model):
+    """
+    Queued PDF render for a resume, cover letter or portfolio.
+    Processed by the `run_pdf_worker` management command; the finished
+    file lives in the PDF cache under `cache_key`.
+    """
+    DOCUMENT_CHOICES = [
+        ('resume', 'Resume'),
+        ('cover_letter', 'Cover Letter'),
+        ('portfolio', 'Portfolio'),
+    ]
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pdf_render_jobs')
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_CHOICES)
+    object_id = models.PositiveIntegerField(blank=True, null=True, help_text="Resume or cover letter ID (empty for portfolio)")
+    template = models.CharField(max_length=50, blank=True, help_text="Template override (empty uses the document's own)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    filename = models.CharField(max_length=255, blank=True)
+    cache_key = models.CharField(max_length=64, blank=True, help_text="PDF cache key of the rendered file")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'PDF Render Job'
+        verbose_name_plural = 'PDF Render Jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_document_type_display()} PDF job #{self.pk} ({self.status})"
+
+
+class GenerationJob(models.Model):
+    """
+    Queued AI generation of a resume or cover letter.
+    Processed by the `run_generation_worker` management command. A running
+    job is leased until `locked_until`; if its worker dies, the job becomes
+    claimable again once the lease expires (visibility timeout).
+    """
+    DOCUMENT_CHOICES = [
+        ('resume', 'Resume'),
+        ('cover_letter', 'Cover Letter'),
+    ]
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='generation_jobs')
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_CHOICES)
+    template = models.CharField(max_length=50, blank=True)
+    params = models.JSONField(default=dict, blank=True, help_text="Generation inputs (e.g. company and position for cover letters)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not claimed before this time (retry backoff)")
+    locked_until = models.DateTimeField(blank=True, null=True, help_text="Lease of the worker running the job")
+    result_id = models.PositiveIntegerField(blank=True, null=True, help_text="ID of the generated resume or cover letter")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Generation Job'
+        verbose_name_plural = 'Generation Jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_document_type_display()} generation job #{self.pk} ({self.status})"
+    
+    @property
+    def is_pending(self):
+        return self.status in (self.STATUS_QUEUED, self.STATUS_RUNNING)
+
+
+class GenerationRequest(models.Model):
+    """
+    Idempotency key of a submitted generate form.
+    The form carries a random key; a resubmission or double click with the
+    same key is answered with the first submission's result instead of
+    starting another generation. The record is deleted if the generation
+    fails, so the same form can be submitted again.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='generation_requests')
+    key = models.CharField(max_length=64)
+    document_type = models.CharField(max_length=20, choices=GenerationJob.DOCUMENT_CHOICES)
+    result_id = models.PositiveIntegerField(blank=True, null=True, help_text="ID of the generated resume or cover letter")
+    job = models.ForeignKey(GenerationJob, on_delete=models.SET_NULL, blank=True, null=True, related_name='requests')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Generation Request'
+        verbose_name_plural = 'Generation Requests'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_generation_request_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_document_type_display()} request {self.key}"
+    
+    @property
+    def is_pending(self):
+        return self.result_id is None and self.job_id is None
+
+
+class LLMUsage(models.Model):
+    """
+    One OpenAI call: model, tokens, timings, outcome and estimated cost.
+    Rows are written in batches by resume.llm_usage.usage_recorder.
+    """
+    OUTCOME_OK = 'ok'
+    OUTCOME_CHOICES = [
+        (OUTCOME_OK, 'OK'),
+        ('error', 'Error'),
+        ('unavailable', 'Unavailable'),
+        ('timeout', 'Deadline exceeded'),
+        ('circuit_open', 'Circuit open'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='llm_usage')
+    kind = models.CharField(max_length=40, help_text="What was generated (resume, cover_letter, resume_section:<name>)")
+    template = models.CharField(max_length=50, blank=True)
+    model = models.CharField(max_length=50)
+    stream = models.BooleanField(default=False)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, default=OUTCOME_OK)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    estimated_tokens = models.BooleanField(default=False, help_text="Token counts estimated (streamed responses carry no usage)")
+    latency_ms = models.PositiveIntegerField(default=0, help_text="Wall time of the call")
+    ttft_ms = models.PositiveIntegerField(blank=True, null=True, help_text="Time to first token (streamed calls)")
+    cost = models.DecimalField(max_digits=10, decimal_places=6, default=0, help_text="Estimated cost in USD")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'LLM Usage'
+        verbose_name_plural = 'LLM Usage'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} via {self.model} ({self.outcome}, {self.total_tokens} tokens)"
+    
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+
+class AdmissionSlot(models.Model):
+    """
+    One of the shared inline-generation slots (or wait-queue places) of
+    resume.admission. A slot is held while `lease_until` is in the future;
+    it is claimed and released with conditional UPDATEs, so every gunicorn
+    worker sees the same count, and a slot whose worker was killed frees
+    itself when its lease expires.
+    """
+    KIND_ACTIVE = 'active'
+    KIND_WAITING = 'waiting'
+    KIND_CHOICES = [
+        (KIND_ACTIVE, 'Generating'),
+        (KIND_WAITING, 'Waiting'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    number = models.PositiveSmallIntegerField()
+    holder = models.CharField(max_length=32, blank=True, help_text="Random ID of the request holding the slot")
+    lease_until = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Admission Slot'
+        verbose_name_plural = 'Admission Slots'
+        ordering = ['kind', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'number'], name='unique_admission_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} slot {self.number}"
+
+
+class UserRateBucket(models.Model):
+    """
+    Token bucket of one user's AI generations (see resume.admission).
+    Updated with conditional UPDATEs so all workers share one budget; rows
+    idle for longer than settings.LLM_USER_BUCKET_TTL are deleted.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='generation_rate_bucket')
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'User Rate Bucket'
+        verbose_name_plural = 'User Rate Buckets'
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"Generation tokens of {self.user}"
@@ -0,0 +1,158 @@
+"""
+Process-wide OpenAI client.
+
+Creating an OpenAI client per request means a new HTTP connection (and TLS
+handshake) for every generation. The registry here builds one client per
+process on top of a pooled, keep-alive httpx transport with explicit
+connect/read timeouts, and counts how the pool is used.
+"""
+import logging
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from openai import OpenAI
+
+from .metrics import metrics_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """
+    httpx transport that counts requests, in-flight requests and errors,
+    and records time-to-response-headers in the metrics registry.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors = 0
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return super().handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            metrics_registry.observe('openai.http.response_headers', (time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        """Return request counters and the state of the underlying connection pool."""
+        connections = list(getattr(self._pool, 'connections', []))
+        return {
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'errors': self.errors,
+            'connections': len(connections),
+            'idle_connections': sum(1 for connection in connections if connection.is_idle()),
+        }
+
+
+# Sent when OPENAI_BASE_URL points at a server that does not check keys
+# (e.g. `python manage.py run_llm_stub`) and no OPENAI_API_KEY is set
+LOCAL_API_KEY = 'sk-local'
+
+
+def get_api_key():
+    """
+    Return the API key to use: settings.OPENAI_API_KEY, or a placeholder when
+    only OPENAI_BASE_URL is configured; '' when neither is set.
+    """
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    if not api_key and getattr(settings, 'OPENAI_BASE_URL', ''):
+        return LOCAL_API_KEY
+    return api_key
+
+
+class OpenAIClientRegistry:
+    """
+    Lazily built OpenAI clients, one per API key and base URL, shared by all
+    requests handled by this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get_client(self, api_key=None, base_url=None):
+        """
+        Return the shared client for `api_key` (get_api_key() by default).
+
+        Returns:
+            OpenAI client, or None when no API key is configured or the client
+            cannot be created
+        """
+        api_key = api_key or get_api_key()
+        if not api_key:
+            return None
+        base_url = base_url or getattr(settings, 'OPENAI_BASE_URL', '') or None
+
+        key = (api_key, base_url)
+        entry = self._clients.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is None:
+                    try:
+                        entry = self._clients[key] = self._build_client(api_key, base_url)
+                    except Exception as e:
+                        logger.warning(f"Could not initialize OpenAI client: {e}")
+                        return None
+        return entry[0]
+
+    def _build_client(self, api_key, base_url):
+        transport = InstrumentedTransport(
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 10),
+                max_keepalive_connections=getattr(settings, 'OPENAI_MAX_KEEPALIVE_CONNECTIONS', 5),
+                keepalive_expiry=getattr(settings, 'OPENAI_KEEPALIVE_EXPIRY', 30.0),
+            ),
+        )
+        timeout = httpx.Timeout(
+            getattr(settings, 'OPENAI_READ_TIMEOUT', 60.0),
+            connect=getattr(settings, 'OPENAI_CONNECT_TIMEOUT', 5.0),
+        )
+        http_client = httpx.Client(transport=transport, timeout=timeout)
+        # Retries are done by llm_resilience within the request deadline
+        client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, timeout=timeout, max_retries=0)
+        return client, transport
+
+    def stats(self):
+        """Return pool usage for every client built in this process."""
+        return [
+            dict(transport.stats(), base_url=str(client.base_url))
+            for client, transport in list(self._clients.values())
+        ]
+
+    def close(self):
+        """Close all clients and their connections."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client, _ in clients.values():
+            client.close()
+
+
+openai_clients = OpenAIClientRegistry()
+
+
+def get_openai_client():
+    """
+    Return the shared OpenAI client configured by settings, or None.
+    """
+    return openai_clients.get_client()
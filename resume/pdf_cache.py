@@ -0,0 +1,370 @@
+"""
+Content-addressed cache for rendered PDF documents.
+
+PDFs are keyed by a hash of the final HTML and the template CSS version, so a
+download whose content and template have not changed is served from storage
+instead of running a full WeasyPrint layout again.
+
+Each process keeps a running total of the cache size, so a write only lists
+the storage when the total exceeds MAX_SIZE, or once RESCAN_INTERVAL seconds
+have passed since the last listing to pick up other processes' writes. The
+listing also removes temp files left behind by renders that crashed.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+DEFAULT_PDF_CACHE = {
+    'BACKEND': 'resume.pdf_cache.LocalPDFCacheStorage',
+    'LOCATION': os.path.join(str(settings.BASE_DIR), 'pdf_cache'),
+    'MAX_SIZE': 256 * 1024 * 1024,
+    'RESCAN_INTERVAL': 60,
+}
+
+# Eviction frees space down to this share of MAX_SIZE, so the writes that
+# follow fit without listing the storage again
+EVICTION_TARGET = 0.9
+
+# Temp files (.part) older than this many seconds belong to a render or write
+# that died; far longer than any render is allowed to take
+STALE_TEMP_AGE = 3600
+
+
+def pdf_cache_key(html_content, template='modern', fit_pages=None):
+    """
+    Build the cache key for a rendered document.
+
+    Args:
+        html_content: Final HTML string passed to WeasyPrint
+        template: Template ID used for styling
+        fit_pages: Page target for fit-to-pages renders (None for normal renders)
+
+    Returns:
+        Hex digest identifying the PDF output
+    """
+    from .utils import get_template_css_version
+
+    digest = hashlib.sha256()
+    digest.update(get_template_css_version(template).encode('ascii'))
+    digest.update(b'\0')
+    if fit_pages:
+        digest.update(f'fit:{int(fit_pages)}'.encode('ascii'))
+        digest.update(b'\0')
+    digest.update(html_content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PDFCacheStorage:
+    """
+    Base class for PDF cache storage backends.
+
+    Backends store opaque blobs by key and report enough metadata
+    (size and last access time) for the cache to evict in LRU order.
+    """
+
+    def open(self, key):
+        """Return a readable binary file object for key, or None if missing."""
+        raise NotImplementedError
+
+    def save(self, key, fileobj):
+        """Store the contents of a binary file object under key."""
+        raise NotImplementedError
+
+    def save_path(self, key, path):
+        """Store a finished file from local disk under key, consuming it."""
+        try:
+            with open(path, 'rb') as f:
+                self.save(key, f)
+        finally:
+            os.remove(path)
+
+    def temp_dir(self):
+        """Directory for in-progress renders, or None for the system default."""
+        return None
+
+    def exists(self, key):
+        """Return True if an entry is stored under key."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove the entry for key if present."""
+        raise NotImplementedError
+
+    def touch(self, key):
+        """Mark key as recently used."""
+        raise NotImplementedError
+
+    def size(self, key):
+        """Return the size in bytes of the entry for key, or None if unknown."""
+        return None
+
+    def entries(self):
+        """Yield (key, size_in_bytes, last_used_timestamp) for every entry."""
+        raise NotImplementedError
+
+    def remove_stale_temp_files(self, older_than):
+        """Delete unfinished writes last modified before the `older_than` timestamp; return the count."""
+        return 0
+
+
+class LocalPDFCacheStorage(PDFCacheStorage):
+    """
+    Stores cached PDFs as files on local disk, fanned out by key prefix.
+
+    The file modification time doubles as the LRU timestamp. Renders are
+    written next to the cache so finished files can be moved in with a rename
+    instead of being copied.
+    """
+
+    suffix = '.pdf'
+
+    def __init__(self, location):
+        self.location = str(location)
+
+    def _path(self, key):
+        return os.path.join(self.location, key[:2], key + self.suffix)
+
+    def open(self, key):
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, fileobj):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(fileobj, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_path(self, key, path):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Different filesystem; fall back to copying
+            super().save_path(key, path)
+
+    def temp_dir(self):
+        directory = os.path.join(self.location, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def entries(self):
+        if not os.path.isdir(self.location):
+            return
+        for prefix in os.listdir(self.location):
+            directory = os.path.join(self.location, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                yield name[:-len(self.suffix)], stat.st_size, stat.st_mtime
+
+    def remove_stale_temp_files(self, older_than):
+        if not os.path.isdir(self.location):
+            return 0
+        removed = 0
+        # Renders write to tmp/, save() writes next to the entry
+        for prefix in os.listdir(self.location):
+            directory = os.path.join(self.location, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith('.part'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < older_than:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+class PDFCache:
+    """
+    Size-bounded, LRU-evicted PDF cache on top of a storage backend.
+    """
+
+    def __init__(self, storage, max_size=DEFAULT_PDF_CACHE['MAX_SIZE'],
+                 rescan_interval=DEFAULT_PDF_CACHE['RESCAN_INTERVAL']):
+        self.storage = storage
+        self.max_size = max_size
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        # Estimated bytes stored; None until the storage has been listed
+        self._size = None
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.scans = 0
+        self.stale_temp_files = 0
+
+    def open(self, key):
+        """
+        Return an open binary file for the cached PDF, or None on a miss.
+        The caller is responsible for closing it.
+        """
+        pdf_file = self.storage.open(key)
+        if pdf_file is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.storage.touch(key)
+        return pdf_file
+
+    def contains(self, key):
+        """
+        Return True if key is cached, without opening the file.
+        """
+        return self.storage.exists(key)
+
+    def set(self, key, fileobj):
+        """
+        Store a PDF from a file object and evict old entries if over budget.
+        """
+        self.storage.save(key, fileobj)
+        self._added(key)
+
+    def set_path(self, key, path):
+        """
+        Move a rendered PDF file into the cache and evict if over budget.
+        """
+        self.storage.save_path(key, path)
+        self._added(key)
+
+    def temp_path(self):
+        """
+        Return a fresh path where a render can write its output.
+        """
+        fd, path = tempfile.mkstemp(dir=self.storage.temp_dir(), suffix='.part')
+        os.close(fd)
+        return path
+
+    def _added(self, key):
+        """
+        Count a new entry towards the running size and evict if needed.
+        """
+        size = self.storage.size(key)
+        with self._lock:
+            if (
+                size is not None
+                and self._size is not None
+                and time.monotonic() - self._scanned_at < self.rescan_interval
+            ):
+                # Rewriting an existing key over-counts, which only brings the next listing forward
+                self._size += size
+                if self._size <= self.max_size:
+                    return
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        List the storage and, if it exceeds max_size, remove least recently
+        used entries down to EVICTION_TARGET of it; resets the running size
+        total. Temp files older than STALE_TEMP_AGE are deleted as well.
+
+        Args:
+            keep: Key that must survive this pass (the entry just written)
+        """
+        with self._lock:
+            self.stale_temp_files += self.storage.remove_stale_temp_files(time.time() - STALE_TEMP_AGE)
+            entries = list(self.storage.entries())
+            total = sum(size for _, size, _ in entries)
+            self.scans += 1
+
+            if total > self.max_size:
+                target = self.max_size * EVICTION_TARGET
+                for key, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                    if key == keep:
+                        continue
+                    self.storage.delete(key)
+                    self.evictions += 1
+                    total -= size
+                    if total <= target:
+                        break
+
+            self._size = total
+            self._scanned_at = time.monotonic()
+
+    def stats(self):
+        """Return hit/miss/eviction counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'scans': self.scans,
+            'stale_temp_files': self.stale_temp_files,
+            'size': self._size,
+            'max_size': self.max_size,
+        }
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """
+    Return the process-wide PDFCache configured by settings.PDF_CACHE.
+    """
+    global _pdf_cache
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                config = dict(DEFAULT_PDF_CACHE)
+                config.update(getattr(settings, 'PDF_CACHE', {}))
+                storage_class = import_string(config['BACKEND'])
+                _pdf_cache = PDFCache(
+                    storage_class(config['LOCATION']),
+                    max_size=int(config['MAX_SIZE']),
+                    rescan_interval=float(config['RESCAN_INTERVAL']),
+                )
+    return _pdf_cache
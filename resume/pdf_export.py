@@ -0,0 +1,140 @@
+"""
+Bulk ZIP export of a user's resumes and cover letters.
+
+Documents are rendered in parallel (through the PDF cache and render pool)
+and written into a ZIP archive that is streamed to the client while it is
+being produced, so memory use does not grow with the number of documents.
+"""
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import chain
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
+
+from .models import GeneratedResume, CoverLetter
+from .pdf_cache import get_pdf_cache
+from .pdf_jobs import build_pdf_document
+from .utils import render_pdf_to_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied from a cached PDF into the archive per read
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStreamSink:
+    """
+    Write-only file object that collects what ZipFile writes so the
+    generator can hand it to the client and forget it.
+
+    It deliberately has no tell()/seek(), which makes ZipFile use data
+    descriptors instead of seeking back to patch headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def _export_documents(user):
+    """
+    Yield (document_type, obj) for every resume and cover letter of a user.
+    """
+    return chain(
+        (('resume', obj) for obj in GeneratedResume.objects.filter(user=user).iterator()),
+        (('cover_letter', obj) for obj in CoverLetter.objects.filter(user=user).iterator()),
+    )
+
+
+def _archive_name(document_type, obj):
+    folder = 'resumes' if document_type == 'resume' else 'cover_letters'
+    title = get_valid_filename(obj.title) or document_type
+    return f"{folder}/{obj.pk}_{title}.pdf"
+
+
+def stream_documents_zip(user, concurrency=None):
+    """
+    Render all of a user's documents and stream them as a ZIP archive.
+
+    At most `concurrency` renders are in flight at once; documents are added
+    to the archive in the order they finish. Cached PDFs are reused.
+
+    Args:
+        user: Owner of the documents
+        concurrency: Max parallel renders (defaults to settings.PDF_EXPORT_CONCURRENCY)
+
+    Yields:
+        Chunks of the ZIP file as bytes
+    """
+    if concurrency is None:
+        concurrency = getattr(settings, 'PDF_EXPORT_CONCURRENCY', 2)
+    concurrency = max(1, int(concurrency))
+
+    pdf_cache = get_pdf_cache()
+    documents = _export_documents(user)
+    failures = []
+    sink = _ZipStreamSink()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # PDFs are already compressed; deflating them again costs CPU for almost nothing
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            in_flight = {}
+
+            def submit_next():
+                item = next(documents, None)
+                if item is None:
+                    return False
+                # HTML is built here, on the request thread, so worker threads never touch the ORM
+                document_type, obj = item
+                html_content, _, template = build_pdf_document(user, document_type, obj)
+                future = executor.submit(render_pdf_to_cache, html_content, template)
+                in_flight[future] = _archive_name(document_type, obj)
+                return True
+
+            for _ in range(concurrency):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    arcname = in_flight.pop(future)
+                    submit_next()
+
+                    try:
+                        cache_key = future.result()
+                        pdf_file = pdf_cache.storage.open(cache_key)
+                        if pdf_file is None:
+                            raise FileNotFoundError('evicted before export')
+                    except Exception as e:
+                        logger.warning(f"Export of {arcname} for user {user.pk} failed: {e}")
+                        failures.append(f"{arcname}: {e}")
+                        continue
+
+                    with pdf_file, archive.open(arcname, mode='w') as entry:
+                        while True:
+                            chunk = pdf_file.read(EXPORT_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            entry.write(chunk)
+                            yield from sink.drain()
+                    yield from sink.drain()
+
+            if failures:
+                archive.writestr('export_errors.txt', '\n'.join(failures) + '\n')
+
+    # Central directory is written when the archive closes
+    yield from sink.drain()
@@ -0,0 +1,224 @@
+"""
+Background PDF render jobs.
+
+A download can be queued as a PDFRenderJob instead of being rendered inside
+the request. The `run_pdf_worker` management command claims queued jobs from
+the database (no external broker needed), renders them into the PDF cache and
+marks them done so the file can be served from storage.
+"""
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import GeneratedResume, CoverLetter, PDFRenderJob
+from .utils import (
+    render_pdf_to_cache,
+    format_resume_for_pdf,
+    format_cover_letter_for_pdf,
+    create_portfolio_html,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _trace_stage(trace, name):
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+def build_pdf_document(user, document_type, obj=None, template=None, trace=None):
+    """
+    Build the HTML, download filename and template for a document.
+
+    Args:
+        user: Owner of the document
+        document_type: 'resume', 'cover_letter' or 'portfolio'
+        obj: GeneratedResume or CoverLetter instance (None for portfolio)
+        template: Optional template override
+        trace: Optional PDFRenderTrace that receives HTML assembly timings
+
+    Returns:
+        Tuple of (html_content, filename, template)
+    """
+    if document_type == 'resume':
+        template = template or getattr(obj, 'template', 'modern') or 'modern'
+        with _trace_stage(trace, 'html'):
+            html_content = format_resume_for_pdf(user, obj.content)
+        filename = f"resume_{user.username}_{template}.pdf"
+    elif document_type == 'cover_letter':
+        template = template or getattr(obj, 'template', None) or 'classic'
+        with _trace_stage(trace, 'html'):
+            html_content = format_cover_letter_for_pdf(user, obj)
+        filename = f"cover_letter_{obj.company_name}_{obj.position}.pdf"
+    elif document_type == 'portfolio':
+        template = template or 'modern'
+        html_content = create_portfolio_html(user, trace=trace)
+        filename = f"portfolio_{user.username}_{template}.pdf"
+    else:
+        raise ValueError(f"Unknown document type: {document_type}")
+
+    return html_content, filename, template
+
+
+def get_job_document(job):
+    """
+    Load the resume or cover letter a job refers to (None for portfolio).
+    """
+    if job.document_type == 'resume':
+        return GeneratedResume.objects.get(pk=job.object_id, user=job.user)
+    if job.document_type == 'cover_letter':
+        return CoverLetter.objects.get(pk=job.object_id, user=job.user)
+    return None
+
+
+def enqueue_pdf_job(user, document_type, obj=None, template=None):
+    """
+    Queue a PDF render, reusing an identical job that is still pending.
+
+    Returns:
+        PDFRenderJob instance
+    """
+    object_id = obj.pk if obj is not None else None
+    template = template or ''
+
+    pending = PDFRenderJob.objects.filter(
+        user=user,
+        document_type=document_type,
+        object_id=object_id,
+        template=template,
+        status__in=[PDFRenderJob.STATUS_QUEUED, PDFRenderJob.STATUS_RUNNING],
+    ).first()
+    if pending:
+        return pending
+
+    return PDFRenderJob.objects.create(
+        user=user,
+        document_type=document_type,
+        object_id=object_id,
+        template=template,
+    )
+
+
+def claim_next_pdf_job():
+    """
+    Atomically move the oldest queued job to 'running'.
+
+    Uses a conditional UPDATE rather than row locks so it behaves the same on
+    SQLite and PostgreSQL when several workers poll the table.
+
+    Returns:
+        The claimed PDFRenderJob, or None if the queue is empty
+    """
+    while True:
+        job = PDFRenderJob.objects.filter(status=PDFRenderJob.STATUS_QUEUED).order_by('created_at').first()
+        if job is None:
+            return None
+        if claim_pdf_job(job):
+            return job
+        # Another worker took it first; try the next one
+
+
+def claim_pdf_job(job):
+    """
+    Move a queued job to 'running' unless someone else already claimed it.
+
+    Returns:
+        True if this caller claimed the job
+    """
+    now = timezone.now()
+    claimed = PDFRenderJob.objects.filter(pk=job.pk, status=PDFRenderJob.STATUS_QUEUED).update(
+        status=PDFRenderJob.STATUS_RUNNING,
+        started_at=now,
+    )
+    if claimed:
+        job.status = PDFRenderJob.STATUS_RUNNING
+        job.started_at = now
+    return bool(claimed)
+
+
+def run_pdf_job(job):
+    """
+    Render a claimed job into the PDF cache and record the outcome.
+    """
+    try:
+        obj = get_job_document(job)
+        html_content, filename, template = build_pdf_document(
+            job.user, job.document_type, obj, template=job.template or None
+        )
+        cache_key = render_pdf_to_cache(html_content, template)
+
+        job.status = PDFRenderJob.STATUS_DONE
+        job.filename = filename
+        job.cache_key = cache_key
+        job.error = ''
+    except Exception as e:
+        logger.exception(f"PDF render job {job.pk} failed")
+        job.status = PDFRenderJob.STATUS_FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'filename', 'cache_key', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_pdf_jobs(older_than):
+    """
+    Put jobs stuck in 'running' (e.g. after a worker crash) back in the queue.
+
+    Args:
+        older_than: Seconds a job may run before it is considered stale
+
+    Returns:
+        Number of jobs requeued
+    """
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return PDFRenderJob.objects.filter(
+        status=PDFRenderJob.STATUS_RUNNING,
+        started_at__lt=cutoff,
+    ).update(status=PDFRenderJob.STATUS_QUEUED, started_at=None)
+
+
+_prerender_executor = None
+_prerender_lock = threading.Lock()
+
+
+def _get_prerender_executor():
+    global _prerender_executor
+    if _prerender_executor is None:
+        with _prerender_lock:
+            if _prerender_executor is None:
+                _prerender_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PDF_PRERENDER_THREADS', 1),
+                    thread_name_prefix='pdf-prerender',
+                )
+    return _prerender_executor
+
+
+def _prerender(user, document_type, obj):
+    label = f"{document_type} #{obj.pk}"
+    try:
+        html_content, _, template = build_pdf_document(user, document_type, obj)
+        render_pdf_to_cache(html_content, template)
+    except Exception:
+        logger.exception(f"Background pre-render of {label} failed")
+    finally:
+        close_old_connections()
+
+
+def prerender_document(user, document_type, obj):
+    """
+    Build and render a document into the PDF cache in a background thread.
+
+    A download that arrives while the render is in flight waits for it (see
+    render_pdf_to_cache) instead of rendering again.
+
+    Returns:
+        Future for the background render
+    """
+    return _get_prerender_executor().submit(_prerender, user, document_type, obj)
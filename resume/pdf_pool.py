@@ -0,0 +1,330 @@
+"""
+Out-of-process PDF rendering.
+
+WeasyPrint layout is CPU-bound, so renders are sent to a bounded pool of
+worker processes. Web workers only wait on the result, which keeps a slow
+render from blocking unrelated requests handled by the same gunicorn worker.
+
+The job timeout is enforced inside the worker process with SIGALRM, so a
+hung render gives its process and queue slot back instead of running on
+after the caller gave up. A render still running well past its alarm is
+stuck in native code; the pool is then recycled and its processes killed.
+"""
+import atexit
+import logging
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PDF_RENDER_POOL = {
+    'WORKERS': 2,      # 0 renders inline in the web worker
+    'TIMEOUT': 60,     # seconds a caller waits for one render
+    'MAX_QUEUE': 8,    # renders allowed to wait for a free worker
+}
+
+
+class PDFRenderError(Exception):
+    """Base class for PDF render pool failures."""
+
+
+class PDFRenderQueueFull(PDFRenderError):
+    """Raised when the render queue is at capacity."""
+
+
+class PDFRenderTimeout(PDFRenderError):
+    """Raised when a render does not finish within the job timeout."""
+
+
+def _init_worker():
+    """Warm the font configuration once per worker process."""
+    from .utils import stylesheet_registry
+    stylesheet_registry.get_font_config()
+
+
+class _TimeLimit:
+    """
+    Raise PDFRenderTimeout in the current process after `seconds` (SIGALRM).
+
+    Only armed in the main thread of a process with setitimer, i.e. in pool
+    workers; elsewhere (inline renders, Windows) it does nothing.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._previous = None
+
+    def _expired(self, signum, frame):
+        raise PDFRenderTimeout(f'PDF render exceeded {self.seconds}s')
+
+    def __enter__(self):
+        if self.seconds and hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous = signal.signal(signal.SIGALRM, self._expired)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._previous is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous)
+            self._previous = None
+
+
+def _render_job(html_content, template, path, fit_pages=None, scale=None, time_limit=None):
+    """
+    Entry point executed inside a worker process.
+
+    The PDF is written straight to `path` so only the file name, the stage
+    timings and the scale used cross the process boundary, never the
+    document bytes. With `fit_pages` and no known `scale`, the scale is
+    searched for. The render is aborted after `time_limit` seconds.
+    """
+    from .utils import render_pdf, render_pdf_fit_pages
+    timings = {}
+    with _TimeLimit(time_limit), open(path, 'wb') as f:
+        if fit_pages and scale is None:
+            _, scale = render_pdf_fit_pages(html_content, template, fit_pages, target=f, timings=timings)
+        else:
+            scale = scale or 1.0
+            render_pdf(html_content, template, target=f, timings=timings, scale=scale)
+    return {'timings': timings, 'scale': scale}
+
+
+def _render_variants_job(html_content, paths, time_limit=None):
+    """
+    Worker entry point for multi-template renders.
+
+    Returns the stage timings summed over all templates.
+    """
+    from .utils import render_pdf_variants
+    timings = {}
+    with _TimeLimit(time_limit):
+        render_pdf_variants(html_content, paths, timings=timings)
+    return timings
+
+
+class PDFRenderPool:
+    """
+    Bounded process pool for PDF renders.
+
+    At most `workers` renders run at once and at most `max_queue` more may
+    wait; further submissions fail fast with PDFRenderQueueFull.
+    """
+
+    # Seconds past its alarm a render may take before its worker is killed
+    KILL_GRACE = 5
+
+    def __init__(self, workers=2, timeout=60, max_queue=8):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.recycled = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: pango/fontconfig state is not safe to fork
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                    )
+        return self._executor
+
+    def _reset_executor(self, executor=None, kill=False):
+        """
+        Drop the executor so the next job starts a new one.
+
+        Args:
+            executor: Only reset if this is still the current executor
+            kill: Terminate its worker processes, including running renders
+        """
+        with self._lock:
+            if executor is not None and executor is not self._executor:
+                return
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        processes = list(getattr(executor, '_processes', {}).values()) if kill else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def _kill_if_stuck(self, future, executor):
+        """Recycle the pool if a timed-out render ignored its alarm."""
+        if not future.done():
+            logger.error("PDF render is stuck past its time limit; restarting pool")
+            self.recycled += 1
+            self._reset_executor(executor, kill=True)
+
+    def render(self, html_content, path, template='modern', timings=None, fit_pages=None, scale=None):
+        """
+        Render HTML to a PDF file at `path` in a worker process.
+
+        If `timings` is given it is updated with the worker's stage timings.
+        `fit_pages` and `scale` select fit-to-pages rendering (see
+        render_pdf_fit_pages); a known `scale` skips the search.
+
+        Returns:
+            The scale factor the PDF was rendered at
+
+        Raises:
+            PDFRenderQueueFull: if too many renders are already pending
+            PDFRenderTimeout: if the render exceeds the job timeout
+        """
+        job_args = (html_content, template, path, fit_pages, scale)
+        if self.workers <= 0:
+            return self._unpack_result(timings, _render_job(*job_args))
+
+        future = self._submit(_render_job, job_args + (self.timeout,))
+        return self._unpack_result(timings, self._wait(future))
+
+    def render_variants(self, html_content, paths, timings=None):
+        """
+        Render one document in several templates.
+
+        Templates are split across the workers; each worker parses the HTML
+        once and lays it out for every template in its share.
+
+        Args:
+            html_content: HTML string to convert to PDF
+            paths: Dict mapping template ID to the output path
+            timings: Optional dict updated with the summed stage timings
+
+        Returns:
+            The `paths` dict
+
+        Raises:
+            PDFRenderQueueFull: if the queue cannot take all chunks
+            PDFRenderTimeout: if any chunk exceeds the job timeout
+        """
+        templates = list(paths)
+        if not templates:
+            return paths
+        if self.workers <= 0:
+            self._merge_timings(timings, _render_variants_job(html_content, paths))
+            return paths
+
+        chunk_count = min(self.workers, len(templates))
+        chunks = [
+            {template: paths[template] for template in templates[i::chunk_count]}
+            for i in range(chunk_count)
+        ]
+
+        futures = []
+        try:
+            for chunk in chunks:
+                futures.append(self._submit(_render_variants_job, (html_content, chunk, self.timeout)))
+        except PDFRenderError:
+            for future in futures:
+                future.cancel()
+            raise
+
+        for future in futures:
+            self._merge_timings(timings, self._wait(future))
+        return paths
+
+    def _submit(self, fn, args):
+        """Submit a job if a queue slot is free; the slot is released when it finishes."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PDFRenderQueueFull('PDF render queue is full')
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor()
+            raise PDFRenderError('PDF render pool was restarted, please retry')
+        except Exception:
+            self._slots.release()
+            raise
+
+        # Free the slot when the job actually finishes, not when we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        future.executor = executor
+        self.submitted += 1
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            if not future.cancel():
+                # Running: its alarm ends it within `timeout`; if not, kill it
+                timer = threading.Timer(
+                    self.timeout + self.KILL_GRACE, self._kill_if_stuck, (future, future.executor)
+                )
+                timer.daemon = True
+                timer.start()
+            raise PDFRenderTimeout(f'PDF render exceeded {self.timeout}s')
+        except BrokenProcessPool:
+            logger.error("PDF render worker died; restarting pool")
+            self._reset_executor()
+            raise PDFRenderError('PDF render worker crashed')
+
+    @staticmethod
+    def _merge_timings(timings, job_timings):
+        if timings is not None:
+            for name, seconds in job_timings.items():
+                timings[name] = timings.get(name, 0.0) + seconds
+
+    @staticmethod
+    def _unpack_result(timings, result):
+        if timings is not None:
+            timings.update(result['timings'])
+        return result['scale']
+
+    def stats(self):
+        """Return pool configuration and counters."""
+        return {
+            'workers': self.workers,
+            'timeout': self.timeout,
+            'max_queue': self.max_queue,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'recycled': self.recycled,
+        }
+
+    def shutdown(self):
+        """Stop worker processes."""
+        self._reset_executor()
+
+
+_pdf_render_pool = None
+_pdf_render_pool_lock = threading.Lock()
+
+
+def get_pdf_render_pool():
+    """
+    Return the process-wide PDFRenderPool configured by settings.PDF_RENDER_POOL.
+    """
+    global _pdf_render_pool
+    if _pdf_render_pool is None:
+        with _pdf_render_pool_lock:
+            if _pdf_render_pool is None:
+                config = dict(DEFAULT_PDF_RENDER_POOL)
+                config.update(getattr(settings, 'PDF_RENDER_POOL', {}))
+                _pdf_render_pool = PDFRenderPool(
+                    workers=int(config['WORKERS']),
+                    timeout=float(config['TIMEOUT']),
+                    max_queue=int(config['MAX_QUEUE']),
+                )
+                atexit.register(_pdf_render_pool.shutdown)
+    return _pdf_render_pool
@@ -0,0 +1,261 @@
+"""
+Token-budgeted prompt assembly.
+
+Resume prompts used to include every education, experience and project entry
+in full, so long profiles produced prompts of several thousand tokens. The
+PromptBuilder estimates the prompt size locally (CHARS_PER_TOKEN characters
+per token, no tokenizer call) and, when the prompt would exceed
+settings.RESUME_PROMPT_TOKEN_BUDGET, compacts it: first the descriptions of
+the least important entries are shortened, then the least important entries
+are left out. Importance favours recent entries and entries that mention the
+candidate's keywords (their skills by default), or, when the resume targets a
+job description, the relevance scores computed by resume.keywords. Profiles
+that fit the budget produce exactly the prompt they always did.
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from django.conf import settings
+
+from .llm_usage import CHARS_PER_TOKEN, estimate_tokens
+
+
+# Descriptions of compacted entries are cut to about this many characters
+DESCRIPTION_TRIM_CHARS = 280
+
+# Weight of keyword relevance (0..1) against recency (1 for current entries,
+# 0.5 one year after they ended, 0.25 three years after, ...)
+RELEVANCE_WEIGHT = 0.5
+
+# An entry mentioning this many distinct keywords counts as fully relevant
+RELEVANT_KEYWORD_HITS = 3
+
+WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#]*')
+
+
+def format_education(edu):
+    line = f"- {edu['degree']} in {edu['field']}, {edu['institution']} ({edu['start_date']} - {edu['end_date']})"
+    if edu['grade']:
+        line += f"\n  Grade: {edu['grade']}"
+    if edu['description']:
+        line += f"\n  {edu['description']}"
+    return line
+
+
+def format_experience(exp):
+    return f"- {exp['position']} at {exp['company']} ({exp['start_date']} - {exp['end_date']})\n  {exp['description']}"
+
+
+def format_project(proj):
+    return f"- {proj['title']}\n  Technologies: {', '.join(proj['technologies'])}\n  {proj['description']}"
+
+
+# Section -> (formatter, label of an entry for the compaction report)
+ENTRY_FORMATS = {
+    'education': (format_education, lambda edu: f"{edu['degree']} in {edu['field']}, {edu['institution']}"),
+    'experience': (format_experience, lambda exp: f"{exp['position']} at {exp['company']}"),
+    'projects': (format_project, lambda proj: proj['title']),
+}
+
+
+def shorten(text, limit=DESCRIPTION_TRIM_CHARS):
+    """Cut text to at most `limit` characters at a word boundary."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(' ', 1)[0].rstrip(' ,.;:-')
+    return f"{cut}..."
+
+
+def keyword_set(keywords):
+    """Lower-case words of an iterable of keywords or phrases."""
+    words = set()
+    for keyword in keywords or ():
+        # Version numbers ("Python 3") say nothing about relevance
+        words.update(word for word in WORD_RE.findall(str(keyword).lower()) if not word.isdigit())
+    return words
+
+
+@lru_cache(maxsize=512)
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%B %Y').date()
+    except ValueError:
+        return None
+
+
+def parse_month(value):
+    """Parse a '%B %Y' date as formatted by _gather_user_data ('Present' is today)."""
+    if not value:
+        return None
+    if value == 'Present':
+        return date.today()
+    return _parse_month(value)
+
+
+def entry_score(entry, text, keywords, today=None, relevance=None):
+    """
+    Importance of an entry: recency plus weighted keyword relevance.
+
+    Args:
+        entry: Entry dict with 'start_date'/'end_date' as built by _gather_user_data
+        text: The entry as it appears in the prompt
+        keywords: Set of lower-case keyword words (see keyword_set)
+        relevance: Precomputed relevance (0..1) used instead of keyword hits
+    """
+    today = today or date.today()
+    ended = parse_month(entry.get('end_date')) or parse_month(entry.get('start_date'))
+    recency = 1.0 / (1.0 + max(0, (today - ended).days) / 365.25) if ended else 0.0
+    if relevance is not None:
+        return recency + RELEVANCE_WEIGHT * relevance
+    if not keywords:
+        return recency
+    hits = len(keywords & set(WORD_RE.findall(text.lower())))
+    return recency + RELEVANCE_WEIGHT * min(1.0, hits / RELEVANT_KEYWORD_HITS)
+
+
+class _Entry:
+    __slots__ = ('section', 'index', 'entry', 'label', 'text', 'short_text', 'relevance', 'state')
+
+    def __init__(self, section, index, entry, label, text, short_text, relevance=None):
+        self.section = section
+        self.index = index
+        self.entry = entry
+        self.label = label
+        self.text = text
+        self.short_text = short_text
+        self.relevance = relevance
+        self.state = 'full'
+
+    @property
+    def rendered(self):
+        return self.short_text if self.state == 'trimmed' else self.text
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from fixed text and rankable entries, then fit it into
+    a token budget.
+
+    Fixed text is always kept. Entries are added per section with
+    add_entries() and appear in their original order, one per line; build()
+    shortens and then drops the least important ones until the estimated
+    prompt size fits. At least one entry of every section is kept.
+
+    After build(), `compacted` lists what was changed as dicts with
+    'section', 'entry' (a short label) and 'action' ('trimmed' or 'dropped'),
+    and `tokens` / `original_tokens` give the estimated size after and
+    before compaction.
+    """
+
+    def __init__(self, budget=None, keywords=None):
+        """
+        Args:
+            budget: Estimated prompt tokens allowed (defaults to
+                settings.RESUME_PROMPT_TOKEN_BUDGET; 0 disables compaction)
+            keywords: Words or phrases that make an entry relevant
+        """
+        self.budget = budget if budget is not None else getattr(settings, 'RESUME_PROMPT_TOKEN_BUDGET', 2000)
+        self.keywords = keyword_set(keywords)
+        self._parts = []
+        self._entries = []
+        self.compacted = []
+        self.tokens = 0
+        self.original_tokens = 0
+
+    def add(self, text):
+        """Append fixed text."""
+        if text:
+            self._parts.append(text)
+        return self
+
+    def add_entries(self, section, entries, heading='', relevance=None):
+        """
+        Append the entries of one section, each on its own line(s).
+
+        Args:
+            section: Key of ENTRY_FORMATS ('education', 'experience', 'projects')
+            entries: Entry dicts as built by _gather_user_data
+            heading: Fixed text before the entries (omitted when there are none)
+            relevance: Optional relevance score (0..1) per entry, replacing
+                the keyword match when ranking (see resume.keywords.rank_profile)
+        """
+        if not entries:
+            return self
+        formatter, label = ENTRY_FORMATS[section]
+        if relevance is not None and len(relevance) != len(entries):
+            relevance = None
+        self.add(heading)
+        for index, entry in enumerate(entries):
+            text = formatter(entry) + '\n'
+            description = entry.get('description') or ''
+            short_text = text
+            if len(description) > DESCRIPTION_TRIM_CHARS:
+                short_text = formatter(dict(entry, description=shorten(description))) + '\n'
+            item = _Entry(
+                section, index, entry, label(entry), text, short_text,
+                relevance[index] if relevance is not None else None,
+            )
+            self._entries.append(item)
+            self._parts.append(item)
+        return self
+
+    def build(self):
+        """
+        Return the prompt, compacted to the budget where possible.
+        """
+        size = sum(len(part) if isinstance(part, str) else len(part.text) for part in self._parts)
+        self.original_tokens = size // CHARS_PER_TOKEN
+        self.compacted = []
+        limit = self.budget * CHARS_PER_TOKEN
+
+        if self.budget and size > limit:
+            # Least important first; among equals the later (older) entry
+            today = date.today()
+            scores = {
+                id(item): entry_score(item.entry, item.text, self.keywords, today, item.relevance)
+                for item in self._entries
+            }
+            ranked = sorted(self._entries, key=lambda item: (scores[id(item)], -item.index))
+
+            for item in ranked:
+                if size <= limit:
+                    break
+                if len(item.short_text) < len(item.text):
+                    size -= len(item.text) - len(item.short_text)
+                    item.state = 'trimmed'
+
+            kept = {}
+            for item in self._entries:
+                kept[item.section] = kept.get(item.section, 0) + 1
+            for item in ranked:
+                if size <= limit:
+                    break
+                if kept[item.section] > 1:
+                    kept[item.section] -= 1
+                    size -= len(item.rendered)
+                    item.state = 'dropped'
+
+            self.compacted = [
+                {'section': item.section, 'entry': item.label, 'action': item.state}
+                for item in self._entries
+                if item.state != 'full'
+            ]
+
+        prompt = ''.join(
+            part if isinstance(part, str) else part.rendered
+            for part in self._parts
+            if isinstance(part, str) or part.state != 'dropped'
+        )
+        self.tokens = estimate_tokens(prompt)
+        return prompt
+
+    @property
+    def dropped(self):
+        """Entries left out of the prompt."""
+        return [c for c in self.compacted if c['action'] == 'dropped']
+
+    @property
+    def trimmed(self):
+        """Entries whose description was shortened."""
+        return [c for c in self.compacted if c['action'] == 'trimmed']
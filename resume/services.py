@@ -1,9 +1,116 @@
 """
 AI service for generating resumes and cover letters using OpenAI API.
 """
-from openai import OpenAI
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from .models import Profile, Education, Experience, Project
+from django.db import connections
+from .models import Profile, Education, Experience, Project, ResumeSection
+from .openai_client import get_api_key, get_openai_client
+from .llm_cache import llm_cache_key, llm_response_cache
+from .single_flight import FlightCancelled, llm_single_flight
+from .llm_resilience import CircuitOpenError, Deadline, DeadlineExceeded, LLMUnavailable, call_with_resilience
+from .llm_usage import estimate_tokens, usage_recorder
+from .prompt_builder import ENTRY_FORMATS, PromptBuilder
+from .fallback_renderer import render_fallback_resume
+from .keywords import most_relevant, order_by_relevance, rank_profile
+
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever prompt wording changes so cached completions are not reused
+PROMPT_VERSION = '2'
+
+RESUME_SYSTEM_PROMPT = "You are a professional resume writer. Generate resumes as clean HTML using CSS classes (header, section, item, contact-info, company, institution, date-range, skills-list). Never use markdown. Only output HTML tags and content."
+COVER_LETTER_SYSTEM_PROMPT = "You are a professional career coach specializing in writing compelling, personalized cover letters that help candidates stand out."
+
+RESUME_COMPLETION_PARAMS = {'model': 'gpt-3.5-turbo', 'max_tokens': 1500, 'temperature': 0.7}
+COVER_LETTER_COMPLETION_PARAMS = {'model': 'gpt-3.5-turbo', 'max_tokens': 1000, 'temperature': 0.7}
+RESUME_SECTION_COMPLETION_PARAMS = {'model': 'gpt-3.5-turbo', 'max_tokens': 600, 'temperature': 0.7}
+
+# Template-specific instructions
+TEMPLATE_INSTRUCTIONS = {
+    'modern': 'Use a clean, modern format with clear section headers. Add color accents (suggest using blue). Use bullet points effectively.',
+    'classic': 'Use a traditional, formal format with serif fonts. Keep it professional and conservative. Use proper business letter formatting.',
+    'creative': 'Use a bold, eye-catching design. Be creative with layout. Suggest using two columns or unique section layouts.',
+    'minimal': 'Use a minimalist, clean design. Focus on white space and readability. Keep formatting simple and elegant.',
+    'executive': 'Use a premium, sophisticated format suitable for C-level positions. Emphasize leadership and strategic achievements.',
+    'technical': 'Use a structured format with clear technical sections. Include skills matrix and technical project details prominently.'
+}
+
+# Job description keywords named in a targeted prompt
+TARGET_KEYWORDS_SHOWN = 15
+# Most relevant experiences described in a targeted cover letter prompt
+TARGET_EXPERIENCE_SHOWN = 3
+
+# Output format instructions appended to every whole-resume prompt
+RESUME_OUTPUT_FORMAT = """\n
+IMPORTANT OUTPUT FORMAT:
+Generate the resume as clean HTML using these CSS classes:
+- Wrap header in <div class="header">
+- Use <h1> for name, <h2> for section headers, <h3> for job titles/degrees
+- Use <div class="contact-info"> for contact details
+- Wrap each section in <div class="section">
+- Wrap each job/education entry in <div class="item">
+- Use <p class="company"> for company names and <p class="institution"> for schools
+- Use <p class="date-range"> for date ranges
+- Use <ul class="skills-list"> with <li> for skills
+- Use regular <ul> and <li> for bullet points in descriptions
+
+Do NOT include markdown formatting (no #, **, etc.). Generate pure HTML only.
+Example structure:
+<div class="header">
+<h1>Name</h1>
+<div class="contact-info">email | phone | location</div>
+</div>
+<div class="section">
+<h2>Section Name</h2>
+<div class="item">
+<h3>Title</h3>
+<p class="company">Company</p>
+<p class="date-range">Date Range</p>
+<p>Description</p>
+</div>
+</div>
+"""
+
+# Sections of a section-mode resume, in output order, with their headings
+RESUME_SECTIONS = [
+    ('header', ''),
+    ('summary', 'Professional Summary'),
+    ('experience', 'Work Experience'),
+    ('education', 'Education'),
+    ('projects', 'Projects'),
+    ('skills', 'Skills'),
+]
+
+
+def target_prompt(target):
+    """
+    Prompt lines asking the model to emphasise a job description's keywords.
+    
+    Args:
+        target: Ranking from resume.keywords.rank_profile
+    """
+    keywords = ', '.join(term for term, weight in target['keywords'][:TARGET_KEYWORDS_SHOWN])
+    return f"TARGET JOB KEYWORDS:\n{keywords}\nEmphasise the experience, projects and skills that match these keywords.\n\n"
+
+
+def usage_outcome(error):
+    """
+    LLMUsage outcome for a call that raised `error`.
+    """
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, DeadlineExceeded):
+        return 'timeout'
+    if isinstance(error, LLMUnavailable):
+        return 'unavailable'
+    if isinstance(error, FlightCancelled):
+        return 'cancelled'
+    return 'error'
 
 
 class AIResumeGenerator:
@@ -11,24 +118,37 @@ class AIResumeGenerator:
     Service class for generating AI-powered resumes and cover letters.
     """
     
-    def __init__(self, user):
+    def __init__(self, user, deadline=None):
         self.user = user
-        self.api_key = settings.OPENAI_API_KEY
-        self.client = None
-        
-        if self.api_key:
-            try:
-                # Initialize OpenAI client with just the API key
-                # The client will handle all configuration
-                self.client = OpenAI(api_key=self.api_key)
-            except Exception as e:
-                # If client initialization fails, log it but don't crash
-                print(f"Warning: Could not initialize OpenAI client: {e}")
-                self.client = None
+        # Seconds an API call (all retries included) may take; defaults to the
+        # budget derived from the gunicorn worker timeout
+        self.deadline = deadline if deadline is not None else getattr(settings, 'OPENAI_REQUEST_DEADLINE', 24.0)
+        self.api_key = get_api_key()
+        # True when the last generate_* call was answered from the response cache
+        self.cache_hit = False
+        # True when it shared an identical generation already in flight
+        self.coalesced = False
+        # True when the API was unavailable and the non-AI fallback was used
+        self.used_fallback = False
+        # Section names reused / re-prompted by the last section-mode generation
+        self.sections_reused = []
+        self.sections_generated = []
+        # Entries trimmed or dropped to fit the last prompt(s) into the token budget
+        self.prompt_compaction = []
+        # Template -> generator of each resume made by the last generate_resumes call
+        self.batch_generators = {}
+        
+        # Shared per-process client with a pooled keep-alive transport;
+        # None when no API key is set or the client cannot be created
+        self.client = get_openai_client() if self.api_key else None
     
-    def _gather_user_data(self):
+    def _gather_user_data(self, job_description=''):
         """
         Collect all user data from database.
+        
+        Args:
+            job_description: Job posting to tailor to; its keywords and the
+                relevance of each entry are added as data['target']
         """
         data = {
             'name': self.user.get_full_name(),
@@ -93,26 +213,23 @@ class AIResumeGenerator:
                 'end_date': proj.end_date.strftime('%B %Y') if proj.end_date else 'Present',
             })
         
+        if job_description and job_description.strip():
+            target = rank_profile(data, job_description)
+            if target:
+                data['target'] = target
+        
         return data
     
     def _build_prompt(self, data, document_type='resume', template='modern'):
         """
         Build the AI prompt from user data.
         """
-        # Template-specific instructions
-        template_instructions = {
-            'modern': 'Use a clean, modern format with clear section headers. Add color accents (suggest using blue). Use bullet points effectively.',
-            'classic': 'Use a traditional, formal format with serif fonts. Keep it professional and conservative. Use proper business letter formatting.',
-            'creative': 'Use a bold, eye-catching design. Be creative with layout. Suggest using two columns or unique section layouts.',
-            'minimal': 'Use a minimalist, clean design. Focus on white space and readability. Keep formatting simple and elegant.',
-            'executive': 'Use a premium, sophisticated format suitable for C-level positions. Emphasize leadership and strategic achievements.',
-            'technical': 'Use a structured format with clear technical sections. Include skills matrix and technical project details prominently.'
-        }
-        
-        template_style = template_instructions.get(template, template_instructions['modern'])
+        template_style = TEMPLATE_INSTRUCTIONS.get(template, TEMPLATE_INSTRUCTIONS['modern'])
         
         if document_type == 'resume':
-            prompt = f"""Create a professional, well-structured resume for the following candidate. 
+            # Long profiles are compacted to the prompt token budget
+            builder = PromptBuilder(keywords=data['profile']['skills'] if data['profile'] else None)
+            builder.add(f"""Create a professional, well-structured resume for the following candidate. 
 
 STYLE REQUIREMENTS: {template_style}
 
@@ -124,71 +241,33 @@ Email: {data['email']}
 Phone: {data['phone']}
 Location: {data['profile']['location'] if data['profile'] else ''}
 
-"""
+""")
+            target = data.get('target')
             if data['profile']:
                 if data['profile']['career_objective']:
-                    prompt += f"CAREER OBJECTIVE:\n{data['profile']['career_objective']}\n\n"
+                    builder.add(f"CAREER OBJECTIVE:\n{data['profile']['career_objective']}\n\n")
                 
                 if data['profile']['summary']:
-                    prompt += f"PROFESSIONAL SUMMARY:\n{data['profile']['summary']}\n\n"
+                    builder.add(f"PROFESSIONAL SUMMARY:\n{data['profile']['summary']}\n\n")
                 
                 if data['profile']['skills']:
-                    prompt += f"SKILLS:\n{', '.join(data['profile']['skills'])}\n\n"
-            
-            if data['education']:
-                prompt += "EDUCATION:\n"
-                for edu in data['education']:
-                    prompt += f"- {edu['degree']} in {edu['field']}, {edu['institution']} ({edu['start_date']} - {edu['end_date']})\n"
-                    if edu['grade']:
-                        prompt += f"  Grade: {edu['grade']}\n"
-                    if edu['description']:
-                        prompt += f"  {edu['description']}\n"
-                prompt += "\n"
+                    skills = data['profile']['skills']
+                    if target:
+                        skills = order_by_relevance(skills, target['skills'])
+                    builder.add(f"SKILLS:\n{', '.join(skills)}\n\n")
             
-            if data['experience']:
-                prompt += "WORK EXPERIENCE:\n"
-                for exp in data['experience']:
-                    prompt += f"- {exp['position']} at {exp['company']} ({exp['start_date']} - {exp['end_date']})\n"
-                    prompt += f"  {exp['description']}\n"
-                prompt += "\n"
+            if target:
+                builder.add(target_prompt(target))
             
-            if data['projects']:
-                prompt += "PROJECTS:\n"
-                for proj in data['projects']:
-                    prompt += f"- {proj['title']}\n"
-                    prompt += f"  Technologies: {', '.join(proj['technologies'])}\n"
-                    prompt += f"  {proj['description']}\n"
-                prompt += "\n"
+            for section, heading in (('education', 'EDUCATION:\n'), ('experience', 'WORK EXPERIENCE:\n'), ('projects', 'PROJECTS:\n')):
+                if data[section]:
+                    builder.add_entries(section, data[section], heading=heading, relevance=target.get(section) if target else None)
+                    builder.add("\n")
             
-            prompt += """\n
-IMPORTANT OUTPUT FORMAT:
-Generate the resume as clean HTML using these CSS classes:
-- Wrap header in <div class="header">
-- Use <h1> for name, <h2> for section headers, <h3> for job titles/degrees
-- Use <div class="contact-info"> for contact details
-- Wrap each section in <div class="section">
-- Wrap each job/education entry in <div class="item">
-- Use <p class="company"> for company names and <p class="institution"> for schools
-- Use <p class="date-range"> for date ranges
-- Use <ul class="skills-list"> with <li> for skills
-- Use regular <ul> and <li> for bullet points in descriptions
-
-Do NOT include markdown formatting (no #, **, etc.). Generate pure HTML only.
-Example structure:
-<div class="header">
-<h1>Name</h1>
-<div class="contact-info">email | phone | location</div>
-</div>
-<div class="section">
-<h2>Section Name</h2>
-<div class="item">
-<h3>Title</h3>
-<p class="company">Company</p>
-<p class="date-range">Date Range</p>
-<p>Description</p>
-</div>
-</div>
-"""
+            builder.add(RESUME_OUTPUT_FORMAT)
+            prompt = builder.build()
+            self.prompt_compaction = []
+            self._note_compaction(builder)
         
         else:  # cover letter
             prompt = f"""Write a professional cover letter for {data['name']} based on the following information:
@@ -207,44 +286,376 @@ Recent Experience:
         
         return prompt
     
-    def generate_resume(self, template='modern'):
+    def _note_compaction(self, builder):
+        """
+        Record the entries a PromptBuilder trimmed or dropped in self.prompt_compaction.
+        """
+        if not builder.compacted:
+            return
+        self.prompt_compaction.extend(builder.compacted)
+        logger.info(
+            f"Compacted prompt for user {self.user.pk} from ~{builder.original_tokens} to ~{builder.tokens} tokens "
+            f"(budget {builder.budget}): {len(builder.trimmed)} entries trimmed, {len(builder.dropped)} dropped"
+        )
+    
+    def _create_completion(self, system_prompt, prompt, params, deadline, stream=False):
+        """
+        Call chat.completions.create before `deadline`, retrying transient
+        failures behind the circuit breaker.
+        
+        Args:
+            deadline: Deadline shared by every API call of one generation
+        
+        Raises:
+            LLMUnavailable: The API is down, too slow or the breaker is open
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        
+        def attempt(timeout):
+            return self.client.chat.completions.create(messages=messages, stream=stream, timeout=timeout, **params)
+        
+        return call_with_resilience(attempt, deadline)
+    
+    def _record_usage(self, labels, params, **fields):
+        """
+        Buffer an LLMUsage record for one API call.
+        
+        Args:
+            labels: {'kind': ..., 'template': ...} describing what was generated
+            params: Model parameters of the call
+            fields: Outcome, token counts and timings (see UsageRecorder.record)
+        """
+        labels = labels or {}
+        fields.setdefault('model', params.get('model', ''))
+        usage_recorder.record(
+            user=self.user,
+            kind=labels.get('kind', ''),
+            template=labels.get('template', ''),
+            **fields
+        )
+    
+    def _cached_completion(self, cache_key, system_prompt, prompt, params, deadline, force_refresh=False, labels=None):
+        """
+        Return completion text from the response cache or the API.
+        
+        Args:
+            cache_key: Key from llm_cache_key for this input
+            system_prompt: System message
+            prompt: User message
+            params: Model parameters passed to chat.completions.create
+            deadline: Deadline of the generation this completion belongs to
+            force_refresh: Skip the cache lookup (the new result is still stored)
+            labels: {'kind': ..., 'template': ...} for usage accounting
+        """
+        self.cache_hit = False
+        self.coalesced = False
+        self.used_fallback = False
+        if force_refresh:
+            llm_response_cache.record_refresh()
+        else:
+            content = llm_response_cache.get(cache_key)
+            if content is not None:
+                self.cache_hit = True
+                return content
+        
+        def complete():
+            started = time.monotonic()
+            try:
+                response = self._create_completion(system_prompt, prompt, params, deadline)
+            except Exception as e:
+                self._record_usage(labels, params, outcome=usage_outcome(e), latency=time.monotonic() - started)
+                raise
+            latency = time.monotonic() - started
+            content = response.choices[0].message.content.strip()
+            
+            usage = getattr(response, 'usage', None)
+            self._record_usage(
+                labels,
+                params,
+                model=getattr(response, 'model', None) or params.get('model', ''),
+                prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+                completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+                latency=latency,
+            )
+            llm_response_cache.set(
+                cache_key,
+                content,
+                total_tokens=getattr(usage, 'total_tokens', 0) or 0,
+                latency=latency,
+            )
+            return content
+        
+        # Identical requests arriving while this one runs share its API call
+        content, self.coalesced = llm_single_flight.do((self.user.pk, cache_key), complete)
+        return content
+    
+    def generate_resume(self, template='modern', force_refresh=False, sections=None, job_description=''):
         """
         Generate a resume using AI with specified template.
         Args:
             template: Template ID (modern, classic, creative, minimal, executive, technical)
+            force_refresh: Call the API even if an identical request is cached
+            sections: Generate section by section, re-prompting only changed sections
+                (defaults to settings.RESUME_SECTION_GENERATION)
+            job_description: Job posting to tailor the resume to (optional)
         Returns tuple: (success: bool, content: str, error: str)
         """
         if not self.api_key or not self.client:
-            return self._generate_fallback_resume(template=template)
+            return self._generate_fallback_resume(template=template, job_description=job_description)
+        
+        if sections is None:
+            sections = getattr(settings, 'RESUME_SECTION_GENERATION', False)
+        # One budget for every API call this resume makes
+        deadline = Deadline(self.deadline)
         
         try:
-            data = self._gather_user_data()
-            prompt = self._build_prompt(data, 'resume', template=template)
+            if sections:
+                content = '\n'.join(self._iter_resume_sections(
+                    template, force_refresh=force_refresh, job_description=job_description, deadline=deadline
+                ))
+                return True, content, None
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional resume writer. Generate resumes as clean HTML using CSS classes (header, section, item, contact-info, company, institution, date-range, skills-list). Never use markdown. Only output HTML tags and content."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.7,
+            data = self._gather_user_data(job_description)
+            prompt = self._build_prompt(data, 'resume', template=template)
+            cache_key = llm_cache_key(
+                'resume',
+                {'data': data, 'template': template, 'budget': getattr(settings, 'RESUME_PROMPT_TOKEN_BUDGET', 2000)},
+                PROMPT_VERSION,
+                RESUME_COMPLETION_PARAMS,
             )
             
-            content = response.choices[0].message.content.strip()
+            content = self._cached_completion(
+                cache_key, RESUME_SYSTEM_PROMPT, prompt, RESUME_COMPLETION_PARAMS, deadline, force_refresh=force_refresh,
+                labels={'kind': 'resume', 'template': template},
+            )
             return True, content, None
             
+        except LLMUnavailable as e:
+            logger.warning(f"Using fallback resume for user {self.user.pk}: {e}")
+            self.used_fallback = True
+            return self._generate_fallback_resume(template=template, job_description=job_description)
         except Exception as e:
             return False, None, str(e)
     
-    def generate_cover_letter(self, user_data=None, job_title=None, company=None):
+    def generate_resumes(self, templates, force_refresh=False, sections=None, job_description='', concurrency=None):
         """
-        Generate a cover letter using AI.
+        Generate a resume in each of several templates, running up to
+        `concurrency` (default settings.LLM_BATCH_CONCURRENCY) generations at
+        once, so the batch takes about as long as its slowest template.
+        
         Args:
-            user_data: Dictionary with user data (if provided, uses this instead of gathering)
-            job_title: Job position (deprecated, use user_data['position'])
-            company: Company name (deprecated, use user_data['company_name'])
-        Returns: str with cover letter content or raises exception
+            templates: Template IDs (duplicates are ignored)
+            force_refresh: Call the API even if an identical request is cached
+            sections: Per-section generation (see generate_resume)
+            job_description: Job posting to tailor the resumes to (optional)
+            concurrency: Generations run at once, e.g. the admission slots held
+        
+        Returns:
+            Dict of template -> (success, content, error) in the given order.
+            self.batch_generators maps each template to the generator that made
+            it (for its cache_hit / used_fallback / prompt_compaction flags).
+        """
+        templates = list(dict.fromkeys(templates))
+        self.batch_generators = {}
+        if not templates:
+            return {}
+        
+        def generate(template):
+            # Generators keep per-call state, so each template gets its own
+            generator = AIResumeGenerator(self.user, deadline=self.deadline)
+            try:
+                return generator, generator.generate_resume(
+                    template, force_refresh=force_refresh, sections=sections, job_description=job_description
+                )
+            finally:
+                # Pool threads open their own database connections
+                connections.close_all()
+        
+        if concurrency is None:
+            concurrency = getattr(settings, 'LLM_BATCH_CONCURRENCY', 3)
+        workers = max(1, min(len(templates), concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resume-batch') as executor:
+            futures = {template: executor.submit(generate, template) for template in templates}
+        
+        results = {}
+        for template, future in futures.items():
+            try:
+                generator, results[template] = future.result()
+            except Exception as e:
+                results[template] = (False, None, str(e))
+                continue
+            self.batch_generators[template] = generator
+        
+        generators = list(self.batch_generators.values())
+        self.cache_hit = bool(generators) and all(generator.cache_hit for generator in generators)
+        self.used_fallback = any(generator.used_fallback for generator in generators)
+        self.prompt_compaction = generators[0].prompt_compaction if generators else []
+        return results
+    
+    def _section_sources(self, data):
+        """
+        Split gathered user data into the source data of each resume section.
+        """
+        profile = data['profile'] or {}
+        return {
+            'header': {
+                'name': data['name'],
+                'email': data['email'],
+                'phone': data['phone'],
+                'location': profile.get('location', ''),
+                'linkedin': profile.get('linkedin', ''),
+                'github': profile.get('github', ''),
+                'portfolio': profile.get('portfolio', ''),
+            },
+            'summary': {
+                'career_objective': profile.get('career_objective', ''),
+                'summary': profile.get('summary', ''),
+            },
+            'experience': data['experience'],
+            'education': data['education'],
+            'projects': data['projects'],
+            'skills': order_by_relevance(profile.get('skills', []), data['target']['skills'])
+            if data.get('target') else profile.get('skills', []),
+        }
+    
+    def _build_section_prompt(self, section, title, source, template='modern', keywords=None, target=None):
+        """
+        Build the AI prompt for one resume section.
+        
+        Args:
+            keywords: Words that make an entry relevant when it must be compacted
+            target: Job description ranking from resume.keywords.rank_profile
+        
+        Returns:
+            Prompt string, or None when the section has no content to write about
+        """
+        template_style = TEMPLATE_INSTRUCTIONS.get(template, TEMPLATE_INSTRUCTIONS['modern'])
+        
+        if section == 'header':
+            details = '\n'.join(f"{key.title()}: {value}" for key, value in source.items() if value)
+            return f"""Write the header of a professional resume.
+
+STYLE REQUIREMENTS: {template_style}
+
+{details}
+
+Output only this HTML, filled in with the details above:
+<div class="header">
+<h1>Name</h1>
+<div class="contact-info">email | phone | location | links</div>
+</div>
+Do NOT include markdown formatting. Generate pure HTML only."""
+        
+        lines = []
+        if section == 'summary':
+            if source['career_objective']:
+                lines.append(f"CAREER OBJECTIVE:\n{source['career_objective']}")
+            if source['summary']:
+                lines.append(f"PROFESSIONAL SUMMARY:\n{source['summary']}")
+        elif section == 'skills':
+            if source:
+                lines.append(', '.join(source))
+        
+        if not lines and not (section in ENTRY_FORMATS and source):
+            return None
+        
+        builder = PromptBuilder(keywords=keywords)
+        builder.add(f"""Write the "{title}" section of a professional resume, using professional language that highlights key achievements.
+
+STYLE REQUIREMENTS: {template_style}
+
+""")
+        if target:
+            builder.add(target_prompt(target))
+        if section in ENTRY_FORMATS:
+            # Entries of long profiles are compacted to the prompt token budget
+            builder.add_entries(section, source, relevance=target.get(section) if target else None)
+        else:
+            builder.add('\n'.join(lines) + '\n')
+        builder.add(f"""
+IMPORTANT OUTPUT FORMAT:
+Output only this one section as clean HTML:
+- Wrap it in <div class="section"> starting with <h2>{title}</h2>
+- Wrap each job/education/project entry in <div class="item"> with <h3> for its title
+- Use <p class="company"> for company names and <p class="institution"> for schools
+- Use <p class="date-range"> for date ranges
+- Use <ul class="skills-list"> with <li> for skills
+- Use regular <ul> and <li> for bullet points in descriptions
+Do NOT include markdown formatting (no #, **, etc.). Generate pure HTML only.""")
+        prompt = builder.build()
+        self._note_compaction(builder)
+        return prompt
+    
+    def _iter_resume_sections(self, template='modern', force_refresh=False, job_description='', deadline=None):
+        """
+        Yield the HTML of each resume section in order, re-prompting only the
+        sections whose source data (or target job keywords) changed since they
+        were last generated for this template. Generated sections are stored
+        as they complete.
+        
+        Args:
+            deadline: Deadline shared by all section prompts (a new one from
+                self.deadline if omitted)
+        
+        Sets self.sections_reused and self.sections_generated (section names).
+        """
+        if deadline is None:
+            deadline = Deadline(self.deadline)
+        data = self._gather_user_data(job_description)
+        target = data.get('target')
+        sources = self._section_sources(data)
+        stored = {row.section: row for row in ResumeSection.objects.filter(user=self.user, template=template)}
+        self.sections_reused = []
+        self.sections_generated = []
+        self.prompt_compaction = []
+        budget = getattr(settings, 'RESUME_PROMPT_TOKEN_BUDGET', 2000)
+        
+        for section, title in RESUME_SECTIONS:
+            source = sources[section]
+            # The header does not depend on the job being targeted
+            section_target = target if section != 'header' else None
+            payload = {'data': source, 'template': template, 'budget': budget}
+            if section_target:
+                payload['target'] = {'keywords': target['keywords'], 'relevance': target.get(section)}
+            fingerprint = llm_cache_key(
+                f'resume_section:{section}',
+                payload,
+                PROMPT_VERSION,
+                RESUME_SECTION_COMPLETION_PARAMS,
+            )
+            row = stored.get(section)
+            if row is not None and row.fingerprint == fingerprint and not force_refresh:
+                self.sections_reused.append(section)
+                if row.content:
+                    yield row.content
+                continue
+            
+            prompt = self._build_section_prompt(
+                section, title, source, template=template, keywords=sources['skills'], target=section_target
+            )
+            content = ''
+            if prompt is not None:
+                content = self._cached_completion(
+                    fingerprint, RESUME_SYSTEM_PROMPT, prompt, RESUME_SECTION_COMPLETION_PARAMS, deadline, force_refresh=force_refresh,
+                    labels={'kind': f'resume_section:{section}', 'template': template},
+                )
+                self.sections_generated.append(section)
+            ResumeSection.objects.update_or_create(
+                user=self.user, template=template, section=section,
+                defaults={'fingerprint': fingerprint, 'content': content},
+            )
+            if content:
+                yield content
+        
+        # Nothing was re-prompted: the same result as an LLM cache hit
+        self.cache_hit = not self.sections_generated
+    
+    def _cover_letter_data(self, user_data=None, job_title=None, company=None):
+        """
+        Return the data a cover letter is generated from.
         """
         # For backward compatibility
         if user_data is None:
@@ -255,14 +666,23 @@ Recent Experience:
                 data['company_name'] = company
         else:
             data = user_data
-        
-        # Use fallback if no API key
-        if not self.api_key or not self.client:
-            return self._generate_fallback_cover_letter(data)
-        
-        try:
-            # Build cover letter prompt
-            prompt = f"""Write a professional cover letter for:
+        return data
+    
+    def _cover_letter_target(self, data):
+        """
+        Rank the cover letter candidate's skills and experience against its
+        job description, or None when there is no job description.
+        """
+        job_description = data.get('job_description')
+        if not job_description or not job_description.strip():
+            return None
+        return rank_profile(data, job_description)
+    
+    def _build_cover_letter_prompt(self, data):
+        """
+        Build the AI prompt for a cover letter.
+        """
+        prompt = f"""Write a professional cover letter for:
 
 Name: {data.get('name', 'the candidate')}
 Position: {data.get('position', 'the position')}
@@ -274,477 +694,241 @@ Candidate Background:
 - Key Skills: {', '.join(data.get('profile', {}).get('skills', []))}
 
 """
-            
-            if data.get('job_description'):
-                prompt += f"\nJob Description:\n{data['job_description']}\n"
-            
-            if data.get('experience'):
-                prompt += f"\nRelevant Experience: {len(data['experience'])} positions\n"
-            
-            if data.get('education'):
-                prompt += f"Education: {len(data['education'])} degrees/certifications\n"
-            
-            prompt += "\nPlease write a compelling, personalized cover letter that:"
-            prompt += "\n1. Addresses the specific position and company"
-            prompt += "\n2. Highlights relevant skills and experiences"
-            prompt += "\n3. Shows enthusiasm for the role"
-            prompt += "\n4. Is professional and concise (3-4 paragraphs)"
-            prompt += "\n5. Does NOT include address or date (we'll add those)"
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional career coach specializing in writing compelling, personalized cover letters that help candidates stand out."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.7,
+        
+        if data.get('job_description'):
+            prompt += f"\nJob Description:\n{data['job_description']}\n"
+        
+        target = self._cover_letter_target(data)
+        if target:
+            matching = most_relevant(data.get('profile', {}).get('skills', []), target['skills'])
+            if matching:
+                prompt += f"\nSkills Matching the Job: {', '.join(matching)}\n"
+            relevant = most_relevant(data.get('experience', []), target['experience'], TARGET_EXPERIENCE_SHOWN)
+            if relevant:
+                prompt += "\nMost Relevant Experience:\n"
+                for exp in relevant:
+                    prompt += f"- {exp.get('position', '')} at {exp.get('company', '')}: {(exp.get('description') or '')[:200]}\n"
+        
+        if data.get('experience'):
+            prompt += f"\nRelevant Experience: {len(data['experience'])} positions\n"
+        
+        if data.get('education'):
+            prompt += f"Education: {len(data['education'])} degrees/certifications\n"
+        
+        prompt += "\nPlease write a compelling, personalized cover letter that:"
+        prompt += "\n1. Addresses the specific position and company"
+        prompt += "\n2. Highlights relevant skills and experiences"
+        prompt += "\n3. Shows enthusiasm for the role"
+        prompt += "\n4. Is professional and concise (3-4 paragraphs)"
+        prompt += "\n5. Does NOT include address or date (we'll add those)"
+        
+        return prompt
+    
+    def generate_cover_letter(self, user_data=None, job_title=None, company=None, force_refresh=False):
+        """
+        Generate a cover letter using AI.
+        Args:
+            user_data: Dictionary with user data (if provided, uses this instead of gathering)
+            job_title: Job position (deprecated, use user_data['position'])
+            company: Company name (deprecated, use user_data['company_name'])
+            force_refresh: Call the API even if an identical request is cached
+        Returns: str with cover letter content or raises exception
+        """
+        data = self._cover_letter_data(user_data, job_title, company)
+        
+        # Use fallback if no API key
+        if not self.api_key or not self.client:
+            return self._generate_fallback_cover_letter(data)
+        
+        try:
+            prompt = self._build_cover_letter_prompt(data)
+            cache_key = llm_cache_key('cover_letter', data, PROMPT_VERSION, COVER_LETTER_COMPLETION_PARAMS)
+            return self._cached_completion(
+                cache_key, COVER_LETTER_SYSTEM_PROMPT, prompt, COVER_LETTER_COMPLETION_PARAMS, Deadline(self.deadline),
+                force_refresh=force_refresh,
+                labels={'kind': 'cover_letter'},
             )
             
-            content = response.choices[0].message.content.strip()
-            return content
-            
         except Exception as e:
             # Return fallback on error
+            logger.warning(f"Using fallback cover letter for user {self.user.pk}: {e}")
+            self.used_fallback = True
             return self._generate_fallback_cover_letter(data)
     
-    def _generate_fallback_resume(self, template='modern'):
+    def _stream_completion(self, cache_key, system_prompt, prompt, params, deadline, force_refresh=False, labels=None):
         """
-        Generate a basic resume without AI when API key is not available.
-        Creates properly formatted HTML that matches template designs.
-        """
-        data = self._gather_user_data()
-        
-        # Template-specific HTML generation
-        if template == 'modern':
-            content = self._generate_modern_html(data)
-        elif template == 'classic':
-            content = self._generate_classic_html(data)
-        elif template == 'creative':
-            content = self._generate_creative_html(data)
-        elif template == 'minimal':
-            content = self._generate_minimal_html(data)
-        elif template == 'executive':
-            content = self._generate_executive_html(data)
-        elif template == 'technical':
-            content = self._generate_technical_html(data)
+        Yield completion text in pieces as the API streams it.
+        
+        A cached completion, or the result of an identical generation already
+        in flight, is yielded in one piece. The finished text is stored in the
+        response cache. If the consumer stops iterating (e.g. the browser
+        disconnected) the upstream HTTP response is closed, which cancels the
+        completion. Streamed responses carry no usage, so the recorded token
+        counts are estimates (prompt length, one token per chunk).
+        """
+        self.cache_hit = False
+        self.coalesced = False
+        self.used_fallback = False
+        if force_refresh:
+            llm_response_cache.record_refresh()
         else:
-            content = self._generate_modern_html(data)
-        
-        return True, content, None
-    
-    def _generate_modern_html(self, data):
-        """Generate Modern template HTML"""
-        html = '<div class="header">\n'
-        html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
-        
-        # Contact info
-        contact = []
-        if data['email']:
-            contact.append(f'📧 {data["email"]}')
-        if data['phone']:
-            contact.append(f'📱 {data["phone"]}')
-        if data['profile'] and data['profile']['location']:
-            contact.append(f'📍 {data["profile"]["location"]}')
-        if data['profile'] and data['profile']['linkedin']:
-            contact.append(f'🔗 {data["profile"]["linkedin"]}')
-        
-        if contact:
-            html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Professional Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>Professional Summary</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>Work Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                if edu['grade']:
-                    html += f'<p>Grade: {edu["grade"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Skills
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>Skills</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        # Projects
-        if data['projects']:
-            html += '<div class="section">\n'
-            html += '<h2>Projects</h2>\n'
-            for proj in data['projects']:
-                html += '<div class="item">\n'
-                html += f'<h3>{proj["title"]}</h3>\n'
-                if proj['technologies']:
-                    html += f'<p>Technologies: {", ".join(proj["technologies"])}</p>\n'
-                html += f'<p>{proj["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        return html
-    
-    def _generate_classic_html(self, data):
-        """Generate Classic template HTML"""
-        html = '<div class="header">\n'
-        html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
-        
-        # Contact info - centered for classic
-        contact = []
-        if data['email']:
-            contact.append(data["email"])
-        if data['phone']:
-            contact.append(data["phone"])
-        if data['profile'] and data['profile']['location']:
-            contact.append(data["profile"]["location"])
-        
-        if contact:
-            html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Career Objective
-        if data['profile'] and data['profile']['career_objective']:
-            html += '<div class="section">\n'
-            html += '<h2>Career Objective</h2>\n'
-            html += f'<p>{data["profile"]["career_objective"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Professional Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>Professional Summary</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>Work Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Skills
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>Skills</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        return html
-    
-    def _generate_creative_html(self, data):
-        """Generate Creative template HTML"""
-        # Creative has colored header
-        html = '<div class="header">\n'
-        html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
-        
-        # Contact info
-        contact = []
-        if data['email']:
-            contact.append(data["email"])
-        if data['phone']:
-            contact.append(data["phone"])
-        if data['profile'] and data['profile']['location']:
-            contact.append(data["profile"]["location"])
-        
-        if contact:
-            html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Professional Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>About Me</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Skills
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>Skills</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        return html
+            content = llm_response_cache.get(cache_key)
+            if content is not None:
+                self.cache_hit = True
+                yield content
+                return
+        
+        flight_key = (self.user.pk, cache_key)
+        call, leader = llm_single_flight.begin(flight_key)
+        if not leader:
+            try:
+                content = llm_single_flight.wait(call)
+            except (FlightCancelled, TimeoutError):
+                # Stream our own completion without sharing it
+                call = None
+            else:
+                self.coalesced = True
+                yield content
+                return
+        
+        content = None
+        error = FlightCancelled()
+        started = time.monotonic()
+        ttft = None
+        stream = None
+        parts = []
+        try:
+            stream = self._create_completion(system_prompt, prompt, params, deadline, stream=True)
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        if ttft is None:
+                            ttft = time.monotonic() - started
+                        parts.append(text)
+                        yield text
+            finally:
+                stream.response.close()
+            
+            content = ''.join(parts).strip()
+            llm_response_cache.set(cache_key, content, latency=time.monotonic() - started)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._record_usage(
+                labels,
+                params,
+                stream=True,
+                outcome='ok' if content is not None else usage_outcome(error),
+                prompt_tokens=estimate_tokens(system_prompt + prompt) if stream is not None else 0,
+                completion_tokens=len(parts),
+                estimated_tokens=True,
+                latency=time.monotonic() - started,
+                ttft=ttft,
+            )
+            if call is not None:
+                if content is not None:
+                    llm_single_flight.finish(flight_key, call, result=content)
+                else:
+                    llm_single_flight.finish(flight_key, call, error=error)
     
-    def _generate_minimal_html(self, data):
-        """Generate Minimal template HTML"""
-        html = '<div class="header">\n'
-        html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
-        
-        if data['profile'] and data['profile']['location']:
-            html += f'<p>{data["profile"]["location"]}</p>\n'
-        
-        # Contact info
-        contact = []
-        if data['email']:
-            contact.append(data["email"])
-        if data['phone']:
-            contact.append(data["phone"])
-        
-        if contact:
-            html += f'<div class="contact-info">{" · ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>Summary</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Skills
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>Skills</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        return html
+    def stream_resume(self, template='modern', force_refresh=False, sections=None, job_description=''):
+        """
+        Generate a resume, yielding the content in pieces as it arrives.
+        Without an API key, or when the API is unavailable, the fallback
+        resume is yielded in one piece.
+        Join the pieces and strip() them to get the final content.
+        Args:
+            template: Template ID (modern, classic, creative, minimal, executive, technical)
+            force_refresh: Call the API even if an identical request is cached
+            sections: Yield one piece per section, re-prompting only changed sections
+                (defaults to settings.RESUME_SECTION_GENERATION)
+            job_description: Job posting to tailor the resume to (optional)
+        """
+        if not self.api_key or not self.client:
+            success, content, error = self._generate_fallback_resume(template=template, job_description=job_description)
+            yield content
+            return
+        
+        if sections is None:
+            sections = getattr(settings, 'RESUME_SECTION_GENERATION', False)
+        deadline = Deadline(self.deadline)
+        if sections:
+            sent = False
+            try:
+                for content in self._iter_resume_sections(
+                    template, force_refresh=force_refresh, job_description=job_description, deadline=deadline
+                ):
+                    yield ('\n' if sent else '') + content
+                    sent = True
+            except LLMUnavailable as e:
+                if sent:
+                    # Sections were already sent; a fallback cannot be appended to them
+                    raise
+                logger.warning(f"Using fallback resume for user {self.user.pk}: {e}")
+                self.used_fallback = True
+                success, content, error = self._generate_fallback_resume(template=template, job_description=job_description)
+                yield content
+            return
+        
+        data = self._gather_user_data(job_description)
+        prompt = self._build_prompt(data, 'resume', template=template)
+        cache_key = llm_cache_key(
+            'resume',
+            {'data': data, 'template': template, 'budget': getattr(settings, 'RESUME_PROMPT_TOKEN_BUDGET', 2000)},
+            PROMPT_VERSION,
+            RESUME_COMPLETION_PARAMS,
+        )
+        try:
+            yield from self._stream_completion(
+                cache_key, RESUME_SYSTEM_PROMPT, prompt, RESUME_COMPLETION_PARAMS, deadline, force_refresh=force_refresh,
+                labels={'kind': 'resume', 'template': template},
+            )
+        except LLMUnavailable as e:
+            # Raised before the first token, so nothing partial was sent
+            logger.warning(f"Using fallback resume for user {self.user.pk}: {e}")
+            self.used_fallback = True
+            success, content, error = self._generate_fallback_resume(template=template, job_description=job_description)
+            yield content
     
-    def _generate_executive_html(self, data):
-        """Generate Executive template HTML"""
-        html = '<div class="header">\n'
-        html += f'<h1>{data["name"] if data["name"] else "Your Name"}</h1>\n'
-        
-        # Contact info - centered
-        contact = []
-        if data['email']:
-            contact.append(data["email"])
-        if data['phone']:
-            contact.append(data["phone"])
-        if data['profile'] and data['profile']['location']:
-            contact.append(data["profile"]["location"])
-        
-        if contact:
-            html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Executive Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>Executive Summary</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Professional Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>Professional Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Core Competencies
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>Core Competencies</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        return html
+    def stream_cover_letter(self, user_data=None, force_refresh=False):
+        """
+        Generate a cover letter, yielding the content in pieces as it arrives.
+        Without an API key, or when the API is unavailable, the fallback cover
+        letter is yielded in one piece.
+        Args:
+            user_data: Dictionary with user data (gathered from the profile if omitted)
+            force_refresh: Call the API even if an identical request is cached
+        """
+        data = self._cover_letter_data(user_data)
+        if not self.api_key or not self.client:
+            yield self._generate_fallback_cover_letter(data)
+            return
+        
+        prompt = self._build_cover_letter_prompt(data)
+        cache_key = llm_cache_key('cover_letter', data, PROMPT_VERSION, COVER_LETTER_COMPLETION_PARAMS)
+        try:
+            yield from self._stream_completion(
+                cache_key, COVER_LETTER_SYSTEM_PROMPT, prompt, COVER_LETTER_COMPLETION_PARAMS, Deadline(self.deadline),
+                force_refresh=force_refresh,
+                labels={'kind': 'cover_letter'},
+            )
+        except LLMUnavailable as e:
+            logger.warning(f"Using fallback cover letter for user {self.user.pk}: {e}")
+            self.used_fallback = True
+            yield self._generate_fallback_cover_letter(data)
     
-    def _generate_technical_html(self, data):
-        """Generate Technical template HTML"""
-        # Technical has dark header
-        html = '<div class="header">\n'
-        html += f'<h1>&lt;{data["name"] if data["name"] else "Your Name"} /&gt;</h1>\n'
-        
-        # Contact info in header
-        contact = []
-        if data['email']:
-            contact.append(data["email"])
-        if data['phone']:
-            contact.append(data["phone"])
-        if data['profile'] and data['profile']['location']:
-            contact.append(data["profile"]["location"])
-        
-        if contact:
-            html += f'<div class="contact-info">{" | ".join(contact)}</div>\n'
-        html += '</div>\n\n'
-        
-        # Technical Summary
-        if data['profile'] and data['profile']['summary']:
-            html += '<div class="section">\n'
-            html += '<h2>// Technical Summary</h2>\n'
-            html += f'<p>{data["profile"]["summary"]}</p>\n'
-            html += '</div>\n\n'
-        
-        # Technical Skills
-        if data['profile'] and data['profile']['skills']:
-            html += '<div class="section">\n'
-            html += '<h2>// Technical Skills</h2>\n'
-            html += '<ul class="skills-list">\n'
-            for skill in data['profile']['skills']:
-                html += f'<li>{skill}</li>\n'
-            html += '</ul>\n'
-            html += '</div>\n\n'
-        
-        # Experience
-        if data['experience']:
-            html += '<div class="section">\n'
-            html += '<h2>// Work Experience</h2>\n'
-            for exp in data['experience']:
-                html += '<div class="item">\n'
-                html += f'<h3>{exp["position"]}</h3>\n'
-                html += f'<p class="company">{exp["company"]}</p>\n'
-                html += f'<p class="date-range">{exp["start_date"]} - {exp["end_date"]}</p>\n'
-                html += f'<p>{exp["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Projects
-        if data['projects']:
-            html += '<div class="section">\n'
-            html += '<h2>// Projects</h2>\n'
-            for proj in data['projects']:
-                html += '<div class="item">\n'
-                html += f'<h3>{proj["title"]}</h3>\n'
-                if proj['technologies']:
-                    html += f'<p>Tech Stack: {", ".join(proj["technologies"])}</p>\n'
-                html += f'<p>{proj["description"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        # Education
-        if data['education']:
-            html += '<div class="section">\n'
-            html += '<h2>// Education</h2>\n'
-            for edu in data['education']:
-                html += '<div class="item">\n'
-                html += f'<h3>{edu["degree"]} in {edu["field"]}</h3>\n'
-                html += f'<p class="institution">{edu["institution"]}</p>\n'
-                html += f'<p class="date-range">{edu["start_date"]} - {edu["end_date"]}</p>\n'
-                html += '</div>\n'
-            html += '</div>\n\n'
-        
-        return html
-
+    def _generate_fallback_resume(self, template='modern', job_description=''):
+        """
+        Generate a basic resume without AI when API key is not available.
+        Builds the template's fallback HTML (resume/fallback_renderer.py),
+        listing skills and projects most relevant to the job description first.
+        """
+        data = self._gather_user_data(job_description)
+        return True, render_fallback_resume(data, template), None
     
     def _generate_fallback_cover_letter(self, data=None):
         """
@@ -771,10 +955,17 @@ Candidate Background:
             content += f"{profile['summary']}\n\n"
         
         experience = data.get('experience', [])
+        target = self._cover_letter_target(data)
         if experience:
-            exp = experience[0]
+            # The role that best matches the job description, else the first one
+            relevant = most_relevant(experience, target['experience'], 1) if target else []
+            exp = relevant[0] if relevant else experience[0]
             content += f"In my recent role as {exp.get('position', 'a professional')} at {exp.get('company', 'my previous company')}, I have gained valuable experience that aligns well with your requirements.\n\n"
         
+        matching = most_relevant(profile.get('skills', []) if profile else [], target['skills'], 5) if target else []
+        if matching:
+            content += f"My skills in {', '.join(matching)} match what this role calls for.\n\n"
+        
         content += "I am excited about the opportunity to contribute to your team and would welcome the chance to discuss how my skills and experience can benefit your organization.\n\n"
         content += "Thank you for considering my application. I look forward to hearing from you.\n\n"
         content += f"Sincerely,\n{data.get('name', 'Your Name')}"
@@ -0,0 +1,74 @@
+"""
+Signal handlers for the resume app.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import GeneratedResume, CoverLetter
+
+
+logger = logging.getLogger(__name__)
+
+# Fields whose values appear in each document's PDF (see build_pdf_document,
+# format_resume_for_pdf and format_cover_letter_for_pdf)
+PDF_FIELDS = {
+    GeneratedResume: ('content', 'template'),
+    CoverLetter: ('content', 'template', 'company_name', 'position'),
+}
+
+
+def _pdf_field_values(instance):
+    return tuple(getattr(instance, field) for field in PDF_FIELDS[type(instance)])
+
+
+@receiver(post_init, sender=GeneratedResume)
+@receiver(post_init, sender=CoverLetter)
+def remember_pdf_fields(sender, instance, **kwargs):
+    """
+    Remember the PDF-relevant fields of a loaded document so a save that
+    leaves them unchanged does not render it again.
+    """
+    if not getattr(settings, 'PDF_PRERENDER_ON_SAVE', False) or instance.pk is None:
+        return
+    if instance.get_deferred_fields().intersection(PDF_FIELDS[sender]):
+        # Reading them would cost a query per loaded row
+        return
+    instance._pdf_field_values = _pdf_field_values(instance)
+
+
+@receiver(post_save, sender=GeneratedResume)
+@receiver(post_save, sender=CoverLetter)
+def prerender_document_pdf(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Queue a background PDF render when a resume or cover letter is saved,
+    so the first download is served from the PDF cache.
+    Enabled with settings.PDF_PRERENDER_ON_SAVE.
+
+    Saves that do not change a field the PDF shows (by update_fields or by
+    value) are skipped.
+    """
+    if not getattr(settings, 'PDF_PRERENDER_ON_SAVE', False):
+        return
+    if update_fields is not None and not set(update_fields).intersection(PDF_FIELDS[sender]):
+        return
+    values = _pdf_field_values(instance)
+    if not created and getattr(instance, '_pdf_field_values', None) == values:
+        return
+    instance._pdf_field_values = values
+
+    from .pdf_jobs import prerender_document
+
+    document_type = 'resume' if sender is GeneratedResume else 'cover_letter'
+
+    def queue_prerender():
+        try:
+            prerender_document(instance.user, document_type, instance)
+        except Exception:
+            logger.exception(f"Could not queue pre-render of {document_type} #{instance.pk}")
+
+    # Wait for the commit so the render sees the saved content
+    transaction.on_commit(queue_prerender)
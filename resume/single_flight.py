@@ -0,0 +1,119 @@
+"""
+In-process coalescing of identical LLM calls.
+
+When several requests in one process ask for the same completion (same
+user, template and profile snapshot) at the same time, the first becomes
+the leader and calls the API; the others wait for its result instead of
+starting their own call. Only calls that are in flight are shared; finished
+results are served by the response cache (see llm_cache.py).
+"""
+import threading
+
+from django.conf import settings
+
+
+class FlightCancelled(Exception):
+    """The leader stopped before producing a result (e.g. its client disconnected)."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by a hashable key, with counters of
+    how many calls were made and how many were served from another call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def begin(self, key):
+        """
+        Join the call in flight for `key`, or start one.
+
+        Returns:
+            Tuple (call, leader). The leader must report the outcome with finish().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's result (or error) and wake the waiters."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def wait(self, call, timeout=None):
+        """
+        Wait for a leader's result.
+
+        Raises:
+            The leader's error; FlightCancelled if it stopped early;
+            TimeoutError if it took longer than `timeout` seconds
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'LLM_SINGLE_FLIGHT_TIMEOUT', 90)
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError('Timed out waiting for an identical generation')
+        if call.error is not None:
+            raise call.error
+        with self._lock:
+            self.shared += 1
+        return call.result
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() unless an identical call is in flight, in which case share its result.
+
+        A waiter whose leader was cancelled or timed out runs fn() itself.
+
+        Returns:
+            Tuple (result, shared)
+        """
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self.finish(key, call, error=e if isinstance(e, Exception) else FlightCancelled())
+                    raise
+                self.finish(key, call, result=result)
+                return result, False
+
+            try:
+                return self.wait(call, timeout), True
+            except FlightCancelled:
+                continue
+            except TimeoutError:
+                return fn(), False
+
+    def stats(self):
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'shared': self.shared,
+            'timeouts': self.timeouts,
+        }
+
+
+llm_single_flight = SingleFlight()
@@ -1,3 +1,2063 @@
-from django.test import TestCase
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import openai
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import generation_jobs, utils
+from .admission import AdmissionController, Overloaded, UserRateLimited
+from .management.commands._legacy_fallback import LEGACY_RENDERERS
+from .management.commands.benchmark_pdf import percentile, summarize
+from .management.commands.run_llm_stub import StubServer, stub_completion_tokens
+from .fallback_renderer import FALLBACK_TEMPLATES, render_fallback_resume
+from .generation_jobs import (
+    claim_next_generation_job,
+    cover_letter_user_data,
+    enqueue_generation_job,
+    run_generation_job,
+)
+from .idempotency import (
+    claim_generation_request,
+    complete_generation_request,
+    get_request_status_url,
+    release_generation_request,
+)
+from .keywords import KeywordCorpus, extract_keywords, extract_terms, order_by_relevance, rank_profile
+from .llm_cache import LLMResponseCache, llm_cache_key
+from .llm_resilience import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, LLMUnavailable, call_with_resilience
+from .llm_usage import UsageRecorder, estimate_cost, estimate_tokens
+from .metrics import Histogram, MetricsRegistry, PDFRenderTrace, metrics_registry
+from .models import (
+    AdmissionSlot,
+    CoverLetter,
+    Experience,
+    GeneratedResume,
+    GenerationJob,
+    GenerationRequest,
+    LLMUsage,
+    PDFRenderJob,
+    Profile,
+    UserRateBucket,
+)
+from .openai_client import LOCAL_API_KEY, OpenAIClientRegistry, get_api_key
+from .pdf_cache import STALE_TEMP_AGE, LocalPDFCacheStorage, PDFCache, pdf_cache_key
+from .pdf_jobs import _prerender, build_pdf_document, claim_next_pdf_job, enqueue_pdf_job
+from .pdf_pool import PDFRenderPool, PDFRenderQueueFull, PDFRenderTimeout, _TimeLimit
+from .prompt_builder import PromptBuilder
+from .services import AIResumeGenerator
+from .single_flight import FlightCancelled, SingleFlight
+from .utils import (
+    PDF_FIT_SCALES,
+    TEMPLATE_IDS,
+    StylesheetRegistry,
+    generate_pdf_from_html,
+    get_fit_scale,
+    pdf_file_response,
+    render_pdf,
+    render_pdf_fit_pages,
+    render_pdf_templates_to_cache,
+    render_pdf_to_cache,
+    render_pdf_variants,
+    scale_template_css,
+)
+from .views import _fit_pages_param
+
+
+def create_user(username='alice'):
+    return get_user_model().objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password-123',
+        first_name='Alice',
+        last_name='Smith',
+    )
+
+
+class TempPDFCacheMixin:
+    """Point the process-wide PDF cache at a temp directory and render inline."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.pdf_cache = PDFCache(LocalPDFCacheStorage(self.cache_dir))
+        for target, value in (
+            ('resume.pdf_cache._pdf_cache', self.pdf_cache),
+            ('resume.pdf_pool._pdf_render_pool', PDFRenderPool(workers=0)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class StylesheetRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = StylesheetRegistry()
+
+    def test_stylesheet_is_compiled_once(self):
+        first = self.registry.get_stylesheet('classic')
+        second = self.registry.get_stylesheet('classic')
+
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.stats()['hits'], 1)
+        self.assertEqual(self.registry.stats()['misses'], 1)
+        self.assertEqual(self.registry.stats()['templates'], ['classic'])
+
+    def test_unknown_template_uses_modern(self):
+        self.assertIs(self.registry.get_stylesheet('unknown'), self.registry.get_stylesheet('modern'))
+
+    def test_scaled_stylesheets_are_cached_separately(self):
+        normal = self.registry.get_stylesheet('modern')
+        scaled = self.registry.get_stylesheet('modern', scale=0.9)
+
+        self.assertIsNot(normal, scaled)
+        self.assertEqual(self.registry.stats()['templates'], ['modern', 'modern@0.9'])
+
+    def test_font_configuration_is_shared(self):
+        self.assertFalse(self.registry.stats()['font_config_loaded'])
+        self.assertIs(self.registry.get_font_config(), self.registry.get_font_config())
+        self.assertTrue(self.registry.stats()['font_config_loaded'])
+
+    def test_counters_are_exact_across_threads(self):
+        self.registry.get_stylesheet('modern')
+
+        def fetch():
+            for _ in range(500):
+                self.registry.get_stylesheet('modern')
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.registry.stats()['hits'], 4000)
+        self.assertEqual(self.registry.stats()['misses'], 1)
+
+    def test_clear_resets_the_registry(self):
+        self.registry.get_stylesheet('modern')
+        self.registry.clear()
+
+        self.assertEqual(self.registry.stats(), {
+            'hits': 0, 'misses': 0, 'templates': [], 'font_config_loaded': False,
+        })
+
+
+class PDFCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = LocalPDFCacheStorage(self.location)
+        self.cache = PDFCache(self.storage, max_size=250, rescan_interval=60)
+        self.clock = 1_000_000
+
+    def put(self, key):
+        key = key * 64
+        self.cache.set(key, BytesIO(b'x' * 100))
+        # Explicit LRU timestamps so the order does not depend on timer resolution
+        self.clock += 10
+        os.utime(self.storage._path(key), (self.clock, self.clock))
+        return key
+
+    def test_least_recently_used_entry_is_evicted(self):
+        first = self.put('a')
+        second = self.put('b')
+        third = self.put('c')
+
+        self.assertFalse(self.cache.contains(first))
+        self.assertTrue(self.cache.contains(second))
+        self.assertTrue(self.cache.contains(third))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_reading_an_entry_keeps_it(self):
+        first = self.put('a')
+        second = self.put('b')
+        self.cache.open(first).close()
+        os.utime(self.storage._path(first), (self.clock + 5, self.clock + 5))
+
+        self.put('c')
+        self.assertTrue(self.cache.contains(first))
+        self.assertFalse(self.cache.contains(second))
+
+    def test_storage_is_listed_only_when_over_budget(self):
+        self.put('a')
+        self.put('b')
+        self.assertEqual(self.cache.scans, 1)
+
+        self.put('c')
+        self.assertEqual(self.cache.scans, 2)
+        self.assertLessEqual(self.cache.stats()['size'], 250)
+
+    def test_rescan_removes_stale_temp_files(self):
+        stale = self.cache.temp_path()
+        fresh = self.cache.temp_path()
+        old = time.time() - STALE_TEMP_AGE - 60
+        os.utime(stale, (old, old))
+
+        self.cache.evict()
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertEqual(self.cache.stats()['stale_temp_files'], 1)
+
+    def test_key_depends_on_content_template_and_fit(self):
+        key = pdf_cache_key('<p>Resume</p>', 'modern')
+
+        self.assertEqual(key, pdf_cache_key('<p>Resume</p>', 'modern'))
+        self.assertNotEqual(key, pdf_cache_key('<p>Resume!</p>', 'modern'))
+        self.assertNotEqual(key, pdf_cache_key('<p>Resume</p>', 'classic'))
+        self.assertNotEqual(key, pdf_cache_key('<p>Resume</p>', 'modern', fit_pages=1))
+
+
+class PDFDownloadCacheTests(TempPDFCacheMixin, SimpleTestCase):
+    html = '<h1>Alice Smith</h1>'
+
+    def download(self, **headers):
+        request = RequestFactory().get('/download/', **headers)
+        response = generate_pdf_from_html(self.html, 'resume.pdf', 'modern', request=request)
+        self.addCleanup(response.close)
+        return response
+
+    def test_second_download_is_served_from_the_cache(self):
+        first = self.download()
+        body = b''.join(first.streaming_content)
+        with mock.patch('resume.utils.render_pdf_to_cache') as render:
+            second = self.download()
+
+        render.assert_not_called()
+        self.assertEqual(b''.join(second.streaming_content), body)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.pdf_cache.stats()['hits'], 1)
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.download()['ETag']
+
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_stale_etag_returns_the_document(self):
+        response = self.download(HTTP_IF_NONE_MATCH='"outdated"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+class PDFRenderPoolTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def threaded_pool(self, **kwargs):
+        # Threads stand in for worker processes; the slot accounting is the same
+        pool = PDFRenderPool(**kwargs)
+        executor = ThreadPoolExecutor(max_workers=pool.workers)
+        self.addCleanup(executor.shutdown)
+        pool._get_executor = lambda: executor
+        return pool
+
+    def blocking_job(self, html_content, template, path, fit_pages=None, scale=None, time_limit=None):
+        self.release.wait(5)
+        return {'timings': {'layout': 0.1}, 'scale': 1.0}
+
+    def test_inline_render_writes_the_pdf(self):
+        timings = {}
+        scale = PDFRenderPool(workers=0).render('<h1>Alice</h1>', self.path, timings=timings)
+
+        self.assertEqual(scale, 1.0)
+        self.assertIn('layout', timings)
+        with open(self.path, 'rb') as f:
+            self.assertTrue(f.read().startswith(b'%PDF'))
+
+    def test_full_queue_rejects_renders(self):
+        pool = self.threaded_pool(workers=1, timeout=5, max_queue=0)
+        with mock.patch('resume.pdf_pool._render_job', self.blocking_job):
+            running = threading.Thread(target=pool.render, args=('<h1>A</h1>', self.path))
+            running.start()
+            while not pool.submitted:
+                time.sleep(0.001)
+
+            with self.assertRaises(PDFRenderQueueFull):
+                pool.render('<h1>B</h1>', self.path)
+
+            self.release.set()
+            running.join(5)
+            self.assertEqual(pool.render('<h1>C</h1>', self.path), 1.0)
+        self.assertEqual(pool.stats()['rejected'], 1)
+
+    def test_timed_out_render_keeps_its_slot_until_it_stops(self):
+        pool = self.threaded_pool(workers=1, timeout=0.05, max_queue=0)
+        with mock.patch('resume.pdf_pool._render_job', self.blocking_job):
+            with self.assertRaises(PDFRenderTimeout):
+                pool.render('<h1>A</h1>', self.path)
+            # The render is still running, so it still counts against the pool
+            with self.assertRaises(PDFRenderQueueFull):
+                pool.render('<h1>B</h1>', self.path)
+
+            self.release.set()
+            pool.timeout = 5
+            for _ in range(500):
+                try:
+                    pool.render('<h1>C</h1>', self.path)
+                    break
+                except PDFRenderQueueFull:
+                    time.sleep(0.01)
+        self.assertEqual(pool.stats()['timed_out'], 1)
+        self.assertEqual(pool.stats()['submitted'], 2)
+
+    def test_time_limit_interrupts_the_render(self):
+        with self.assertRaises(PDFRenderTimeout):
+            with _TimeLimit(0.05):
+                time.sleep(2)
+
+        # Disarmed afterwards
+        time.sleep(0.1)
+
+    def test_time_limit_is_inactive_outside_the_main_thread(self):
+        errors = []
+
+        def render():
+            try:
+                with _TimeLimit(0.01):
+                    time.sleep(0.05)
+            except PDFRenderTimeout as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=render)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, [])
+
+
+class PDFJobTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+
+    def test_pending_job_is_reused(self):
+        job = enqueue_pdf_job(self.user, 'portfolio')
+        self.assertEqual(enqueue_pdf_job(self.user, 'portfolio').pk, job.pk)
+        self.assertNotEqual(enqueue_pdf_job(self.user, 'portfolio', template='classic').pk, job.pk)
+
+    def test_claims_oldest_queued_job_once(self):
+        first = enqueue_pdf_job(self.user, 'portfolio')
+        second = enqueue_pdf_job(self.user, 'portfolio', template='classic')
+
+        self.assertEqual(claim_next_pdf_job().pk, first.pk)
+        self.assertEqual(claim_next_pdf_job().pk, second.pk)
+        self.assertIsNone(claim_next_pdf_job())
+        self.assertEqual(
+            PDFRenderJob.objects.filter(status=PDFRenderJob.STATUS_RUNNING).count(), 2
+        )
+
+
+class PDFJobViewTests(TempPDFCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.force_login(self.user)
+        self.resume = GeneratedResume.objects.create(user=self.user, content='<h2>Experience</h2>', template='modern')
+        self.url = reverse('resume_download_pdf', args=[self.resume.pk])
+
+    def test_post_renders_the_job_without_a_worker(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['status'], PDFRenderJob.STATUS_DONE)
+
+        download = self.client.get(payload['download_url'])
+        self.assertEqual(download['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    @override_settings(PDF_JOB_QUEUE_ENABLED=True)
+    def test_post_queues_the_job_for_the_worker(self):
+        response = self.client.post(self.url, {'template': 'classic'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], PDFRenderJob.STATUS_QUEUED)
+        self.assertEqual(PDFRenderJob.objects.get().template, 'classic')
+
+    @override_settings(PDF_JOB_QUEUE_ENABLED=True)
+    def test_unknown_template_uses_the_documents_own(self):
+        response = self.client.post(self.url, {'template': 'x' * 80})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(PDFRenderJob.objects.get().template, '')
+
+    def test_job_stuck_past_a_request_timeout_is_rendered_again(self):
+        job = enqueue_pdf_job(self.user, 'resume', self.resume)
+        PDFRenderJob.objects.filter(pk=job.pk).update(
+            status=PDFRenderJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.json()['status'], PDFRenderJob.STATUS_DONE)
+        self.assertEqual(PDFRenderJob.objects.count(), 1)
+
+
+class StreamingPDFTests(TempPDFCacheMixin, SimpleTestCase):
+    def test_render_writes_into_the_given_file(self):
+        target = BytesIO()
+        self.assertIs(render_pdf('<h1>Alice</h1>', target=target), target)
+        self.assertEqual(target.tell(), 0)
+        self.assertTrue(target.getvalue().startswith(b'%PDF'))
+
+    def test_render_without_target_returns_a_spooled_file(self):
+        pdf_file = render_pdf('<h1>Alice</h1>')
+        self.addCleanup(pdf_file.close)
+
+        self.assertIsInstance(pdf_file, tempfile.SpooledTemporaryFile)
+        self.assertTrue(pdf_file.read().startswith(b'%PDF'))
+
+    def test_response_streams_the_file(self):
+        path = self.pdf_cache.temp_path()
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.7 ' + b'x' * 100_000)
+        self.addCleanup(os.remove, path)
+
+        response = pdf_file_response(open(path, 'rb'), 'resume.pdf', etag='"abc"')
+        self.addCleanup(response.close)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Length'], '100009')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="resume.pdf"')
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(len(b''.join(response.streaming_content)), 100009)
+
+    def test_rendered_file_is_moved_into_the_cache(self):
+        path = self.pdf_cache.temp_path()
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.7')
+        key = 'ab' * 32
+
+        self.pdf_cache.set_path(key, path)
+
+        self.assertFalse(os.path.exists(path))
+        with self.pdf_cache.open(key) as f:
+            self.assertEqual(f.read(), b'%PDF-1.7')
+
+
+class DocumentExportTests(TempPDFCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client.force_login(self.user)
+        self.resume = GeneratedResume.objects.create(user=self.user, title='Modern', content='<h2>Skills</h2>')
+        self.letter = CoverLetter.objects.create(
+            user=self.user, title='Acme letter', company_name='Acme', position='Engineer', content='Dear team',
+        )
+        GeneratedResume.objects.create(user=create_user('bob'), title='Not mine', content='<p>Bob</p>')
+
+    def export(self):
+        response = self.client.get(reverse('export_documents_zip'))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_archive_holds_every_document_uncompressed(self):
+        archive = self.export()
+
+        self.assertEqual(sorted(archive.namelist()), [
+            f'cover_letters/{self.letter.pk}_Acme_letter.pdf',
+            f'resumes/{self.resume.pk}_Modern.pdf',
+        ])
+        for info in archive.infolist():
+            self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+            self.assertTrue(archive.read(info).startswith(b'%PDF'))
+
+    def test_failed_render_is_listed_in_the_archive(self):
+        with mock.patch('resume.pdf_export.render_pdf_to_cache', side_effect=RuntimeError('layout failed')):
+            archive = self.export()
+
+        self.assertEqual(archive.namelist(), ['export_errors.txt'])
+        self.assertIn('layout failed', archive.read('export_errors.txt').decode())
+
+
+@override_settings(PDF_PRERENDER_ON_SAVE=True)
+class PrerenderSignalTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        patcher = mock.patch('resume.pdf_jobs.prerender_document')
+        self.prerender = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save(self, obj, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.save(**kwargs)
+
+    def create_letter(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            letter = CoverLetter.objects.create(
+                user=self.user, company_name='Acme', position='Engineer', content='Dear team',
+            )
+        self.prerender.reset_mock()
+        return CoverLetter.objects.get(pk=letter.pk)
+
+    def test_new_document_is_prerendered_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            resume = GeneratedResume.objects.create(user=self.user, content='<p>Resume</p>')
+        self.prerender.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.prerender.assert_called_once_with(self.user, 'resume', resume)
+
+    def test_unchanged_save_is_skipped(self):
+        letter = self.create_letter()
+        letter.title = 'Renamed'
+
+        self.save(letter)
+        self.save(letter, update_fields=['title'])
+        self.prerender.assert_not_called()
+
+    def test_every_field_in_the_pdf_triggers_a_render(self):
+        letter = self.create_letter()
+        letter.position = 'Staff Engineer'
+        self.save(letter, update_fields=['position'])
+
+        letter.company_name = 'Globex'
+        self.save(letter)
+        self.assertEqual(self.prerender.call_count, 2)
+
+    def test_deferred_fields_are_not_assumed_unchanged(self):
+        self.create_letter()
+        letter = CoverLetter.objects.defer('position').get()
+        letter.position = 'Staff Engineer'
+
+        self.save(letter)
+        self.prerender.assert_called_once()
+
+    def test_queueing_errors_do_not_break_the_save(self):
+        self.prerender.side_effect = RuntimeError('executor shut down')
+
+        with self.assertLogs('resume.signals', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                GeneratedResume.objects.create(user=self.user, content='<p>Resume</p>')
+        self.assertEqual(GeneratedResume.objects.count(), 1)
+
+    @override_settings(PDF_PRERENDER_ON_SAVE=False)
+    def test_disabled_by_default(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            GeneratedResume.objects.create(user=self.user, content='<p>Resume</p>')
+        self.prerender.assert_not_called()
+
+
+class PrerenderTests(TempPDFCacheMixin, TestCase):
+    def test_prerender_fills_the_pdf_cache(self):
+        user = create_user()
+        resume = GeneratedResume.objects.create(user=user, content='<h2>Skills</h2>', template='classic')
+
+        # Runs in the test thread; the connection belongs to the test transaction
+        with mock.patch('resume.pdf_jobs.close_old_connections'):
+            _prerender(user, 'resume', resume)
+
+        html_content, _, template = build_pdf_document(user, 'resume', resume)
+        self.assertTrue(self.pdf_cache.contains(pdf_cache_key(html_content, template)))
+
+    def test_failed_prerender_is_logged(self):
+        user = create_user()
+        resume = GeneratedResume.objects.create(user=user, content='<h2>Skills</h2>')
+
+        with mock.patch('resume.pdf_jobs.close_old_connections'), \
+                mock.patch('resume.pdf_jobs.render_pdf_to_cache', side_effect=RuntimeError('no fonts')):
+            with self.assertLogs('resume.pdf_jobs', 'ERROR'):
+                _prerender(user, 'resume', resume)
+
+
+class BenchmarkPDFTests(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        samples = [0.004, 0.001, 0.003, 0.002]
+
+        self.assertEqual(percentile(samples, 50), 0.002)
+        self.assertEqual(percentile(samples, 95), 0.004)
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(summarize(samples), {'p50_ms': 2.0, 'p95_ms': 4.0, 'mean_ms': 2.5})
+
+    def test_report_covers_every_size_and_template(self):
+        fd, output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, output)
+
+        call_command(
+            'benchmark_pdf', sizes='1,3', templates='modern,classic', repeat=2, output=output, stdout=StringIO(),
+        )
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(
+            [(result['size'], result['template']) for result in report['results']],
+            [(1, 'modern'), (1, 'classic'), (3, 'modern'), (3, 'classic')],
+        )
+        for result in report['results']:
+            self.assertGreater(result['resume_pdf_bytes'], 0)
+            self.assertGreater(result['render_peak_kib'], 0)
+            self.assertEqual(set(result['render']), {'p50_ms', 'p95_ms', 'mean_ms'})
+        self.assertGreater(report['peak_rss_kb'], 0)
+        # Synthetic profiles are rolled back
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class HistogramTests(SimpleTestCase):
+    def test_percentiles_are_bucket_upper_bounds(self):
+        histogram = Histogram(buckets=(10, 100, 1000))
+        for value in [3] * 90 + [40] * 9 + [700]:
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['p50_ms'], 10)
+        self.assertEqual(snapshot['p95_ms'], 100)
+        self.assertEqual(snapshot['p99_ms'], 100)
+        self.assertEqual(snapshot['max_ms'], 700)
+        self.assertEqual(snapshot['buckets'], {'le_10': 90, 'le_100': 9, 'le_1000': 1, 'inf': 0})
+
+    def test_values_above_the_last_bucket_report_the_max(self):
+        histogram = Histogram(buckets=(10,))
+        histogram.observe(5)
+        histogram.observe(12345)
+
+        self.assertEqual(histogram.percentile(99), 12345)
+        self.assertEqual(histogram.snapshot()['buckets'], {'le_10': 1, 'inf': 1})
+
+    def test_percentile_never_exceeds_the_largest_value(self):
+        histogram = Histogram(buckets=(1000,))
+        histogram.observe(3)
+
+        self.assertEqual(histogram.percentile(50), 3)
+
+    def test_empty_histogram(self):
+        snapshot = Histogram().snapshot()
+
+        self.assertEqual(snapshot['count'], 0)
+        self.assertIsNone(snapshot['mean_ms'])
+        self.assertIsNone(snapshot['p50_ms'])
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_histograms_are_created_on_first_use(self):
+        registry = MetricsRegistry()
+        registry.observe('pdf.stage.layout', 12)
+        registry.observe('pdf.stage.layout', 30)
+        registry.observe('pdf.stage.css', 1)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(list(snapshot), ['pdf.stage.css', 'pdf.stage.layout'])
+        self.assertEqual(snapshot['pdf.stage.layout']['count'], 2)
+
+        registry.clear()
+        self.assertEqual(registry.snapshot(), {})
+
+
+class PDFRenderTraceTests(SimpleTestCase):
+    def setUp(self):
+        metrics_registry.clear()
+        self.addCleanup(metrics_registry.clear)
+
+    def test_finish_records_stages_and_logs_one_line(self):
+        trace = PDFRenderTrace('resume', 'classic')
+        with trace.stage('queries'):
+            pass
+        trace.add('layout', 0.25)
+        trace.add('layout', 0.25)
+
+        with self.assertLogs('resume.metrics', 'INFO') as logs:
+            trace.finish('miss', cache_key='abc')
+            trace.finish('hit')
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['outcome'], 'miss')
+        self.assertEqual(record['template'], 'classic')
+        self.assertEqual(record['cache_key'], 'abc')
+        self.assertEqual(record['stages_ms']['layout'], 500.0)
+        self.assertIn('queries', record['stages_ms'])
+
+        snapshot = metrics_registry.snapshot()
+        self.assertEqual(snapshot['pdf.stage.layout']['count'], 1)
+        self.assertEqual(snapshot['pdf.total.resume']['count'], 1)
+        self.assertEqual(snapshot['pdf.outcome.miss']['count'], 1)
+        self.assertNotIn('pdf.outcome.hit', snapshot)
+
+
+class MetricsViewTests(TempPDFCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics_registry.clear()
+        self.addCleanup(metrics_registry.clear)
+        self.user = create_user()
+
+    def test_requires_staff(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_reports_download_timings(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        resume = GeneratedResume.objects.create(user=self.user, content='<h2>Skills</h2>')
+        download = self.client.get(reverse('resume_download_pdf', args=[resume.pk]))
+        download.close()
+
+        metrics = self.client.get(reverse('metrics')).json()
+
+        timings = metrics['pdf_timings']
+        self.assertEqual(timings['pdf.total.resume']['count'], 1)
+        self.assertEqual(timings['pdf.outcome.miss']['count'], 1)
+        for stage in ('queries', 'html', 'cache', 'layout'):
+            self.assertEqual(timings[f'pdf.stage.{stage}']['count'], 1)
+        self.assertEqual(metrics['pdf_cache']['misses'], 1)
+
+
+class FitToPagesTests(TempPDFCacheMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.layouts = []
+        test = self
+
+        class Document:
+            def __init__(self, scale):
+                # Three pages at full size, two from 80% down
+                self.pages = [None] * (3 if scale > 0.8 else 2)
+                self.scale = scale
+
+            def write_pdf(self, target):
+                target.write(f'%PDF scale={self.scale}'.encode())
+
+        class HTML:
+            def __init__(self, string):
+                pass
+
+            def render(self, stylesheets, font_config):
+                test.layouts.append(stylesheets[0])
+                return Document(stylesheets[0])
+
+        # Stylesheets stand in for their scale so the layout can depend on it
+        for target, value in (
+            ('resume.utils.HTML', HTML),
+            ('resume.utils.stylesheet_registry.get_stylesheet', lambda template, scale=1.0: scale),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_largest_scale_that_fits_is_used(self):
+        pdf_file, scale = render_pdf_fit_pages('<p>Resume</p>', pages=2)
+
+        self.assertEqual(scale, 0.8)
+        self.assertEqual(pdf_file.read(), b'%PDF scale=0.8')
+        # Binary search, not a scan of every scale
+        self.assertLessEqual(len(self.layouts), 5)
+
+    def test_document_that_fits_is_not_scaled(self):
+        _, scale = render_pdf_fit_pages('<p>Resume</p>', pages=3)
+
+        self.assertEqual(scale, 1.0)
+        self.assertEqual(self.layouts, [1.0])
+
+    def test_smallest_scale_is_used_when_nothing_fits(self):
+        _, scale = render_pdf_fit_pages('<p>Resume</p>', pages=1)
+
+        self.assertEqual(scale, PDF_FIT_SCALES[-1])
+
+    def test_scale_is_remembered_per_document(self):
+        key = render_pdf_to_cache('<p>Resume</p>', fit_pages=2)
+        self.assertEqual(get_fit_scale('<p>Resume</p>', 'modern', 2), 0.8)
+
+        self.pdf_cache.storage.delete(key)
+        self.layouts.clear()
+        render_pdf_to_cache('<p>Resume</p>', fit_pages=2)
+        self.assertEqual(self.layouts, [0.8])
+
+
+class FitToPagesParamTests(SimpleTestCase):
+    def test_scale_css_lengths(self):
+        css = 'h1 { font-size: 20pt; margin: 10px 1.5cm; width: 50%; color: #123 } @page { margin: 2cm }'
+
+        self.assertEqual(
+            scale_template_css(css, 0.5),
+            'h1 { font-size: 10pt; margin: 5px 0.75cm; width: 50%; color: #123 } @page { margin: 1cm }',
+        )
+        self.assertIs(scale_template_css(css, 1.0), css)
+
+    @override_settings(PDF_FIT_MAX_PAGES=5)
+    def test_fit_pages_param_is_bounded(self):
+        def param(value):
+            return _fit_pages_param(RequestFactory().get('/', {'fit_pages': value}))
+
+        self.assertEqual(param('2'), 2)
+        for value in ('0', '6', '-1', 'two', ''):
+            self.assertIsNone(param(value))
+
+
+class TemplateVariantsTests(TempPDFCacheMixin, TestCase):
+    html = '<h1>Alice Smith</h1><h2>Skills</h2>'
+
+    def test_html_is_parsed_once_for_all_templates(self):
+        paths = {}
+        for template in ('modern', 'classic', 'minimal'):
+            paths[template] = self.pdf_cache.temp_path()
+            self.addCleanup(os.remove, paths[template])
+
+        with mock.patch('resume.utils.HTML', wraps=utils.HTML) as html:
+            render_pdf_variants(self.html, paths)
+
+        html.assert_called_once_with(string=self.html)
+        for path in paths.values():
+            with open(path, 'rb') as f:
+                self.assertTrue(f.read().startswith(b'%PDF'))
+
+    def test_only_uncached_templates_are_rendered(self):
+        render_pdf_to_cache(self.html, 'classic')
+
+        with mock.patch('resume.utils.render_pdf_variants', wraps=utils.render_pdf_variants) as variants:
+            cache_keys = render_pdf_templates_to_cache(self.html)
+
+        self.assertEqual(list(cache_keys), list(TEMPLATE_IDS))
+        self.assertNotIn('classic', variants.call_args.args[1])
+        self.assertEqual(len(variants.call_args.args[1]), len(TEMPLATE_IDS) - 1)
+        for cache_key in cache_keys.values():
+            self.assertTrue(self.pdf_cache.contains(cache_key))
+
+    def test_variant_links_are_served_from_the_cache(self):
+        user = create_user()
+        self.client.force_login(user)
+        resume = GeneratedResume.objects.create(user=user, content='<h2>Skills</h2>')
+
+        variants = self.client.get(reverse('resume_pdf_variants', args=[resume.pk])).json()['variants']
+        self.assertEqual(set(variants), set(TEMPLATE_IDS))
+
+        variant = variants['executive']
+        with mock.patch('resume.utils.render_pdf_to_cache') as render:
+            response = self.client.get(variant['download_url'], HTTP_IF_NONE_MATCH=variant['etag'])
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+
+def completion_payload(content='Hello', model='gpt-3.5-turbo'):
+    return {
+        'id': 'chatcmpl-test',
+        'object': 'chat.completion',
+        'created': 0,
+        'model': model,
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12},
+    }
+
+
+@override_settings(OPENAI_BASE_URL='', OPENAI_API_KEY='sk-test')
+class OpenAIClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = OpenAIClientRegistry()
+        self.addCleanup(self.registry.close)
+
+    def test_client_is_shared_per_key_and_base_url(self):
+        client = self.registry.get_client()
+
+        self.assertIs(self.registry.get_client(), client)
+        self.assertIsNot(self.registry.get_client(api_key='sk-other'), client)
+        self.assertIsNot(self.registry.get_client(base_url='http://llm.test/v1'), client)
+        self.assertEqual(len(self.registry.stats()), 3)
+
+    @override_settings(OPENAI_READ_TIMEOUT=42, OPENAI_CONNECT_TIMEOUT=3)
+    def test_client_uses_configured_timeouts_without_sdk_retries(self):
+        client = self.registry.get_client()
+
+        self.assertEqual(client.max_retries, 0)
+        self.assertEqual(client.timeout.read, 42)
+        self.assertEqual(client.timeout.connect, 3)
+
+    @override_settings(OPENAI_API_KEY='')
+    def test_no_client_without_a_key(self):
+        self.assertIsNone(self.registry.get_client())
+        self.assertEqual(get_api_key(), '')
+
+    @override_settings(OPENAI_API_KEY='', OPENAI_BASE_URL='http://127.0.0.1:8001/v1')
+    def test_local_base_url_needs_no_key(self):
+        self.assertEqual(get_api_key(), LOCAL_API_KEY)
+        self.assertEqual(str(self.registry.get_client().base_url), 'http://127.0.0.1:8001/v1/')
+
+    def test_transport_counts_requests_and_errors(self):
+        client = self.registry.get_client(base_url='http://llm.test/v1')
+        response = httpx.Response(200, json=completion_payload())
+
+        with mock.patch.object(httpx.HTTPTransport, 'handle_request', return_value=response):
+            completion = client.chat.completions.create(
+                model='gpt-3.5-turbo', messages=[{'role': 'user', 'content': 'Hi'}],
+            )
+        self.assertEqual(completion.choices[0].message.content, 'Hello')
+
+        with mock.patch.object(httpx.HTTPTransport, 'handle_request', side_effect=httpx.ConnectError('refused')):
+            with self.assertRaises(openai.APIConnectionError):
+                client.chat.completions.create(model='gpt-3.5-turbo', messages=[{'role': 'user', 'content': 'Hi'}])
+
+        stats = self.registry.stats()[0]
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['peak_in_flight'], 1)
+
+
+def chat_completion(content='Hello'):
+    return openai.types.chat.ChatCompletion.parse_obj(completion_payload(content))
+
+
+def mock_openai_client(*responses):
+    """Client whose chat.completions.create returns (or raises) `responses` in turn."""
+    client = mock.Mock()
+    client.chat.completions.create.side_effect = list(responses)
+    return client
+
+
+class LLMCacheKeyTests(SimpleTestCase):
+    params = {'model': 'gpt-3.5-turbo', 'max_tokens': 1500, 'temperature': 0.7}
+
+    def test_key_ignores_dict_order(self):
+        first = llm_cache_key('resume', {'name': 'Alice', 'skills': ['Python']}, 3, self.params)
+        second = llm_cache_key('resume', {'skills': ['Python'], 'name': 'Alice'}, 3, dict(reversed(self.params.items())))
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('llm:resume:'))
+
+    def test_key_changes_with_any_input(self):
+        data = {'name': 'Alice', 'start': date(2020, 1, 1)}
+        key = llm_cache_key('resume', data, 3, self.params)
+
+        self.assertNotEqual(key, llm_cache_key('cover_letter', data, 3, self.params))
+        self.assertNotEqual(key, llm_cache_key('resume', dict(data, name='Bob'), 3, self.params))
+        self.assertNotEqual(key, llm_cache_key('resume', data, 4, self.params))
+        self.assertNotEqual(key, llm_cache_key('resume', data, 3, dict(self.params, temperature=0.2)))
+        self.assertNotEqual(key, llm_cache_key('resume', dict(data, start=date(2021, 1, 1)), 3, self.params))
+
+
+class LLMResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['llm_responses'].clear()
+        self.cache = LLMResponseCache()
+
+    def test_hits_count_saved_tokens_and_latency(self):
+        self.assertIsNone(self.cache.get('llm:resume:a'))
+
+        self.cache.set('llm:resume:a', '<p>Resume</p>', total_tokens=120, latency=1.5)
+        self.assertEqual(self.cache.get('llm:resume:a'), '<p>Resume</p>')
+        self.assertEqual(self.cache.get('llm:resume:a'), '<p>Resume</p>')
+        self.cache.record_refresh()
+
+        self.assertEqual(self.cache.stats(), {
+            'hits': 2,
+            'misses': 1,
+            'forced_refreshes': 1,
+            'saved_tokens': 240,
+            'saved_seconds': 3.0,
+        })
+
+    def test_unknown_alias_uses_default_cache(self):
+        self.assertIs(LLMResponseCache('missing').cache, caches['default'])
+
+
+@override_settings(OPENAI_API_KEY='sk-test', OPENAI_BASE_URL='')
+class GeneratorCacheTests(TestCase):
+    def setUp(self):
+        caches['llm_responses'].clear()
+        self.user = create_user()
+        patcher = mock.patch('resume.services.usage_recorder')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generator(self, *responses):
+        generator = AIResumeGenerator(self.user)
+        generator.client = mock_openai_client(*responses)
+        return generator
+
+    def test_unchanged_profile_reuses_completion(self):
+        first = self.generator(chat_completion('<p>First</p>'))
+        self.assertEqual(first.generate_resume('modern', sections=False), (True, '<p>First</p>', None))
+        self.assertFalse(first.cache_hit)
+
+        second = self.generator()
+        self.assertEqual(second.generate_resume('modern', sections=False), (True, '<p>First</p>', None))
+        self.assertTrue(second.cache_hit)
+        second.client.chat.completions.create.assert_not_called()
+
+    def test_template_and_force_refresh_miss_the_cache(self):
+        self.generator(chat_completion('<p>Modern</p>')).generate_resume('modern', sections=False)
+
+        classic = self.generator(chat_completion('<p>Classic</p>'))
+        self.assertEqual(classic.generate_resume('classic', sections=False)[1], '<p>Classic</p>')
+
+        refreshed = self.generator(chat_completion('<p>Again</p>'))
+        self.assertEqual(refreshed.generate_resume('modern', force_refresh=True, sections=False)[1], '<p>Again</p>')
+        self.assertFalse(refreshed.cache_hit)
+        # The refreshed completion replaces the cached one
+        self.assertEqual(self.generator().generate_resume('modern', sections=False)[1], '<p>Again</p>')
+
+
+def completion_chunk(text):
+    return openai.types.chat.ChatCompletionChunk.parse_obj({
+        'id': 'chatcmpl-test',
+        'object': 'chat.completion.chunk',
+        'created': 0,
+        'model': 'gpt-3.5-turbo',
+        'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}],
+    })
+
+
+class FakeStream:
+    """Streamed completion yielding one chunk per text piece."""
+
+    def __init__(self, *texts):
+        self.chunks = [completion_chunk(text) for text in texts]
+        self.response = mock.Mock()
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+def sse_events(response):
+    """Consume a text/event-stream response as a list of (event, payload)."""
+    body = b''.join(response.streaming_content).decode()
+    response.close()
+    events = []
+    for block in body.strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+@override_settings(OPENAI_API_KEY='sk-test', OPENAI_BASE_URL='')
+class StreamingGenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['llm_responses'].clear()
+        self.user = create_user()
+        self.client.force_login(self.user)
+        self.openai = mock.Mock()
+        patchers = [
+            mock.patch('resume.services.usage_recorder'),
+            mock.patch('resume.services.get_openai_client', return_value=self.openai),
+            mock.patch('resume.views.llm_admission', AdmissionController()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_resume_is_relayed_token_by_token_and_saved(self):
+        self.openai.chat.completions.create.return_value = FakeStream('<h1>Alice', '</h1>', '<p>Engineer</p>')
+
+        response = self.client.post(reverse('generate_resume_stream'), {'template': 'classic'})
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = sse_events(response)
+        self.assertEqual(events[:3], [
+            ('token', {'text': '<h1>Alice'}),
+            ('token', {'text': '</h1>'}),
+            ('token', {'text': '<p>Engineer</p>'}),
+        ])
+        resume = GeneratedResume.objects.get(user=self.user)
+        self.assertEqual(events[3], ('done', {'url': reverse('resume_view', args=[resume.pk])}))
+        self.assertEqual(resume.content, '<h1>Alice</h1><p>Engineer</p>')
+        self.assertEqual(resume.template, 'classic')
+        self.assertTrue(self.openai.chat.completions.create.call_args.kwargs['stream'])
+
+    def test_streamed_completion_is_cached(self):
+        self.openai.chat.completions.create.return_value = FakeStream('<p>Cached</p>')
+        list(AIResumeGenerator(self.user).stream_resume(sections=False))
+
+        generator = AIResumeGenerator(self.user)
+        self.assertEqual(list(generator.stream_resume(sections=False)), ['<p>Cached</p>'])
+        self.assertTrue(generator.cache_hit)
+        self.assertEqual(self.openai.chat.completions.create.call_count, 1)
+
+    def test_disconnect_cancels_completion_and_saves_nothing(self):
+        stream = FakeStream('<p>One</p>', '<p>Two</p>')
+        self.openai.chat.completions.create.return_value = stream
+
+        response = self.client.post(reverse('generate_resume_stream'), {'idempotency_key': 'stream-key-1'})
+        events = iter(response.streaming_content)
+        self.assertIn(b'event: token', next(events))
+        response.close()
+
+        stream.response.close.assert_called_once()
+        self.assertFalse(GeneratedResume.objects.exists())
+        # The key is released so the form can be submitted again
+        self.assertFalse(GenerationRequest.objects.exists())
+
+    def test_unavailable_api_streams_fallback_cover_letter(self):
+        self.openai.chat.completions.create.side_effect = openai.APIConnectionError(request=httpx.Request('POST', 'http://llm.test'))
+
+        with override_settings(OPENAI_MAX_ATTEMPTS=1):
+            response = self.client.post(reverse('generate_cover_letter_stream'), {
+                'company_name': 'Acme', 'position': 'Engineer', 'job_description': '',
+            })
+
+        events = sse_events(response)
+        self.assertEqual([event for event, _ in events], ['token', 'done'])
+        self.assertIn('Engineer position at Acme', events[0][1]['text'])
+        self.assertEqual(CoverLetter.objects.get(user=self.user).company_name, 'Acme')
+
+
+@override_settings(GENERATION_JOB_VISIBILITY_TIMEOUT=300, GENERATION_JOB_RETRY_DELAY=10)
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.job = enqueue_generation_job(self.user, 'resume', 'modern')
+
+    def fake_generate(self, job, visibility_timeout):
+        return lambda: generation_jobs.save_generated_resume(job.user, job.template, '<p>Resume</p>')
+
+    def test_claim_leases_the_job_once(self):
+        job = claim_next_generation_job()
+
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertEqual(job.status, GenerationJob.STATUS_RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(claim_next_generation_job())
+
+    def test_expired_lease_is_reclaimed(self):
+        claim_next_generation_job()
+        GenerationJob.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        job = claim_next_generation_job()
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_last_attempt_fails(self):
+        GenerationJob.objects.update(
+            status=GenerationJob.STATUS_RUNNING,
+            attempts=3,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertIsNone(claim_next_generation_job())
+        self.assertEqual(GenerationJob.objects.get().status, GenerationJob.STATUS_FAILED)
+
+    def test_run_saves_the_document(self):
+        job = claim_next_generation_job()
+        with mock.patch.object(generation_jobs, '_generate', self.fake_generate):
+            run_generation_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(job.result_id, GeneratedResume.objects.get().pk)
+
+    def test_run_discards_the_document_after_losing_the_lease(self):
+        job = claim_next_generation_job()
+
+        def reclaimed(job, visibility_timeout):
+            # Another worker claims the job while this one is generating
+            GenerationJob.objects.update(locked_until=timezone.now() + timedelta(seconds=600))
+            return self.fake_generate(job, visibility_timeout)
+
+        with mock.patch.object(generation_jobs, '_generate', reclaimed):
+            run_generation_job(job)
+
+        self.assertFalse(GeneratedResume.objects.exists())
+        self.assertEqual(GenerationJob.objects.get().status, GenerationJob.STATUS_RUNNING)
+
+    def test_failed_attempt_is_requeued_with_backoff(self):
+        job = claim_next_generation_job()
+        with mock.patch.object(generation_jobs, '_generate', side_effect=RuntimeError('API down')):
+            run_generation_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_QUEUED)
+        self.assertEqual(job.error, 'API down')
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+        self.assertIsNone(claim_next_generation_job())
+
+    def test_run_uses_the_claimed_lease_length(self):
+        job = claim_next_generation_job(visibility_timeout=60)
+        leases = []
+
+        def save(user, template_id, content):
+            leases.append(GenerationJob.objects.get().locked_until - timezone.now())
+            return GeneratedResume.objects.create(user=user, title='Resume', content=content, template=template_id)
+
+        with mock.patch.object(generation_jobs, 'AIResumeGenerator') as generator, \
+                mock.patch.object(generation_jobs, 'save_generated_resume', save):
+            generator.return_value.generate_resume.return_value = (True, '<p>Resume</p>', None)
+            run_generation_job(job, visibility_timeout=60)
+
+        self.assertEqual(generator.call_args.kwargs['deadline'], 30)
+        # The lease is renewed for the claimed length, not the 300s setting
+        self.assertLessEqual(leases[0], timedelta(seconds=60))
+        self.assertGreater(leases[0], timedelta(seconds=50))
+        self.assertEqual(GenerationJob.objects.get().status, GenerationJob.STATUS_DONE)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_followers_share_the_leaders_result(self):
+        flight = SingleFlight()
+        call, leader = flight.begin('key')
+        follower_call, follower_leader = flight.begin('key')
+
+        self.assertTrue(leader)
+        self.assertFalse(follower_leader)
+        self.assertIs(follower_call, call)
+
+        flight.finish('key', call, result='resume')
+        self.assertEqual(flight.wait(follower_call, timeout=1), 'resume')
+        self.assertEqual(flight.stats(), {'in_flight': 0, 'leaders': 1, 'shared': 1, 'timeouts': 0})
+
+    def test_concurrent_calls_run_once(self):
+        waiting = threading.Semaphore(0)
+
+        class CountingFlight(SingleFlight):
+            def wait(self, call, timeout=None):
+                waiting.release()
+                return super().wait(call, timeout)
+
+        flight = CountingFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def generate():
+            calls.append(1)
+            release.wait(5)
+            return 'resume'
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', generate))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        # Hold the leader until the three followers are waiting on its call
+        for _ in range(3):
+            self.assertTrue(waiting.acquire(timeout=5))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('resume', False)] + [('resume', True)] * 3)
+
+    def test_leader_error_is_raised_in_followers(self):
+        flight = SingleFlight()
+        call, _ = flight.begin('key')
+        follower_call, _ = flight.begin('key')
+
+        flight.finish('key', call, error=ValueError('API error'))
+        with self.assertRaises(ValueError):
+            flight.wait(follower_call, timeout=1)
+
+    def test_follower_retries_when_leader_is_cancelled(self):
+        flight = SingleFlight()
+        call, _ = flight.begin('key')
+        flight.finish('key', call, error=FlightCancelled())
+
+        self.assertEqual(flight.do('key', lambda: 'own result'), ('own result', False))
+
+    def test_wait_times_out(self):
+        flight = SingleFlight()
+        call, _ = flight.begin('key')
+
+        with self.assertRaises(TimeoutError):
+            flight.wait(call, timeout=0.01)
+        self.assertEqual(flight.stats()['timeouts'], 1)
+
+
+@override_settings(IDEMPOTENCY_PENDING_LEASE=120)
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+
+    def test_without_key_nothing_is_recorded(self):
+        self.assertEqual(claim_generation_request(self.user, None, 'resume'), (None, False))
+        self.assertFalse(GenerationRequest.objects.exists())
+
+    def test_resubmission_is_replayed(self):
+        record, replay = claim_generation_request(self.user, 'key-0001', 'resume')
+        self.assertFalse(replay)
+
+        again, replay = claim_generation_request(self.user, 'key-0001', 'resume')
+        self.assertTrue(replay)
+        self.assertEqual(again.pk, record.pk)
+        self.assertEqual(
+            get_request_status_url(again), reverse('generation_request_status', args=[record.pk])
+        )
+
+    def test_replay_points_to_the_result(self):
+        record, _ = claim_generation_request(self.user, 'key-0001', 'resume')
+        resume = GeneratedResume.objects.create(user=self.user, title='Resume', content='<p>Resume</p>')
+        complete_generation_request(record, obj=resume)
+
+        again, replay = claim_generation_request(self.user, 'key-0001', 'resume')
+        self.assertTrue(replay)
+        self.assertEqual(get_request_status_url(again), reverse('resume_view', args=[resume.pk]))
+
+    def test_released_key_can_be_claimed_again(self):
+        record, _ = claim_generation_request(self.user, 'key-0001', 'resume')
+        release_generation_request(record)
+
+        _, replay = claim_generation_request(self.user, 'key-0001', 'resume')
+        self.assertFalse(replay)
+
+    def test_stale_pending_request_is_taken_over(self):
+        record, _ = claim_generation_request(self.user, 'key-0001', 'resume')
+        GenerationRequest.objects.update(created_at=timezone.now() - timedelta(seconds=300))
+
+        again, replay = claim_generation_request(self.user, 'key-0001', 'resume')
+        self.assertFalse(replay)
+        self.assertEqual(again.pk, record.pk)
+        self.assertGreater(again.created_at, timezone.now() - timedelta(seconds=60))
+
+    @override_settings(OPENAI_API_KEY='', OPENAI_BASE_URL='', GENERATION_QUEUE_ENABLED=False)
+    def test_double_submit_generates_once(self):
+        self.client.force_login(self.user)
+        with mock.patch('resume.views.llm_admission', AdmissionController()):
+            first = self.client.post(reverse('generate_resume'), {'template': 'modern', 'idempotency_key': 'key-0001'})
+            second = self.client.post(reverse('generate_resume'), {'template': 'modern', 'idempotency_key': 'key-0001'})
+
+        resume = GeneratedResume.objects.get(user=self.user)
+        self.assertRedirects(first, reverse('resume_view', args=[resume.pk]), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse('resume_view', args=[resume.pk]), fetch_redirect_response=False)
+
+
+class LLMStubTests(SimpleTestCase):
+    config = {
+        'latency': 0.0,
+        'jitter': 0.0,
+        'tokens_per_second': 0.0,
+        'completion_tokens': 50,
+        'error_rate': 0.0,
+        'error_status': 500,
+        'model': 'stub-model',
+    }
+
+    def start(self, **config):
+        server = StubServer(('127.0.0.1', 0), dict(self.config, **config), lambda status, line: None)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        registry = OpenAIClientRegistry()
+        self.addCleanup(registry.close)
+        client = registry.get_client(api_key=LOCAL_API_KEY, base_url=f'http://127.0.0.1:{server.server_port}/v1')
+        return server, client
+
+    def complete(self, client, **kwargs):
+        messages = [{'role': 'system', 'content': 'You are a resume writer.'}, {'role': 'user', 'content': 'Hi'}]
+        return client.chat.completions.create(model='gpt-3.5-turbo', messages=messages, **kwargs)
+
+    def test_completion_is_capped_by_max_tokens(self):
+        server, client = self.start()
+
+        completion = self.complete(client, max_tokens=10)
+
+        self.assertEqual(completion.usage.completion_tokens, 10)
+        self.assertTrue(completion.choices[0].message.content.startswith('<div class="header">'))
+        self.assertEqual(completion.model, 'gpt-3.5-turbo')
+        self.assertEqual(server.requests, 1)
+
+    def test_streamed_completion(self):
+        server, client = self.start(completion_tokens=12)
+
+        stream = self.complete(client, stream=True)
+        pieces = [chunk.choices[0].delta.content for chunk in stream if chunk.choices[0].delta.content]
+
+        self.assertEqual(len(pieces), 12)
+        self.assertEqual(pieces[:3], ['<div class="header">', '<h1>Stub Candidate</h1>', '</div>'])
+
+    def test_simulated_errors(self):
+        server, client = self.start(error_rate=1.0, error_status=503)
+
+        with self.assertRaises(openai.APIStatusError) as raised:
+            self.complete(client)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(server.errors, 1)
+
+    def test_models(self):
+        server, client = self.start()
+
+        self.assertEqual([model.id for model in client.models.list()], ['stub-model'])
+
+    def test_stub_tokens_are_plain_text_for_other_prompts(self):
+        tokens = stub_completion_tokens('You are a career coach.', 45, random.Random(0))
+
+        self.assertEqual(len(tokens), 45)
+        self.assertNotIn('<', ''.join(tokens))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('resume.llm_resilience.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def open_breaker(self):
+        for _ in range(2):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_half_open_allows_a_single_trial(self):
+        self.open_breaker()
+        self.now += 31
+
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_successful_trial_closes(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_opens_again(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.opens, 2)
+        self.assertFalse(self.breaker.allow())
+
+    def test_released_trial_lets_the_next_call_through(self):
+        self.open_breaker()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+
+def api_status_error(error_class, status):
+    request = httpx.Request('POST', 'http://llm.test/v1/chat/completions')
+    return error_class(f'HTTP {status}', response=httpx.Response(status, request=request), body=None)
+
+
+@override_settings(OPENAI_MAX_ATTEMPTS=3, OPENAI_RETRY_BASE_DELAY=0.01, OPENAI_RETRY_MAX_DELAY=0.01)
+class CallWithResilienceTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+
+    def test_transient_errors_are_retried_within_the_deadline(self):
+        fn = mock.Mock(side_effect=[api_status_error(openai.InternalServerError, 502), 'resume'])
+
+        self.assertEqual(call_with_resilience(fn, Deadline(10), self.breaker), 'resume')
+        self.assertEqual(fn.call_count, 2)
+        # Each attempt gets what is left of the deadline as its timeout
+        self.assertLessEqual(fn.call_args_list[1].args[0], fn.call_args_list[0].args[0])
+        self.assertLessEqual(fn.call_args_list[0].args[0], 10)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_gives_up_after_max_attempts(self):
+        fn = mock.Mock(side_effect=api_status_error(openai.RateLimitError, 429))
+
+        with self.assertRaises(LLMUnavailable):
+            call_with_resilience(fn, Deadline(10), self.breaker)
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(self.breaker.failures, 3)
+
+    def test_request_errors_are_not_retried(self):
+        fn = mock.Mock(side_effect=api_status_error(openai.BadRequestError, 400))
+
+        with self.assertRaises(openai.BadRequestError):
+            call_with_resilience(fn, Deadline(10), self.breaker)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_expired_deadline_skips_the_call(self):
+        fn = mock.Mock()
+
+        with self.assertRaises(DeadlineExceeded):
+            call_with_resilience(fn, Deadline(0), self.breaker)
+        fn.assert_not_called()
+
+    def test_open_breaker_skips_the_call(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        fn = mock.Mock()
+
+        with self.assertRaises(CircuitOpenError):
+            call_with_resilience(fn, Deadline(10), breaker)
+        fn.assert_not_called()
+
+
+@override_settings(
+    LLM_MAX_CONCURRENT=1,
+    LLM_MAX_WAITING=0,
+    LLM_ADMISSION_WAIT=0,
+    LLM_ADMISSION_LEASE=60,
+    LLM_USER_BURST=2,
+    LLM_USER_RATE_PER_MINUTE=1,
+    LLM_USER_BUCKET_TTL=3600,
+)
+class AdmissionTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.controller = AdmissionController()
+
+    def test_token_bucket_limits_bursts(self):
+        for _ in range(2):
+            self.controller.admit(self.user).release()
+
+        with self.assertRaises(UserRateLimited) as raised:
+            self.controller.admit(self.user)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_slots_are_shared_between_processes(self):
+        other_process = AdmissionController()
+        ticket = self.controller.acquire()
+
+        with self.assertRaises(Overloaded):
+            other_process.acquire()
+
+        ticket.release()
+        other_process.acquire().release()
+
+    def test_overloaded_admission_is_not_charged(self):
+        ticket = self.controller.acquire()
+        with self.assertRaises(Overloaded):
+            self.controller.admit(self.user)
+        ticket.release()
+
+        self.assertEqual(UserRateBucket.objects.get(user=self.user).tokens, 2)
+
+    def test_expired_lease_frees_the_slot(self):
+        self.controller.acquire()
+        AdmissionSlot.objects.update(lease_until=timezone.now() - timedelta(seconds=1))
+
+        AdmissionController().acquire().release()
+
+    def test_idle_buckets_are_pruned(self):
+        self.controller.admit(self.user).release()
+        UserRateBucket.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+
+        AdmissionController().check_rate(create_user('bob'))
+
+        self.assertFalse(UserRateBucket.objects.filter(user=self.user).exists())
+
+    def test_deleted_slot_rows_are_recreated(self):
+        self.controller.acquire().release()
+        AdmissionSlot.objects.all().delete()
+
+        self.controller.acquire().release()
+        self.assertEqual(AdmissionSlot.objects.filter(kind=AdmissionSlot.KIND_ACTIVE).count(), 1)
+
+
+@override_settings(OPENAI_API_KEY='sk-test', OPENAI_BASE_URL='')
+class SectionGenerationTests(TestCase):
+    def setUp(self):
+        caches['llm_responses'].clear()
+        self.user = create_user()
+        Profile.objects.create(user=self.user, summary='Backend engineer.', skills='Python, Django')
+        self.experience = Experience.objects.create(
+            user=self.user, company='Acme', position='Engineer', start_date=date(2020, 1, 1), description='Built APIs.',
+        )
+        self.openai = mock.Mock()
+        self.openai.chat.completions.create.side_effect = lambda **kwargs: chat_completion('<div class="section">Section</div>')
+        patchers = [
+            mock.patch('resume.services.usage_recorder'),
+            mock.patch('resume.services.get_openai_client', return_value=self.openai),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_changed_sections_are_prompted_again(self):
+        generator = AIResumeGenerator(self.user)
+        success, content, _ = generator.generate_resume('modern', sections=True)
+
+        self.assertTrue(success)
+        self.assertEqual(generator.sections_generated, ['header', 'summary', 'experience', 'skills'])
+        self.assertEqual(content.count('Section'), 4)
+
+        self.experience.description = 'Built APIs and led the team.'
+        self.experience.save()
+        generator = AIResumeGenerator(self.user)
+        generator.generate_resume('modern', sections=True)
+
+        self.assertEqual(generator.sections_generated, ['experience'])
+        self.assertEqual(generator.sections_reused, ['header', 'summary', 'education', 'projects', 'skills'])
+        self.assertEqual(self.openai.chat.completions.create.call_count, 5)
+
+    def test_all_section_prompts_share_one_deadline(self):
+        deadlines = []
+
+        def call(fn, deadline):
+            deadlines.append(deadline)
+            return fn(deadline.remaining())
+
+        with mock.patch('resume.services.call_with_resilience', side_effect=call):
+            AIResumeGenerator(self.user, deadline=20).generate_resume('modern', sections=True)
+            AIResumeGenerator(self.user, deadline=20).generate_resume('classic', sections=True)
+
+        self.assertEqual(len(deadlines), 8)
+        self.assertEqual(len({id(deadline) for deadline in deadlines[:4]}), 1)
+        self.assertIsNot(deadlines[4], deadlines[0])
+        self.assertEqual(deadlines[0].seconds, 20)
+
+    def test_slow_sections_exhaust_the_generation_budget(self):
+        clock = [1000.0]
+
+        def slow_completion(**kwargs):
+            clock[0] += 8
+            return chat_completion('<div class="section">Section</div>')
+
+        self.openai.chat.completions.create.side_effect = slow_completion
+        with mock.patch('resume.llm_resilience.time.monotonic', side_effect=lambda: clock[0]):
+            generator = AIResumeGenerator(self.user, deadline=20)
+            success, content, _ = generator.generate_resume('modern', sections=True)
+
+        # Three 8s sections use up the 20s budget; the resume falls back instead of running 6 x 20s
+        self.assertEqual(self.openai.chat.completions.create.call_count, 3)
+        self.assertTrue(generator.used_fallback)
+        self.assertTrue(success)
+
+
+class UsageCostTests(SimpleTestCase):
+    def test_cost_from_per_1k_token_prices(self):
+        self.assertEqual(estimate_cost('gpt-3.5-turbo', 1000, 2000), Decimal('0.003500'))
+        # Dated snapshots are priced like their base model
+        self.assertEqual(estimate_cost('gpt-4o-mini-2024-07-18', 1000, 1000), Decimal('0.000750'))
+        self.assertEqual(estimate_cost('unknown-model', 1000, 1000), Decimal('0'))
+
+    def test_token_estimate(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abc'), 1)
+        self.assertEqual(estimate_tokens('x' * 400), 100)
+
+
+@override_settings(LLM_USAGE_BATCH_SIZE=3, LLM_USAGE_FLUSH_INTERVAL=60)
+class UsageRecorderTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.recorder = UsageRecorder()
+        self.addCleanup(self.recorder.flush)
+
+    def test_records_are_written_in_batches(self):
+        for _ in range(2):
+            self.recorder.record(user=self.user, kind='resume', model='gpt-3.5-turbo', prompt_tokens=100, latency=1.2)
+        self.assertFalse(LLMUsage.objects.exists())
+        self.assertEqual(self.recorder.stats()['buffered'], 2)
+
+        self.recorder.record(user=self.user, kind='resume', model='gpt-3.5-turbo', stream=True, ttft=0.25)
+
+        self.assertEqual(LLMUsage.objects.count(), 3)
+        self.assertEqual(self.recorder.stats(), {'recorded': 3, 'flushed': 3, 'buffered': 0, 'flush_errors': 0})
+        row = LLMUsage.objects.filter(stream=False).first()
+        self.assertEqual(row.latency_ms, 1200)
+        self.assertEqual(LLMUsage.objects.get(stream=True).ttft_ms, 250)
+
+    @override_settings(LLM_USAGE_FLUSH_INTERVAL=0.05)
+    def test_timer_flushes_an_idle_buffer(self):
+        flushed = threading.Event()
+
+        with mock.patch.object(self.recorder, 'flush', side_effect=lambda: flushed.set()), \
+                mock.patch('resume.llm_usage.connection'):
+            self.recorder.record(user=self.user, kind='resume', model='gpt-3.5-turbo')
+            self.assertTrue(flushed.wait(5))
+
+    def test_failed_flush_is_counted(self):
+        self.recorder.record(user=self.user, kind='resume', model='gpt-3.5-turbo')
+
+        with mock.patch.object(LLMUsage.objects, 'bulk_create', side_effect=RuntimeError('database is locked')):
+            self.assertEqual(self.recorder.flush(), 0)
+        self.assertEqual(self.recorder.stats()['flush_errors'], 1)
+
+
+@override_settings(OPENAI_API_KEY='sk-test', OPENAI_BASE_URL='', LLM_USAGE_BATCH_SIZE=20, LLM_USAGE_FLUSH_INTERVAL=60)
+class LLMUsageViewTests(TestCase):
+    def setUp(self):
+        caches['llm_responses'].clear()
+        self.user = create_user()
+        self.recorder = UsageRecorder()
+        patchers = [
+            mock.patch('resume.services.usage_recorder', self.recorder),
+            mock.patch('resume.views.usage_recorder', self.recorder),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.recorder.flush)
+
+    def test_requires_staff(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('llm_usage')).status_code, 302)
+
+    def test_reports_buffered_generation_usage(self):
+        generator = AIResumeGenerator(self.user)
+        generator.client = mock_openai_client(chat_completion('<p>Resume</p>'))
+        generator.generate_resume('classic', sections=False)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('llm_usage'), {'group': 'template'})
+
+        rows = response.json()['rows']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['template'], 'classic')
+        self.assertEqual(rows[0]['calls'], 1)
+        self.assertEqual(rows[0]['prompt_tokens'], 10)
+        self.assertEqual(rows[0]['completion_tokens'], 2)
+        self.assertEqual(rows[0]['errors'], 0)
+
+    def test_rejects_unknown_group(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('llm_usage'), {'group': 'colour'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('llm_usage'), {'days': 'all'}).status_code, 400)
+
+
+class PromptBuilderTests(SimpleTestCase):
+    def experience(self, position, end_date, description_length=600):
+        return {
+            'position': position,
+            'company': 'Acme',
+            'start_date': 'January 2010',
+            'end_date': end_date,
+            'description': ' '.join(['Built Python services'] * (description_length // 22)),
+        }
+
+    def test_prompt_within_budget_is_unchanged(self):
+        entries = [self.experience('Engineer', 'Present', 100)]
+        builder = PromptBuilder(budget=10_000).add('Write a resume.\n').add_entries('experience', entries)
+
+        prompt = builder.build()
+        self.assertIn(entries[0]['description'], prompt)
+        self.assertEqual(builder.compacted, [])
+        self.assertEqual(builder.tokens, builder.original_tokens)
+
+    def test_least_important_entries_are_compacted_first(self):
+        entries = [
+            self.experience('Current role', 'Present'),
+            self.experience('Old role', 'January 2005'),
+            self.experience('Older role', 'January 2001'),
+        ]
+        builder = PromptBuilder(budget=350).add('Write a resume.\n').add_entries('experience', entries)
+
+        prompt = builder.build()
+        self.assertIn('Current role', prompt)
+        self.assertIn(entries[0]['description'], prompt)
+        self.assertLessEqual(builder.tokens, 350)
+        self.assertLess(builder.tokens, builder.original_tokens)
+        self.assertEqual(
+            {item['entry'] for item in builder.compacted},
+            {'Old role at Acme', 'Older role at Acme'},
+        )
+
+    def test_one_entry_per_section_is_kept(self):
+        entries = [self.experience('Only role', 'January 2001', 4000)]
+        builder = PromptBuilder(budget=10).add_entries('experience', entries)
+
+        prompt = builder.build()
+        self.assertIn('Only role', prompt)
+        self.assertEqual(builder.dropped, [])
+        self.assertEqual(len(builder.trimmed), 1)
+
+    def test_zero_budget_disables_compaction(self):
+        entries = [self.experience('Role', 'January 2001', 4000)]
+        builder = PromptBuilder(budget=0).add_entries('experience', entries)
+
+        builder.build()
+        self.assertEqual(builder.compacted, [])
+
+
+@override_settings(OPENAI_API_KEY='sk-test', OPENAI_BASE_URL='', RESUME_PROMPT_TOKEN_BUDGET=400)
+class PromptCompactionTests(TestCase):
+    def setUp(self):
+        caches['llm_responses'].clear()
+        self.user = create_user()
+        for year in range(2000, 2012):
+            Experience.objects.create(
+                user=self.user, company=f'Company {year}', position='Engineer', start_date=date(year, 1, 1),
+                end_date=date(year + 1, 1, 1), description='Built Python services for customers. ' * 15,
+            )
+        patcher = mock.patch('resume.services.usage_recorder')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_long_profile_prompt_is_compacted_to_the_budget(self):
+        generator = AIResumeGenerator(self.user)
+        generator.client = mock_openai_client(chat_completion('<p>Resume</p>'))
+
+        generator.generate_resume('modern', sections=False)
+
+        prompt = generator.client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        self.assertTrue(generator.prompt_compaction)
+        self.assertLess(len(prompt), 12 * len('Built Python services for customers. ' * 15))
+        self.assertIn('Company 2011', prompt)
+
+
+@override_settings(
+    OPENAI_API_KEY='', OPENAI_BASE_URL='', GENERATION_QUEUE_ENABLED=False, LLM_BATCH_CONCURRENCY=3,
+    LLM_MAX_CONCURRENT=2, LLM_MAX_WAITING=0, LLM_ADMISSION_WAIT=0, LLM_USER_BURST=3, LLM_USER_RATE_PER_MINUTE=1,
+)
+class BatchAdmissionTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_login(self.user)
+        self.controller = AdmissionController()
+        patcher = mock.patch('resume.views.llm_admission', self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, *templates):
+        return self.client.post(reverse('generate_resume_batch'), {'templates': list(templates)})
+
+    def test_each_template_is_charged(self):
+        self.post('modern', 'classic')
+
+        self.assertEqual(GeneratedResume.objects.filter(user=self.user).count(), 2)
+        self.assertAlmostEqual(UserRateBucket.objects.get(user=self.user).tokens, 1, places=1)
+        # One token left: a second two-template batch is rate limited
+        self.assertEqual(self.post('minimal', 'creative').status_code, 429)
+        self.assertEqual(GeneratedResume.objects.filter(user=self.user).count(), 2)
+
+    def test_batch_runs_only_as_many_templates_at_once_as_slots_held(self):
+        busy = self.controller.acquire()
+        self.addCleanup(busy.release)
+
+        with mock.patch('resume.views.AIResumeGenerator.generate_resumes', autospec=True) as generate:
+            generate.return_value = {'modern': (True, '<p>M</p>', None), 'classic': (True, '<p>C</p>', None)}
+            self.post('modern', 'classic', 'minimal')
+
+        self.assertEqual(generate.call_args.kwargs['concurrency'], 1)
+        # The batch's slot was released; only the other request still holds one
+        self.assertEqual(self.controller.stats()['active'], 1)
+
+    def test_batch_takes_free_slots_without_waiting(self):
+        tickets = self.controller.admit_batch(self.user, 3, 3)
+
+        self.assertEqual(len(tickets), 2)
+        with self.assertRaises(Overloaded):
+            self.controller.acquire()
+        for ticket in tickets:
+            ticket.release()
+
+    def test_batch_larger_than_the_burst_is_refused(self):
+        response = self.post('modern', 'classic', 'minimal', 'creative')
+
+        self.assertRedirects(response, reverse('generate_resume'), fetch_redirect_response=False)
+        self.assertFalse(UserRateBucket.objects.exists())
+
+    def test_overloaded_batch_is_not_charged(self):
+        held = [self.controller.acquire(), self.controller.acquire()]
+
+        self.assertEqual(self.post('modern', 'classic').status_code, 429)
+        self.assertEqual(UserRateBucket.objects.get(user=self.user).tokens, 3)
+        for ticket in held:
+            ticket.release()
+
+
+def fallback_data(**overrides):
+    data = {
+        'name': 'Alice Smith',
+        'email': 'alice@example.com',
+        'phone': '+1 555 0100',
+        'profile': {
+            'career_objective': 'Lead platform teams.',
+            'summary': 'Backend engineer.',
+            'skills': ['Python', 'Django', 'React'],
+            'location': 'Berlin',
+            'linkedin': 'https://linkedin.com/in/alice',
+            'github': '',
+            'portfolio': '',
+        },
+        'education': [{
+            'institution': 'TU Berlin', 'degree': 'Bachelor', 'field': 'Computer Science',
+            'start_date': 'October 2012', 'end_date': 'July 2016', 'grade': '1.3', 'description': '',
+        }],
+        'experience': [{
+            'company': 'Acme', 'position': 'Engineer', 'type': 'Full Time', 'location': 'Remote',
+            'start_date': 'January 2020', 'end_date': 'Present', 'description': 'Built Django APIs.',
+        }],
+        'projects': [{
+            'title': 'Portfolio', 'description': 'A React site.', 'technologies': ['React'],
+            'url': '', 'start_date': 'May 2021', 'end_date': 'Present',
+        }],
+    }
+    data.update(overrides)
+    return data
+
+
+class FallbackRendererTests(SimpleTestCase):
+    def test_matches_the_original_builders(self):
+        data = fallback_data()
+        for template in FALLBACK_TEMPLATES:
+            with self.subTest(template=template):
+                self.assertEqual(render_fallback_resume(data, template), LEGACY_RENDERERS[template](data))
+
+    def test_profile_fields_are_escaped(self):
+        data = fallback_data(name='<b>Alice</b>')
+        data['experience'][0]['description'] = '<script>alert("x")</script> & more'
+        data['profile']['skills'] = ['C++ & <Rust>']
+        data['projects'][0]['technologies'] = ['<img src=x>']
+
+        for template in FALLBACK_TEMPLATES:
+            with self.subTest(template=template):
+                html = render_fallback_resume(data, template)
+                self.assertNotIn('<script>', html)
+                self.assertNotIn('<b>', html)
+                self.assertNotIn('<Rust>', html)
+                self.assertNotIn('<img', html)
+                self.assertIn('&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; more', html)
+
+    def test_unknown_template_uses_modern(self):
+        data = fallback_data()
+        self.assertEqual(render_fallback_resume(data, 'unknown'), render_fallback_resume(data, 'modern'))
+
+    def test_empty_profile(self):
+        html = render_fallback_resume(fallback_data(name='', profile=None, education=[], experience=[], projects=[]))
+
+        self.assertIn('<h1>Your Name</h1>', html)
+        self.assertNotIn('class="section"', html)
+
+    def test_targeted_skills_and_projects_come_first(self):
+        data = fallback_data(projects=[
+            {'title': 'Game', 'description': 'Unity game.', 'technologies': ['C#'], 'url': '', 'start_date': '', 'end_date': ''},
+            {'title': 'API', 'description': 'Django API.', 'technologies': ['Django'], 'url': '', 'start_date': '', 'end_date': ''},
+        ])
+        data['target'] = {'keywords': ['django'], 'skills': [0, 1, 0], 'projects': [0, 1], 'experience': [1], 'education': [0]}
+
+        html = render_fallback_resume(data, 'modern')
+
+        self.assertLess(html.index('<li>Django</li>'), html.index('<li>Python</li>'))
+        self.assertLess(html.index('<h3>API</h3>'), html.index('<h3>Game</h3>'))
+
+
+class BenchmarkFallbackTests(TestCase):
+    def test_writes_report(self):
+        fd, output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, output)
+
+        call_command('benchmark_fallback', sizes='1', repeat=1, output=output, stdout=StringIO())
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(len(report['results']), len(FALLBACK_TEMPLATES))
+        self.assertIn('p50_ms', report['results'][0]['baseline'])
+        self.assertIn('peak_kib', report['results'][0]['current'])
+
+
+class KeywordTests(SimpleTestCase):
+    job_description = (
+        "We are looking for a backend engineer with Kubernetes experience. "
+        "You will run Kubernetes clusters, build data pipelines in Python and "
+        "maintain data pipelines for analytics."
+    )
+
+    def test_terms_skip_stopwords_and_keep_technical_names(self):
+        terms = extract_terms("Experience with C++ and Node.js is required")
+
+        self.assertIn('c++', terms)
+        self.assertIn('node.js', terms)
+        self.assertNotIn('with', terms)
+        self.assertNotIn('experience', terms)
+
+    def test_rare_terms_outweigh_common_ones(self):
+        corpus = KeywordCorpus(['Python developer wanted', 'Python and SQL', 'Kubernetes operator'])
+        weights = dict(extract_keywords('Python and Kubernetes', corpus))
+
+        self.assertGreater(weights['kubernetes'], weights['python'])
+
+    def test_bigrams_need_to_repeat(self):
+        keywords = dict(extract_keywords(self.job_description, KeywordCorpus()))
+
+        self.assertIn('data pipelines', keywords)
+        self.assertNotIn('backend engineer', keywords)
+
+    def test_profile_entries_are_ranked_by_relevance(self):
+        data = {
+            'profile': {'skills': ['Excel', 'Kubernetes', 'Python']},
+            'experience': [
+                {'position': 'Accountant', 'description': 'Prepared quarterly reports'},
+                {'position': 'Platform engineer', 'description': 'Ran Kubernetes clusters and data pipelines'},
+            ],
+            'projects': [],
+        }
+        ranking = rank_profile(data, self.job_description, KeywordCorpus())
+
+        self.assertEqual(ranking['experience'], [0.0, 1.0])
+        self.assertEqual(ranking['skills'][0], 0.0)
+        self.assertEqual(order_by_relevance(data['profile']['skills'], ranking['skills'])[-1], 'Excel')
+        self.assertEqual(ranking['projects'], [])
+
+    def test_description_without_keywords(self):
+        self.assertIsNone(rank_profile({'profile': {}}, 'and the with', KeywordCorpus()))
+
+
+@override_settings(OPENAI_API_KEY='', OPENAI_BASE_URL='')
+class TargetedGenerationTests(TestCase):
+    job_description = KeywordTests.job_description
+
+    def setUp(self):
+        self.user = create_user()
+        Profile.objects.create(user=self.user, summary='Engineer.', skills='Excel, Kubernetes, Python')
+        Experience.objects.create(
+            user=self.user, company='Ledger Co', position='Accountant', start_date=date(2015, 1, 1),
+            end_date=date(2018, 1, 1), description='Prepared quarterly reports.',
+        )
+        Experience.objects.create(
+            user=self.user, company='Cloud Co', position='Platform engineer', start_date=date(2018, 1, 1),
+            description='Ran Kubernetes clusters and data pipelines.',
+        )
+        patcher = mock.patch('resume.keywords.get_keyword_corpus', return_value=KeywordCorpus())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prompt_names_the_job_keywords(self):
+        generator = AIResumeGenerator(self.user)
+        data = generator._gather_user_data(self.job_description)
+
+        prompt = generator._build_prompt(data, 'resume')
+
+        self.assertIn('TARGET JOB KEYWORDS:\nkubernetes, data, pipelines, data pipelines', prompt)
+        self.assertIn('SKILLS:\nKubernetes, Python, Excel', prompt)
+
+    def test_fallback_resume_lists_matching_skills_first(self):
+        success, content, _ = AIResumeGenerator(self.user).generate_resume(job_description=self.job_description)
+
+        self.assertTrue(success)
+        self.assertLess(content.index('<li>Kubernetes</li>'), content.index('<li>Excel</li>'))
+
+    def test_fallback_cover_letter_uses_the_most_relevant_role(self):
+        data = cover_letter_user_data(self.user, 'Acme', 'Backend Engineer', self.job_description)
+
+        content = AIResumeGenerator(self.user).generate_cover_letter(data)
+
+        self.assertIn('role as Platform engineer at Cloud Co', content)
+        self.assertIn('My skills in Kubernetes, Python', content)
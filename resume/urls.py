@@ -45,9 +45,12 @@ urlpatterns = [
     
     # Resume Generation
     path('generate/', views.generate_resume, name='generate_resume'),
+    path('generate/stream/', views.generate_resume_stream, name='generate_resume_stream'),
+    path('generate/batch/', views.generate_resume_batch, name='generate_resume_batch'),
     path('resumes/', views.resume_list, name='resume_list'),
     path('resumes/<int:pk>/', views.resume_view, name='resume_view'),
     path('resumes/<int:pk>/download/', views.resume_download_pdf, name='resume_download_pdf'),
+    path('resumes/<int:pk>/variants/', views.resume_pdf_variants, name='resume_pdf_variants'),
     path('resumes/<int:pk>/delete/', views.resume_delete, name='resume_delete'),
     
     # Templates Gallery
@@ -55,6 +58,7 @@ urlpatterns = [
     
     # Cover Letters
     path('cover-letters/generate/', views.generate_cover_letter, name='generate_cover_letter'),
+    path('cover-letters/generate/stream/', views.generate_cover_letter_stream, name='generate_cover_letter_stream'),
     path('cover-letters/', views.cover_letter_list, name='cover_letter_list'),
     path('cover-letters/<int:pk>/', views.cover_letter_view, name='cover_letter_view'),
     path('cover-letters/<int:pk>/download/', views.cover_letter_download_pdf, name='cover_letter_download_pdf'),
@@ -64,4 +68,21 @@ urlpatterns = [
     path('portfolio/', views.portfolio_view, name='portfolio_view'),
     path('portfolio/download/', views.portfolio_download_pdf, name='portfolio_download_pdf'),
     
+    # Bulk export of all resumes and cover letters
+    path('export/documents/', views.export_documents_zip, name='export_documents_zip'),
+    
+    # Background AI generation jobs (GENERATION_QUEUE_ENABLED)
+    path('generation-jobs/<int:pk>/', views.generation_job_status, name='generation_job_status'),
+    
+    # Resubmitted generate forms waiting for their first submission
+    path('generation-requests/<int:pk>/', views.generation_request_status, name='generation_request_status'),
+    
+    # Background PDF render jobs (created by POSTing to a download URL)
+    path('pdf-jobs/<int:pk>/', views.pdf_job_status, name='pdf_job_status'),
+    path('pdf-jobs/<int:pk>/download/', views.pdf_job_download, name='pdf_job_download'),
+    
+    # Staff-only runtime metrics (JSON)
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('metrics/llm-usage/', views.llm_usage_view, name='llm_usage'),
+    
 ]
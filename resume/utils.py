@@ -1,13 +1,36 @@
 """
 Utility functions for PDF generation and other helper functions.
 """
-from io import BytesIO
-from django.http import HttpResponse
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 from django.template.loader import render_to_string
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 
 
+# Template IDs that have dedicated styling; anything else falls back to 'modern'
+TEMPLATE_IDS = ('modern', 'classic', 'creative', 'minimal', 'executive', 'technical')
+
+# PDFs rendered in-process stay in memory up to this size, then spill to disk
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
+
+# Scale factors tried by fit-to-pages rendering, largest (unscaled) first
+PDF_FIT_SCALES = tuple(round(1.0 - step * 0.025, 3) for step in range(13))
+
+# Absolute CSS lengths that fit-to-pages scales (font sizes, spacing, page margins)
+_CSS_LENGTH_RE = re.compile(r'(?<![\w#.-])(\d+(?:\.\d+)?)(pt|px|cm)\b')
+
+
 def get_template_css(template='modern'):
     """
     Get CSS styling based on template choice.
@@ -633,40 +656,488 @@ def get_template_css(template='modern'):
     return base_css + specific_css
 
 
-def generate_pdf_from_html(html_content, filename='resume.pdf', template='modern'):
+@lru_cache(maxsize=None)
+def get_template_css_version(template='modern'):
+    """
+    Return a short hash of the CSS for a template.
+    
+    Used in PDF cache keys so cached output is invalidated whenever the
+    template styling changes.
+    """
+    if template not in TEMPLATE_IDS:
+        template = 'modern'
+    return hashlib.sha256(get_template_css(template).encode('utf-8')).hexdigest()[:16]
+
+
+def scale_template_css(css, scale):
+    """
+    Multiply every absolute length (pt, px, cm) in a stylesheet by `scale`.
+    
+    Font sizes, margins, paddings and the @page margin shrink together, so
+    the layout keeps its proportions while more content fits on a page.
+    """
+    if scale == 1.0:
+        return css
+    
+    def _scale(match):
+        value = float(match.group(1)) * scale
+        return f"{value:.3g}{match.group(2)}"
+    
+    return _CSS_LENGTH_RE.sub(_scale, css)
+
+
+class StylesheetRegistry:
+    """
+    Per-process registry of compiled WeasyPrint stylesheets.
+    
+    Building a FontConfiguration and parsing the template CSS is expensive, so
+    both are done once per process and reused by every PDF render.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._font_config = None
+        self._stylesheets = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get_font_config(self):
+        """Return the shared FontConfiguration, creating it on first use."""
+        if self._font_config is None:
+            with self._lock:
+                if self._font_config is None:
+                    self._font_config = FontConfiguration()
+        return self._font_config
+    
+    def get_stylesheet(self, template='modern', scale=1.0):
+        """
+        Return the compiled CSS object for a template.
+        
+        Args:
+            template: Template ID (unknown IDs resolve to 'modern')
+            scale: Factor applied to absolute lengths (see scale_template_css)
+        
+        Returns:
+            weasyprint.CSS instance shared across requests
+        """
+        if template not in TEMPLATE_IDS:
+            template = 'modern'
+        key = (template, scale)
+        
+        stylesheet = self._stylesheets.get(key)
+        if stylesheet is not None:
+            with self._lock:
+                self.hits += 1
+            return stylesheet
+        
+        font_config = self.get_font_config()
+        with self._lock:
+            stylesheet = self._stylesheets.get(key)
+            if stylesheet is None:
+                self.misses += 1
+                css = scale_template_css(get_template_css(template), scale)
+                stylesheet = CSS(string=css, font_config=font_config)
+                self._stylesheets[key] = stylesheet
+            else:
+                self.hits += 1
+        return stylesheet
+    
+    def stats(self):
+        """Return hit/miss counters and the templates compiled so far."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'templates': sorted(
+                template if scale == 1.0 else f"{template}@{scale}"
+                for template, scale in self._stylesheets
+            ),
+            'font_config_loaded': self._font_config is not None,
+        }
+    
+    def clear(self):
+        """Drop all compiled stylesheets and the font configuration."""
+        with self._lock:
+            self._stylesheets = {}
+            self._font_config = None
+            self.hits = 0
+            self.misses = 0
+
+
+stylesheet_registry = StylesheetRegistry()
+
+
+def render_pdf(html_content, template='modern', target=None, timings=None, scale=1.0):
+    """
+    Render HTML to PDF with the template stylesheet.
+    
+    Args:
+        html_content: HTML string to convert to PDF
+        template: Template ID for styling
+        target: Writable binary file object; if omitted a spooled temporary
+            file is used (kept in memory while small, moved to disk when large)
+        timings: Optional dict that receives the seconds spent in the
+            'css', 'layout' and 'write' stages
+        scale: Factor applied to the template's font sizes and spacing
+    
+    Returns:
+        The file object the PDF was written to, positioned at the start
+    """
+    if target is None:
+        target = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    
+    # Shared font configuration and compiled template stylesheet
+    started = time.perf_counter()
+    font_config = stylesheet_registry.get_font_config()
+    css = stylesheet_registry.get_stylesheet(template, scale)
+    css_done = time.perf_counter()
+    
+    document = HTML(string=html_content).render(stylesheets=[css], font_config=font_config)
+    layout_done = time.perf_counter()
+    
+    # Write PDF directly into the target, no intermediate bytes copy
+    document.write_pdf(target)
+    write_done = time.perf_counter()
+    
+    if timings is not None:
+        timings['css'] = timings.get('css', 0.0) + css_done - started
+        timings['layout'] = timings.get('layout', 0.0) + layout_done - css_done
+        timings['write'] = timings.get('write', 0.0) + write_done - layout_done
+    
+    target.seek(0)
+    return target
+
+
+def render_pdf_variants(html_content, paths, timings=None):
+    """
+    Render the same HTML in several templates, parsing it only once.
+    
+    Args:
+        html_content: HTML string to convert to PDF
+        paths: Dict mapping template ID to the file path to write
+        timings: Optional dict that receives 'css', 'layout' and 'write'
+            seconds summed over all templates
+    
+    Returns:
+        The `paths` dict
+    """
+    if timings is None:
+        timings = {}
+    
+    font_config = stylesheet_registry.get_font_config()
+    started = time.perf_counter()
+    html = HTML(string=html_content)
+    timings['layout'] = timings.get('layout', 0.0) + time.perf_counter() - started
+    
+    for template, path in paths.items():
+        started = time.perf_counter()
+        css = stylesheet_registry.get_stylesheet(template)
+        css_done = time.perf_counter()
+        document = html.render(stylesheets=[css], font_config=font_config)
+        layout_done = time.perf_counter()
+        with open(path, 'wb') as f:
+            document.write_pdf(f)
+        timings['css'] = timings.get('css', 0.0) + css_done - started
+        timings['layout'] += layout_done - css_done
+        timings['write'] = timings.get('write', 0.0) + time.perf_counter() - layout_done
+    
+    return paths
+
+
+def _fit_scale_cache_key(html_content, template, pages):
+    digest = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+    return f"pdf_fit_scale:{get_template_css_version(template)}:{pages}:{digest}"
+
+
+def get_fit_scale(html_content, template, pages):
+    """Return the cached fit-to-pages scale for a document, or None."""
+    return cache.get(_fit_scale_cache_key(html_content, template, pages))
+
+
+def set_fit_scale(html_content, template, pages, scale):
+    """Remember the scale that fits a document onto `pages` pages."""
+    timeout = getattr(settings, 'PDF_FIT_SCALE_CACHE_TIMEOUT', 30 * 24 * 3600)
+    cache.set(_fit_scale_cache_key(html_content, template, pages), scale, timeout)
+
+
+def render_pdf_fit_pages(html_content, template='modern', pages=1, target=None, timings=None):
+    """
+    Render HTML to PDF, shrinking fonts and spacing until it fits on `pages` pages.
+    
+    The HTML is parsed once and laid out with progressively scaled template
+    stylesheets (binary search over PDF_FIT_SCALES). Only the winning layout
+    is written out. If even the smallest scale overflows, that layout is used.
+    
+    Args:
+        html_content: HTML string to convert to PDF
+        template: Template ID for styling
+        pages: Maximum number of pages wanted
+        target: Writable binary file object (spooled temp file if omitted)
+        timings: Optional dict that receives 'css', 'layout' and 'write' seconds
+    
+    Returns:
+        Tuple of (file object positioned at the start, scale used)
+    """
+    if target is None:
+        target = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    if timings is None:
+        timings = {}
+    
+    font_config = stylesheet_registry.get_font_config()
+    html = HTML(string=html_content)
+    layouts = {}
+    
+    def layout(index):
+        if index not in layouts:
+            started = time.perf_counter()
+            css = stylesheet_registry.get_stylesheet(template, PDF_FIT_SCALES[index])
+            css_done = time.perf_counter()
+            layouts[index] = html.render(stylesheets=[css], font_config=font_config)
+            timings['css'] = timings.get('css', 0.0) + css_done - started
+            timings['layout'] = timings.get('layout', 0.0) + time.perf_counter() - css_done
+        return layouts[index]
+    
+    # Find the largest scale (lowest index) whose layout fits
+    best = len(PDF_FIT_SCALES) - 1
+    if len(layout(0).pages) <= pages:
+        best = 0
+    else:
+        low, high = 1, len(PDF_FIT_SCALES) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            if len(layout(middle).pages) <= pages:
+                best = middle
+                high = middle - 1
+            else:
+                low = middle + 1
+    
+    started = time.perf_counter()
+    layout(best).write_pdf(target)
+    timings['write'] = timings.get('write', 0.0) + time.perf_counter() - started
+    
+    target.seek(0)
+    return target, PDF_FIT_SCALES[best]
+
+
+# Renders currently in progress in this process, keyed by PDF cache key
+_inflight_renders = {}
+_inflight_lock = threading.Lock()
+
+
+def render_pdf_to_cache(html_content, template='modern', cache_key=None, timings=None, fit_pages=None):
+    """
+    Make sure the PDF for this HTML and template is in the PDF cache.
+    
+    Cache misses are rendered by the PDF worker pool into a temp file that
+    is then moved into cache storage. If the same document is already being
+    rendered in this process (e.g. a background pre-render), the caller waits
+    for that render instead of starting a duplicate.
+    
+    Args:
+        html_content: HTML string to convert to PDF
+        template: Template ID for styling
+        cache_key: Precomputed pdf_cache_key, if the caller already has it
+        timings: Optional dict that receives per-stage render seconds; time
+            spent waiting for a worker or another render is added as 'wait'
+        fit_pages: If set, shrink the document to fit this many pages
+            (the winning scale is remembered, see render_pdf_fit_pages)
+    
+    Returns:
+        The cache key of the stored PDF
+    
+    Raises:
+        PDFRenderError: if the render pool is saturated or the render fails
+    """
+    from .pdf_cache import get_pdf_cache, pdf_cache_key
+    from .pdf_pool import PDFRenderTimeout, get_pdf_render_pool
+    
+    if cache_key is None:
+        cache_key = pdf_cache_key(html_content, template, fit_pages=fit_pages)
+    
+    pdf_cache = get_pdf_cache()
+    if pdf_cache.contains(cache_key):
+        return cache_key
+    
+    pool = get_pdf_render_pool()
+    with _inflight_lock:
+        inflight = _inflight_renders.get(cache_key)
+        if inflight is None:
+            inflight = _inflight_renders[cache_key] = Future()
+            owner = True
+        else:
+            owner = False
+    
+    started = time.perf_counter()
+    if not owner:
+        try:
+            return inflight.result(timeout=pool.timeout)
+        except FutureTimeoutError:
+            raise PDFRenderTimeout(f'PDF render exceeded {pool.timeout}s')
+        finally:
+            if timings is not None:
+                timings['wait'] = timings.get('wait', 0.0) + time.perf_counter() - started
+    
+    path = pdf_cache.temp_path()
+    try:
+        render_timings = {}
+        # A remembered fit scale turns the page-count search into a single render
+        scale = get_fit_scale(html_content, template, fit_pages) if fit_pages else None
+        used_scale = pool.render(
+            html_content, path, template=template, timings=render_timings,
+            fit_pages=fit_pages, scale=scale,
+        )
+        if fit_pages and scale is None:
+            set_fit_scale(html_content, template, fit_pages, used_scale)
+        if timings is not None:
+            # Whatever the worker did not account for was spent queueing and in IPC
+            elapsed = time.perf_counter() - started
+            for name, seconds in render_timings.items():
+                timings[name] = timings.get(name, 0.0) + seconds
+            timings['wait'] = timings.get('wait', 0.0) + max(0.0, elapsed - sum(render_timings.values()))
+        pdf_cache.set_path(cache_key, path)
+        inflight.set_result(cache_key)
+    except BaseException as e:
+        inflight.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_renders.pop(cache_key, None)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    return cache_key
+
+
+def render_pdf_templates_to_cache(html_content, templates=TEMPLATE_IDS, timings=None):
+    """
+    Make sure the PDF for this HTML is cached in each of the given templates.
+    
+    Templates that are not cached yet are rendered in one call to the PDF
+    worker pool, which parses the HTML once per worker instead of once per
+    template. Used for side-by-side template comparison and cache warming.
+    
+    Args:
+        html_content: HTML string to convert to PDF
+        templates: Template IDs to render (defaults to all of them)
+        timings: Optional dict that receives per-stage render seconds
+    
+    Returns:
+        Dict mapping each template ID to the cache key of its PDF
+    
+    Raises:
+        PDFRenderError: if the render pool is saturated or the render fails
+    """
+    from .pdf_cache import get_pdf_cache, pdf_cache_key
+    from .pdf_pool import get_pdf_render_pool
+    
+    pdf_cache = get_pdf_cache()
+    cache_keys = {template: pdf_cache_key(html_content, template) for template in templates}
+    missing = {
+        template: pdf_cache.temp_path()
+        for template, cache_key in cache_keys.items()
+        if not pdf_cache.contains(cache_key)
+    }
+    
+    try:
+        get_pdf_render_pool().render_variants(html_content, missing, timings=timings)
+        for template, path in missing.items():
+            pdf_cache.set_path(cache_keys[template], path)
+    finally:
+        for path in missing.values():
+            if os.path.exists(path):
+                os.remove(path)
+    
+    return cache_keys
+
+
+def pdf_file_response(pdf_file, filename, etag=None):
+    """
+    Stream an open PDF file to the client.
+    
+    FileResponse reads the file in chunks and derives Content-Length from it,
+    so the document is never held in memory as a whole.
+    """
+    response = FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+    if etag:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def generate_pdf_from_html(html_content, filename='resume.pdf', template='modern', request=None, trace=None,
+                           fit_pages=None):
     """
     Generate a PDF file from HTML content using WeasyPrint with template styling.
     
+    Rendered PDFs are stored in the content-addressed PDF cache, so repeat
+    downloads of unchanged documents skip the WeasyPrint layout. Cache misses
+    are rendered in the PDF worker pool rather than the request thread. When a
+    request is given, its If-None-Match header is honoured using the cache key
+    as ETag.
+    
     Args:
         html_content: HTML string to convert to PDF
         filename: Name of the PDF file
         template: Template ID for styling
+        request: Optional HttpRequest used for conditional (304) responses
+        trace: Optional PDFRenderTrace; stage timings are added to it and it
+            is finished before returning
+        fit_pages: If set, scale fonts and spacing down so the PDF fits on
+            this many pages
     
     Returns:
-        HttpResponse with PDF content
+        Streaming FileResponse with PDF content (503 if the render pool is saturated)
     """
-    # Create a BytesIO buffer
-    buffer = BytesIO()
+    from .metrics import PDFRenderTrace
+    from .pdf_cache import get_pdf_cache, pdf_cache_key
+    from .pdf_pool import PDFRenderError
     
-    # Font configuration for better rendering
-    font_config = FontConfiguration()
+    if trace is None:
+        trace = PDFRenderTrace('document', template)
+    trace.template = template
     
-    # Get template-specific CSS
-    css_string = get_template_css(template)
-    css = CSS(string=css_string, font_config=font_config)
+    cache_key = pdf_cache_key(html_content, template, fit_pages=fit_pages)
+    etag = quote_etag(cache_key)
     
-    # Generate PDF
-    HTML(string=html_content).write_pdf(buffer, stylesheets=[css], font_config=font_config)
+    # Client already holds this exact document
+    if request is not None:
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and etag in parse_etags(if_none_match):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            trace.finish('not_modified', cache_key=cache_key)
+            return response
     
-    # Get PDF content
-    pdf_content = buffer.getvalue()
-    buffer.close()
+    pdf_cache = get_pdf_cache()
+    with trace.stage('cache'):
+        pdf_file = pdf_cache.open(cache_key)
+    outcome = 'hit'
+    if pdf_file is None:
+        outcome = 'miss'
+        try:
+            render_pdf_to_cache(
+                html_content, template, cache_key=cache_key, timings=trace.timings, fit_pages=fit_pages
+            )
+        except PDFRenderError as e:
+            trace.finish('busy', cache_key=cache_key, error=str(e))
+            response = HttpResponse(
+                f'PDF generation is busy right now ({e}). Please try again shortly.',
+                content_type='text/plain',
+                status=503,
+            )
+            response['Retry-After'] = '5'
+            return response
+        pdf_file = pdf_cache.storage.open(cache_key)
     
-    # Create HTTP response
-    response = HttpResponse(pdf_content, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if pdf_file is None:
+        # Evicted by a concurrent writer before we could open it; render inline
+        outcome = 'inline'
+        if fit_pages:
+            pdf_file, _ = render_pdf_fit_pages(html_content, template, fit_pages, timings=trace.timings)
+        else:
+            pdf_file = render_pdf(html_content, template, timings=trace.timings)
     
-    return response
+    trace.finish(outcome, cache_key=cache_key)
+    return pdf_file_response(pdf_file, filename, etag=etag)
 
 
 def format_resume_for_pdf(user, resume_content):
@@ -801,6 +1272,61 @@ def format_resume_for_pdf(user, resume_content):
     return html_content
 
 
+def format_cover_letter_for_pdf(user, cover_letter):
+    """
+    Format a cover letter into HTML suitable for PDF generation.
+    
+    Args:
+        user: User object
+        cover_letter: CoverLetter instance
+    
+    Returns:
+        Formatted HTML string
+    """
+    import re
+    from html import escape
+    
+    # Format the cover letter content - convert line breaks to paragraphs
+    content_paragraphs = []
+    for paragraph in cover_letter.content.split('\n\n'):
+        paragraph = paragraph.strip()
+        if paragraph:
+            # Replace single line breaks with <br> within paragraphs
+            paragraph = paragraph.replace('\n', '<br>')
+            # Handle bold text
+            paragraph = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', paragraph)
+            content_paragraphs.append(f'<p>{escape(paragraph)}</p>')
+    
+    formatted_content = ''.join(content_paragraphs)
+    
+    # Create HTML for PDF
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Cover Letter - {escape(cover_letter.company_name)}</title>
+    </head>
+    <body>
+        <div class="header">
+            <h1>{escape(user.get_full_name())}</h1>
+            <p class="contact-info">{escape(user.email)}</p>
+            <p class="date">{cover_letter.created_at.strftime('%B %d, %Y')}</p>
+        </div>
+        <div class="section">
+            <p><strong>{escape(cover_letter.company_name)}</strong><br>
+            <strong>Re: {escape(cover_letter.position)}</strong></p>
+        </div>
+        <div class="content">
+            {formatted_content}
+        </div>
+    </body>
+    </html>
+    """
+    
+    return html_content
+
+
 def markdown_to_html(text):
     """
     Convert simple markdown formatting to HTML.
@@ -846,12 +1372,13 @@ def markdown_to_html(text):
     return '\n'.join(html_paragraphs)
 
 
-def create_portfolio_html(user):
+def create_portfolio_html(user, trace=None):
     """
     Create a complete portfolio HTML page for a user.
     
     Args:
         user: User object
+        trace: Optional PDFRenderTrace that receives the 'queries' and 'html' stage timings
     
     Returns:
         HTML string
@@ -859,14 +1386,17 @@ def create_portfolio_html(user):
     from .models import Profile, Education, Experience, Project
     from html import escape
     
+    started = time.perf_counter()
     try:
         profile = Profile.objects.get(user=user)
     except Profile.DoesNotExist:
         profile = None
     
-    educations = Education.objects.filter(user=user).order_by('-start_date')
-    experiences = Experience.objects.filter(user=user).order_by('-start_date')
-    projects = Project.objects.filter(user=user)
+    # Evaluate the querysets up front so query time is measured separately from assembly
+    educations = list(Education.objects.filter(user=user).order_by('-start_date'))
+    experiences = list(Experience.objects.filter(user=user).order_by('-start_date'))
+    projects = list(Project.objects.filter(user=user))
+    queries_done = time.perf_counter()
     
     html = f"""
     <!DOCTYPE html>
@@ -978,4 +1508,8 @@ def create_portfolio_html(user):
     </html>
     """
     
+    if trace is not None:
+        trace.add('queries', queries_done - started)
+        trace.add('html', time.perf_counter() - queries_done)
+    
     return html
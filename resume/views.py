@@ -1,15 +1,63 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from .models import Profile, Education, Experience, Project, GeneratedResume, CoverLetter
+from django.urls import reverse
+from django.utils.http import quote_etag
+from .models import Profile, Education, Experience, Project, GeneratedResume, CoverLetter, PDFRenderJob, GenerationJob, GenerationRequest
 from .forms import ProfileForm, EducationForm, ExperienceForm, ProjectForm, CoverLetterForm
 from .services import AIResumeGenerator
-from .utils import generate_pdf_from_html, format_resume_for_pdf, create_portfolio_html
+from .utils import (
+    TEMPLATE_IDS,
+    generate_pdf_from_html,
+    pdf_file_response,
+    render_pdf_templates_to_cache,
+    stylesheet_registry,
+)
+from .metrics import PDFRenderTrace, metrics_registry
+from .pdf_cache import get_pdf_cache
+from .pdf_pool import PDFRenderError, get_pdf_render_pool
+from .openai_client import openai_clients
+from .llm_cache import llm_response_cache
+from .llm_resilience import llm_circuit_breaker
+from .pdf_jobs import (
+    build_pdf_document,
+    claim_pdf_job,
+    enqueue_pdf_job,
+    get_job_document,
+    requeue_stale_pdf_jobs,
+    run_pdf_job,
+)
+from .pdf_export import stream_documents_zip
+from .generation_jobs import (
+    RESUME_TEMPLATE_NAMES,
+    cover_letter_user_data,
+    enqueue_generation_job,
+    get_job_result_url,
+    save_cover_letter,
+    save_generated_resume,
+    save_generated_resumes,
+)
+from .idempotency import (
+    claim_generation_request,
+    complete_generation_request,
+    get_idempotency_key,
+    get_request_result_url,
+    get_request_status_url,
+    is_stale,
+    release_generation_request,
+)
+from .single_flight import llm_single_flight
+from .admission import AdmissionRejected, llm_admission
+from .llm_usage import USAGE_GROUPS, usage_recorder, usage_summary
 from users.forms import UserProfileForm
 from .countries_data import STATES_BY_COUNTRY
 import json
+import math
+import uuid
 
 
 def home(request):
@@ -297,6 +345,176 @@ def project_delete(request, pk):
 
 
 # AI Resume Generation Views
+def _sse_event(event, payload):
+    """
+    Encode one Server-Sent Event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _sse_response(events, cleanup=None):
+    """
+    Wrap an iterator of encoded events in an unbuffered text/event-stream response.
+    
+    Args:
+        cleanup: Optional callable run when the server closes the response,
+            also when the stream never started (e.g. the client went away first)
+    """
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    if cleanup is not None:
+        response._resource_closers.append(cleanup)
+    return response
+
+
+class _StreamCleanup:
+    """
+    Frees what a streamed generation holds: its admission slot, and its
+    idempotency record unless the content was saved. Safe to call more than once.
+    """
+    
+    def __init__(self, release=None, ticket=None):
+        self.release = release
+        self.ticket = ticket
+        self.saved = False
+    
+    def __call__(self):
+        try:
+            if not self.saved and self.release is not None:
+                self.release()
+        finally:
+            if self.ticket is not None:
+                self.ticket.release()
+
+
+def _stream_generation(chunks, save, cleanup):
+    """
+    Relay generated text as SSE 'token' events, then save it and send 'done'.
+    
+    If the client disconnects, the server closes this generator; closing
+    `chunks` with it cancels the upstream completion and nothing is saved.
+    
+    Args:
+        chunks: Iterator of text pieces (AIResumeGenerator.stream_*)
+        save: Callable taking the full content and returning the URL of the saved object
+        cleanup: _StreamCleanup run when the stream ends
+    """
+    parts = []
+    try:
+        for text in chunks:
+            parts.append(text)
+            yield _sse_event('token', {'text': text})
+        
+        content = ''.join(parts).strip()
+        if not content:
+            yield _sse_event('error', {'message': 'The AI service returned an empty response. Please try again.'})
+            return
+        url = save(content)
+        cleanup.saved = True
+        yield _sse_event('done', {'url': url})
+    except Exception as e:
+        yield _sse_event('error', {'message': f'Error generating content: {e}'})
+    finally:
+        chunks.close()
+        cleanup()
+
+
+def _admit_generation(request):
+    """
+    Apply admission control to a generation about to start.
+    
+    Queued generations do not hold a web worker, so only the user's rate
+    limit applies to them; inline ones also need a global generation slot.
+    
+    Returns:
+        AdmissionTicket to release when an inline generation ends, or None when queued
+    
+    Raises:
+        AdmissionRejected: The user is over their rate limit, or no slot is free
+    """
+    if getattr(settings, 'GENERATION_QUEUE_ENABLED', False):
+        llm_admission.check_rate(request.user)
+        return None
+    return llm_admission.admit(request.user)
+
+
+def _admission_rejected(request, error, stream=False):
+    """
+    429 response for a generation that was not admitted.
+    """
+    retry_after = max(1, math.ceil(error.retry_after))
+    if stream:
+        response = JsonResponse({'error': str(error), 'retry_after': retry_after}, status=429)
+    else:
+        response = render(request, 'errors/429.html', {
+            'error_code': 429,
+            'error_title': 'Too Many Requests',
+            'error_message': str(error),
+            'retry_after': retry_after,
+        }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _replay_generation_request(request, record):
+    """
+    Answer a resubmitted generate form with the first submission's result,
+    or its status page while it is still generating.
+    """
+    if get_request_result_url(record):
+        messages.info(request, 'This form was already submitted, so the result of that submission is shown instead of generating it again.')
+    return redirect(get_request_status_url(record))
+
+
+def _replay_generation_events(record):
+    """
+    SSE equivalent of _replay_generation_request for the streaming endpoints.
+    """
+    yield _sse_event('done', {'url': get_request_status_url(record)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def generate_resume_stream(request):
+    """
+    Streaming variant of generate_resume: relays the completion to the
+    browser as Server-Sent Events and saves the resume when it finishes.
+    """
+    template_id = request.POST.get('template', 'modern')
+    force_refresh = request.POST.get('force_refresh') == 'on'
+    sections = request.POST.get('sections') == 'on'
+    job_description = request.POST.get('job_description', '').strip()
+    
+    record, replay = claim_generation_request(request.user, get_idempotency_key(request), 'resume')
+    if replay:
+        return _sse_response(_replay_generation_events(record))
+    
+    try:
+        ticket = llm_admission.admit(request.user)
+    except AdmissionRejected as e:
+        release_generation_request(record)
+        return _admission_rejected(request, e, stream=True)
+    
+    cleanup = _StreamCleanup(release=lambda: release_generation_request(record), ticket=ticket)
+    
+    def save(content):
+        resume = save_generated_resume(request.user, template_id, content)
+        complete_generation_request(record, resume)
+        return reverse('resume_view', args=[resume.pk])
+    
+    # Free the slot and key if anything fails before the response takes over
+    try:
+        generator = AIResumeGenerator(request.user)
+        chunks = generator.stream_resume(
+            template_id, force_refresh=force_refresh, sections=sections, job_description=job_description
+        )
+        return _sse_response(_stream_generation(chunks, save, cleanup), cleanup=cleanup)
+    except BaseException:
+        cleanup()
+        raise
+
+
 @login_required
 def generate_resume(request):
     """
@@ -307,39 +525,66 @@ def generate_resume(request):
     
     if request.method == 'POST':
         template_id = request.POST.get('template', 'modern')
+        force_refresh = request.POST.get('force_refresh') == 'on'
+        # Re-prompt only the sections whose source rows changed
+        sections = request.POST.get('sections') == 'on'
+        # Optional job posting the resume is tailored to
+        job_description = request.POST.get('job_description', '').strip()
+        
+        # A double click or resubmit of the same form gets the first submission's result
+        record, replay = claim_generation_request(request.user, get_idempotency_key(request), 'resume')
+        if replay:
+            return _replay_generation_request(request, record)
+        
+        try:
+            ticket = _admit_generation(request)
+        except AdmissionRejected as e:
+            release_generation_request(record)
+            return _admission_rejected(request, e)
+        
+        # Hand the OpenAI call to the background worker instead of blocking this request
+        if ticket is None:
+            job = enqueue_generation_job(request.user, 'resume', template_id, {
+                'force_refresh': force_refresh, 'sections': sections, 'job_description': job_description,
+            })
+            complete_generation_request(record, job=job)
+            return redirect('generation_job_status', pk=job.pk)
         
         try:
             generator = AIResumeGenerator(request.user)
-            success, content, error = generator.generate_resume(template=template_id)
+            success, content, error = generator.generate_resume(
+                template=template_id, force_refresh=force_refresh, sections=sections, job_description=job_description
+            )
             
             if success and content:
                 # Save generated resume with template info
-                template_name = dict([(t['id'], t['name']) for t in [
-                    {'id': 'modern', 'name': 'Modern Professional'},
-                    {'id': 'classic', 'name': 'Classic Traditional'},
-                    {'id': 'creative', 'name': 'Creative Bold'},
-                    {'id': 'minimal', 'name': 'Minimal Clean'},
-                    {'id': 'executive', 'name': 'Executive Premium'},
-                    {'id': 'technical', 'name': 'Technical Expert'},
-                ]]).get(template_id, 'Modern Professional')
-                
-                resume = GeneratedResume.objects.create(
-                    user=request.user,
-                    title=f"Resume - {request.user.get_full_name()} ({template_name})",
-                    content=content,
-                    template=template_id
-                )
+                resume = save_generated_resume(request.user, template_id, content)
+                complete_generation_request(record, resume)
+                template_name = RESUME_TEMPLATE_NAMES.get(template_id, 'Modern Professional')
+                if generator.used_fallback:
+                    messages.warning(request, 'The AI service is unavailable right now, so a standard resume was built from your profile. Try again later for an AI-written version.')
+                if generator.sections_generated and generator.sections_reused:
+                    messages.info(request, f'Rewrote the changed sections ({", ".join(generator.sections_generated)}) and kept the {len(generator.sections_reused)} unchanged ones.')
+                dropped = [c['entry'] for c in generator.prompt_compaction if c['action'] == 'dropped']
+                if dropped:
+                    messages.info(request, f'Your profile is long, so {len(dropped)} older or less relevant entries were left out of this resume: {", ".join(dropped)}.')
+                if generator.cache_hit:
+                    messages.info(request, 'Your profile has not changed since the last generation with this template, so that result was reused. Tick "Generate a fresh version" to get a new one.')
                 messages.success(request, f'Resume generated successfully using {template_name} template!')
                 return redirect('resume_view', pk=resume.pk)
             else:
                 # If generation failed, show error
+                release_generation_request(record)
                 error_msg = error if error else 'Unknown error occurred'
                 messages.error(request, f'Error generating resume: {error_msg}. Please ensure you have completed your profile.')
                 return redirect('generate_resume')
                 
         except Exception as e:
+            release_generation_request(record)
             messages.error(request, f'An error occurred: {str(e)}. Please try again or contact support.')
             return redirect('generate_resume')
+        finally:
+            ticket.release()
     
     # Get user data for template
     profile, created = Profile.objects.get_or_create(user=request.user)
@@ -411,11 +656,96 @@ def generate_resume(request):
         'completeness_percentage': int(completeness_percentage),
         'available_templates': available_templates,
         'selected_template': selected_template,
+        'section_generation': getattr(settings, 'RESUME_SECTION_GENERATION', False),
+        'idempotency_key': uuid.uuid4().hex,
+        'batch_idempotency_key': uuid.uuid4().hex,
     }
     
     return render(request, 'resume/generate_resume.html', context)
 
 
+@login_required
+@require_http_methods(["POST"])
+def generate_resume_batch(request):
+    """
+    Generate the resume in several templates at once for side-by-side
+    comparison. The templates are generated concurrently and all resumes are
+    saved together.
+    
+    Each template counts as one generation against the user's rate limit, and
+    at most as many templates run at once as admission slots were free.
+    """
+    template_ids = list(dict.fromkeys(t for t in request.POST.getlist('templates') if t in RESUME_TEMPLATE_NAMES))
+    force_refresh = request.POST.get('force_refresh') == 'on'
+    sections = request.POST.get('sections') == 'on'
+    job_description = request.POST.get('job_description', '').strip()
+    if len(template_ids) < 2:
+        messages.error(request, 'Select at least two templates to compare.')
+        return redirect('generate_resume')
+    burst = getattr(settings, 'LLM_USER_BURST', 3)
+    if len(template_ids) > burst:
+        messages.error(request, f'Select at most {burst} templates to compare at once.')
+        return redirect('generate_resume')
+    
+    record, replay = claim_generation_request(request.user, get_idempotency_key(request), 'resume')
+    if replay:
+        return _replay_generation_request(request, record)
+    
+    try:
+        if getattr(settings, 'GENERATION_QUEUE_ENABLED', False):
+            llm_admission.check_rate(request.user, count=len(template_ids))
+            tickets = []
+        else:
+            concurrency = min(len(template_ids), getattr(settings, 'LLM_BATCH_CONCURRENCY', 3))
+            tickets = llm_admission.admit_batch(request.user, len(template_ids), concurrency)
+    except AdmissionRejected as e:
+        release_generation_request(record)
+        return _admission_rejected(request, e)
+    
+    if not tickets:
+        jobs = [
+            enqueue_generation_job(request.user, 'resume', template_id, {
+                'force_refresh': force_refresh, 'sections': sections, 'job_description': job_description,
+            })
+            for template_id in template_ids
+        ]
+        complete_generation_request(record, job=jobs[0])
+        messages.info(request, f'{len(jobs)} resumes are being generated. They will appear in your list shortly.')
+        return redirect('resume_list')
+    
+    try:
+        generator = AIResumeGenerator(request.user)
+        results = generator.generate_resumes(
+            template_ids, force_refresh=force_refresh, sections=sections, job_description=job_description,
+            concurrency=len(tickets),
+        )
+        contents = {template_id: content for template_id, (success, content, error) in results.items() if success and content}
+        failed = [RESUME_TEMPLATE_NAMES[template_id] for template_id in template_ids if template_id not in contents]
+        
+        if not contents:
+            release_generation_request(record)
+            errors = {error for success, content, error in results.values() if error}
+            messages.error(request, f'Error generating resumes: {"; ".join(errors) or "Unknown error occurred"}. Please ensure you have completed your profile.')
+            return redirect('generate_resume')
+        
+        resumes = save_generated_resumes(request.user, contents)
+        complete_generation_request(record, resumes[0])
+        if generator.used_fallback:
+            messages.warning(request, 'The AI service is unavailable right now, so standard resumes were built from your profile for some templates. Try again later for AI-written versions.')
+        if failed:
+            messages.warning(request, f'Could not generate: {", ".join(failed)}.')
+        messages.success(request, f'Generated {len(resumes)} resumes: {", ".join(RESUME_TEMPLATE_NAMES[t] for t in contents)}.')
+        return redirect('resume_list')
+    
+    except Exception as e:
+        release_generation_request(record)
+        messages.error(request, f'An error occurred: {str(e)}. Please try again or contact support.')
+        return redirect('generate_resume')
+    finally:
+        for ticket in tickets:
+            ticket.release()
+
+
 @login_required
 def resume_view(request, pk):
     """
@@ -426,26 +756,89 @@ def resume_view(request, pk):
 
 
 @login_required
+@require_http_methods(["GET", "POST"])
 def resume_download_pdf(request, pk):
     """
     Download resume as PDF with template styling.
+    A POST queues a background render job instead (see pdf_job_status).
     """
-    resume = get_object_or_404(GeneratedResume, pk=pk, user=request.user)
+    trace = PDFRenderTrace('resume')
+    with trace.stage('queries'):
+        resume = get_object_or_404(GeneratedResume, pk=pk, user=request.user)
+    
+    if request.method == 'POST':
+        return _queue_pdf_job(request, 'resume', resume)
     
-    # Format content for PDF
-    html_content = format_resume_for_pdf(request.user, resume.content)
+    # Format content for PDF using the resume's own template unless ?template= overrides it
+    template = request.GET.get('template')
+    if template not in TEMPLATE_IDS:
+        template = None
+    html_content, filename, template = build_pdf_document(
+        request.user, 'resume', resume, template=template, trace=trace
+    )
     
-    # Get template from resume or default to modern
-    template = getattr(resume, 'template', 'modern')
+    # Optional ?fit_pages=N shrinks fonts and spacing to fit N pages
+    fit_pages = _fit_pages_param(request)
     
     # Generate and return PDF with template styling
     return generate_pdf_from_html(
         html_content,
-        filename=f"resume_{request.user.username}_{template}.pdf",
-        template=template
+        filename=filename,
+        template=template,
+        request=request,
+        trace=trace,
+        fit_pages=fit_pages,
     )
 
 
+@login_required
+@require_http_methods(["GET"])
+def resume_pdf_variants(request, pk):
+    """
+    Render a resume in every template in one call (the HTML is parsed once
+    per render worker) and return a download link per template, for
+    side-by-side comparison. The variants stay in the PDF cache, so the
+    links are served without another render.
+    """
+    trace = PDFRenderTrace('resume_variants')
+    with trace.stage('queries'):
+        resume = get_object_or_404(GeneratedResume, pk=pk, user=request.user)
+    
+    html_content, _, _ = build_pdf_document(request.user, 'resume', resume, trace=trace)
+    try:
+        cache_keys = render_pdf_templates_to_cache(html_content, timings=trace.timings)
+    except PDFRenderError as e:
+        trace.finish('busy', error=str(e))
+        return JsonResponse({'error': f'PDF generation is busy right now ({e}). Please try again shortly.'}, status=503)
+    trace.finish('variants', templates=len(cache_keys))
+    
+    download_url = reverse('resume_download_pdf', args=[resume.pk])
+    return JsonResponse({
+        'id': resume.pk,
+        'template': resume.template,
+        'variants': {
+            template: {
+                'download_url': f"{download_url}?template={template}",
+                'etag': quote_etag(cache_key),
+            }
+            for template, cache_key in cache_keys.items()
+        },
+    })
+
+
+def _fit_pages_param(request):
+    """
+    Read the optional fit_pages query parameter (1 to PDF_FIT_MAX_PAGES).
+    """
+    value = request.GET.get('fit_pages', '')
+    if not value.isdigit():
+        return None
+    fit_pages = int(value)
+    if not 1 <= fit_pages <= getattr(settings, 'PDF_FIT_MAX_PAGES', 5):
+        return None
+    return fit_pages
+
+
 @login_required
 def resume_list(request):
     """
@@ -491,19 +884,29 @@ def portfolio_view(request):
 
 
 @login_required
+@require_http_methods(["GET", "POST"])
 def portfolio_download_pdf(request):
     """
     Download portfolio as PDF with template styling.
+    A POST queues a background render job instead (see pdf_job_status).
     """
+    if request.method == 'POST':
+        return _queue_pdf_job(request, 'portfolio')
+    
     # Get template from query parameter or default to modern
     template = request.GET.get('template', 'modern')
     
-    html_content = create_portfolio_html(request.user)
+    trace = PDFRenderTrace('portfolio')
+    html_content, filename, template = build_pdf_document(
+        request.user, 'portfolio', template=template, trace=trace
+    )
     
     return generate_pdf_from_html(
         html_content,
-        filename=f"portfolio_{request.user.username}_{template}.pdf",
-        template=template
+        filename=filename,
+        template=template,
+        request=request,
+        trace=trace,
     )
 
 
@@ -512,6 +915,51 @@ def portfolio_download_pdf(request):
 
 # ==================== COVER LETTER VIEWS ====================
 
+@login_required
+@require_http_methods(["POST"])
+def generate_cover_letter_stream(request):
+    """
+    Streaming variant of generate_cover_letter: relays the completion to the
+    browser as Server-Sent Events and saves the cover letter when it finishes.
+    """
+    form = CoverLetterForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    
+    company_name = form.cleaned_data['company_name']
+    position = form.cleaned_data['position']
+    job_description = form.cleaned_data.get('job_description', '')
+    template = request.POST.get('template', 'classic')
+    force_refresh = request.POST.get('force_refresh') == 'on'
+    
+    record, replay = claim_generation_request(request.user, get_idempotency_key(request), 'cover_letter')
+    if replay:
+        return _sse_response(_replay_generation_events(record))
+    
+    try:
+        ticket = llm_admission.admit(request.user)
+    except AdmissionRejected as e:
+        release_generation_request(record)
+        return _admission_rejected(request, e, stream=True)
+    
+    cleanup = _StreamCleanup(release=lambda: release_generation_request(record), ticket=ticket)
+    
+    def save(content):
+        cover_letter = save_cover_letter(request.user, template, company_name, position, job_description, content)
+        complete_generation_request(record, cover_letter)
+        return reverse('cover_letter_view', args=[cover_letter.pk])
+    
+    # Free the slot and key if anything fails before the response takes over
+    try:
+        user_data = cover_letter_user_data(request.user, company_name, position, job_description)
+        generator = AIResumeGenerator(user=request.user)
+        chunks = generator.stream_cover_letter(user_data, force_refresh=force_refresh)
+        return _sse_response(_stream_generation(chunks, save, cleanup), cleanup=cleanup)
+    except BaseException:
+        cleanup()
+        raise
+
+
 @login_required
 def generate_cover_letter(request):
     """
@@ -526,47 +974,54 @@ def generate_cover_letter(request):
             position = form.cleaned_data['position']
             job_description = form.cleaned_data.get('job_description', '')
             template = request.POST.get('template', 'classic')
+            force_refresh = request.POST.get('force_refresh') == 'on'
+            
+            record, replay = claim_generation_request(request.user, get_idempotency_key(request), 'cover_letter')
+            if replay:
+                return _replay_generation_request(request, record)
+            
+            try:
+                ticket = _admit_generation(request)
+            except AdmissionRejected as e:
+                release_generation_request(record)
+                return _admission_rejected(request, e)
+            
+            if ticket is None:
+                job = enqueue_generation_job(request.user, 'cover_letter', template, {
+                    'company_name': company_name,
+                    'position': position,
+                    'job_description': job_description,
+                    'force_refresh': force_refresh,
+                })
+                complete_generation_request(record, job=job)
+                return redirect('generation_job_status', pk=job.pk)
             
             try:
                 # Initialize AI service with user
                 ai_generator = AIResumeGenerator(user=request.user)
                 
                 # Gather user data
-                user_data = {
-                    'name': request.user.get_full_name() or request.user.email,
-                    'email': request.user.email,
-                    'profile': {
-                        'summary': profile.summary or '',
-                        'skills': profile.get_skills_list() if hasattr(profile, 'get_skills_list') else [],
-                        'career_objective': profile.career_objective or '',
-                    },
-                    'education': list(Education.objects.filter(user=request.user).values()),
-                    'experience': list(Experience.objects.filter(user=request.user).values()),
-                    'projects': list(Project.objects.filter(user=request.user).values()),
-                    'company_name': company_name,
-                    'position': position,
-                    'job_description': job_description,
-                }
+                user_data = cover_letter_user_data(request.user, company_name, position, job_description)
                 
                 # Generate cover letter
-                cover_letter_content = ai_generator.generate_cover_letter(user_data)
+                cover_letter_content = ai_generator.generate_cover_letter(user_data, force_refresh=force_refresh)
                 
                 # Save to database
-                cover_letter = CoverLetter.objects.create(
-                    user=request.user,
-                    title=f"Cover Letter - {company_name} - {position}",
-                    company_name=company_name,
-                    position=position,
-                    job_description=job_description,
-                    content=cover_letter_content,
-                    template=template
+                cover_letter = save_cover_letter(
+                    request.user, template, company_name, position, job_description, cover_letter_content
                 )
+                complete_generation_request(record, cover_letter)
                 
+                if ai_generator.used_fallback:
+                    messages.warning(request, 'The AI service is unavailable right now, so a standard cover letter was built from your profile. Try again later for an AI-written version.')
                 messages.success(request, f'Cover letter generated successfully for {company_name}!')
                 return redirect('cover_letter_view', pk=cover_letter.pk)
                 
             except Exception as e:
+                release_generation_request(record)
                 messages.error(request, f'Error generating cover letter: {str(e)}')
+            finally:
+                ticket.release()
     else:
         form = CoverLetterForm()
     
@@ -576,6 +1031,7 @@ def generate_cover_letter(request):
         'education_count': Education.objects.filter(user=request.user).count(),
         'experience_count': Experience.objects.filter(user=request.user).count(),
         'project_count': Project.objects.filter(user=request.user).count(),
+        'idempotency_key': uuid.uuid4().hex,
     }
     
     return render(request, 'resume/generate_cover_letter.html', context)
@@ -610,60 +1066,34 @@ def cover_letter_view(request, pk):
 
 
 @login_required
+@require_http_methods(["GET", "POST"])
 def cover_letter_download_pdf(request, pk):
     """
     Download cover letter as PDF with template styling.
+    A POST queues a background render job instead (see pdf_job_status).
     """
-    from html import escape
-    import re
+    trace = PDFRenderTrace('cover_letter')
+    with trace.stage('queries'):
+        cover_letter = get_object_or_404(CoverLetter, pk=pk, user=request.user)
     
-    cover_letter = get_object_or_404(CoverLetter, pk=pk, user=request.user)
+    if request.method == 'POST':
+        return _queue_pdf_job(request, 'cover_letter', cover_letter)
     
-    # Get template from cover letter object or query parameter, default to classic
-    template = request.GET.get('template', cover_letter.template if hasattr(cover_letter, 'template') and cover_letter.template else 'classic')
-    
-    # Format the cover letter content - convert line breaks to paragraphs
-    content_paragraphs = []
-    for paragraph in cover_letter.content.split('\n\n'):
-        paragraph = paragraph.strip()
-        if paragraph:
-            # Replace single line breaks with <br> within paragraphs
-            paragraph = paragraph.replace('\n', '<br>')
-            # Handle bold text
-            paragraph = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', paragraph)
-            content_paragraphs.append(f'<p>{escape(paragraph)}</p>')
-    
-    formatted_content = ''.join(content_paragraphs)
-    
-    # Create HTML for PDF
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Cover Letter - {escape(cover_letter.company_name)}</title>
-    </head>
-    <body>
-        <div class="header">
-            <h1>{escape(request.user.get_full_name())}</h1>
-            <p class="contact-info">{escape(request.user.email)}</p>
-            <p class="date">{cover_letter.created_at.strftime('%B %d, %Y')}</p>
-        </div>
-        <div class="section">
-            <p><strong>{escape(cover_letter.company_name)}</strong><br>
-            <strong>Re: {escape(cover_letter.position)}</strong></p>
-        </div>
-        <div class="content">
-            {formatted_content}
-        </div>
-    </body>
-    </html>
-    """
+    # Template from query parameter, else the cover letter's own (default classic)
+    html_content, filename, template = build_pdf_document(
+        request.user,
+        'cover_letter',
+        cover_letter,
+        template=request.GET.get('template'),
+        trace=trace,
+    )
     
     return generate_pdf_from_html(
         html_content,
-        filename=f"cover_letter_{cover_letter.company_name}_{cover_letter.position}.pdf",
-        template=template
+        filename=filename,
+        template=template,
+        request=request,
+        trace=trace,
     )
 
 
@@ -686,6 +1116,205 @@ def cover_letter_delete(request, pk):
     return render(request, 'resume/cover_letter_confirm_delete.html', context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def export_documents_zip(request):
+    """
+    Download all of the user's resumes and cover letters as one ZIP archive.
+    The archive is streamed while documents are rendered.
+    """
+    response = StreamingHttpResponse(stream_documents_zip(request.user), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="documents_{request.user.username}.zip"'
+    return response
+
+
+# ==================== BACKGROUND GENERATION JOBS ====================
+
+@login_required
+@require_http_methods(["GET"])
+def generation_job_status(request, pk):
+    """
+    Status page for a queued AI generation. Refreshes itself while the job
+    is pending and redirects to the generated document once it is done.
+    """
+    job = get_object_or_404(GenerationJob, pk=pk, user=request.user)
+    result_url = get_job_result_url(job)
+    
+    if request.headers.get('Accept') == 'application/json':
+        return JsonResponse({
+            'id': job.pk,
+            'document_type': job.document_type,
+            'status': job.status,
+            'attempts': job.attempts,
+            'error': job.error if job.status == GenerationJob.STATUS_FAILED else '',
+            'result_url': result_url,
+        })
+    
+    if result_url:
+        messages.success(request, f'Your {job.get_document_type_display().lower()} is ready!')
+        return redirect(result_url)
+    
+    retry_url = reverse('generate_resume' if job.document_type == 'resume' else 'generate_cover_letter')
+    return render(request, 'resume/generation_job_status.html', {'job': job, 'retry_url': retry_url})
+
+
+@login_required
+@require_http_methods(["GET"])
+def generation_request_status(request, pk):
+    """
+    Status page for a resubmitted generate form whose first submission is
+    still generating inline. Refreshes itself and redirects to the document
+    once it is saved.
+    """
+    record = GenerationRequest.objects.filter(pk=pk, user=request.user).first()
+    result_url = get_request_result_url(record) if record is not None else None
+    failed = record is None or is_stale(record)
+    
+    if request.headers.get('Accept') == 'application/json':
+        status = 'done' if result_url else 'failed' if failed else 'pending'
+        response = JsonResponse({'status': status, 'result_url': result_url}, status=200 if result_url or failed else 202)
+        if status == 'pending':
+            response['Retry-After'] = '3'
+        return response
+    
+    if result_url:
+        return redirect(result_url)
+    if failed:
+        messages.warning(request, 'Your earlier submission did not finish. Please submit the form again.')
+        return redirect('dashboard')
+    
+    document_type = record.get_document_type_display()
+    response = render(request, 'resume/generation_request_status.html', {'document_type': document_type}, status=202)
+    response['Retry-After'] = '3'
+    return response
+
+
+# ==================== BACKGROUND PDF JOBS ====================
+
+def _pdf_job_payload(job):
+    """
+    Serialize a PDF render job for the status API.
+    """
+    payload = {
+        'id': job.pk,
+        'document_type': job.document_type,
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'status_url': reverse('pdf_job_status', args=[job.pk]),
+    }
+    if job.status == PDFRenderJob.STATUS_DONE:
+        payload['download_url'] = reverse('pdf_job_download', args=[job.pk])
+    if job.status == PDFRenderJob.STATUS_FAILED:
+        payload['error'] = job.error
+    return payload
+
+
+def _queue_pdf_job(request, document_type, obj=None):
+    """
+    Queue a PDF render for the current user and return its status as JSON.
+    
+    Without PDF_JOB_QUEUE_ENABLED no worker drains the queue, so the job is
+    rendered in this request and returned finished (200 instead of 202).
+    """
+    template = request.POST.get('template')
+    if template not in TEMPLATE_IDS:
+        template = None
+    
+    if getattr(settings, 'PDF_JOB_QUEUE_ENABLED', False):
+        job = enqueue_pdf_job(request.user, document_type, obj, template=template)
+        return JsonResponse(_pdf_job_payload(job), status=202)
+    
+    # A job still 'running' after a whole request timeout died with its request
+    requeue_stale_pdf_jobs(getattr(settings, 'GUNICORN_TIMEOUT', 120))
+    job = enqueue_pdf_job(request.user, document_type, obj, template=template)
+    if not claim_pdf_job(job):
+        # Being rendered by a concurrent request for the same document
+        return JsonResponse(_pdf_job_payload(job), status=202)
+    run_pdf_job(job)
+    return JsonResponse(_pdf_job_payload(job))
+
+
+@login_required
+@require_http_methods(["GET"])
+def pdf_job_status(request, pk):
+    """
+    Report the status of a queued PDF render (queued/running/done/failed).
+    """
+    job = get_object_or_404(PDFRenderJob, pk=pk, user=request.user)
+    return JsonResponse(_pdf_job_payload(job))
+
+
+@login_required
+@require_http_methods(["GET"])
+def pdf_job_download(request, pk):
+    """
+    Serve the file produced by a finished PDF render job.
+    """
+    job = get_object_or_404(PDFRenderJob, pk=pk, user=request.user, status=PDFRenderJob.STATUS_DONE)
+    
+    pdf_file = get_pdf_cache().open(job.cache_key)
+    if pdf_file is None:
+        # Evicted from the cache since the job finished; render it again
+        try:
+            obj = get_job_document(job)
+        except (GeneratedResume.DoesNotExist, CoverLetter.DoesNotExist):
+            return HttpResponse('This document no longer exists.', content_type='text/plain', status=410)
+        trace = PDFRenderTrace(job.document_type)
+        html_content, filename, template = build_pdf_document(
+            request.user, job.document_type, obj, template=job.template or None, trace=trace
+        )
+        return generate_pdf_from_html(
+            html_content, filename=filename, template=template, request=request, trace=trace
+        )
+    
+    return pdf_file_response(pdf_file, job.filename, etag=quote_etag(job.cache_key))
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """
+    Staff-only JSON snapshot of this process's metrics: PDF pipeline timing
+    histograms, PDF cache, render pool, stylesheet, OpenAI connection pool,
+    LLM response cache, coalesced-generation, circuit breaker, admission and
+    usage-recorder stats.
+    """
+    return JsonResponse({
+        'pdf_timings': metrics_registry.snapshot(),
+        'pdf_cache': get_pdf_cache().stats(),
+        'pdf_render_pool': get_pdf_render_pool().stats(),
+        'stylesheets': stylesheet_registry.stats(),
+        'openai_clients': openai_clients.stats(),
+        'llm_response_cache': llm_response_cache.stats(),
+        'llm_single_flight': llm_single_flight.stats(),
+        'openai_circuit_breaker': llm_circuit_breaker.stats(),
+        'llm_admission': llm_admission.stats(),
+        'llm_usage': usage_recorder.stats(),
+    })
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def llm_usage_view(request):
+    """
+    Staff-only JSON aggregates of recorded OpenAI calls (all processes).
+    
+    Query parameters: `group` (day, template, user, model or kind; default
+    day) and `days` (look-back window; default 30).
+    """
+    group = request.GET.get('group', 'day')
+    if group not in USAGE_GROUPS:
+        return JsonResponse({'error': f"group must be one of {', '.join(USAGE_GROUPS)}"}, status=400)
+    try:
+        days = max(1, int(request.GET.get('days', 30)))
+    except ValueError:
+        return JsonResponse({'error': 'days must be a number'}, status=400)
+    
+    # Include this process's buffered calls
+    usage_recorder.flush()
+    return JsonResponse({'group': group, 'days': days, 'rows': usage_summary(group, days=days)})
+
+
 @login_required
 def templates_gallery(request):
     """
@@ -0,0 +1,82 @@
+/**
+ * Streams AI generation output from a Server-Sent Events endpoint.
+ *
+ * The form is POSTed with fetch; 'token' events are appended to a preview
+ * element as they arrive and a 'done' event redirects to the saved document.
+ * Returns false when the browser cannot stream, so callers can fall back to
+ * a normal form submit.
+ */
+function streamGeneration(form, url, preview, onError) {
+    if (!window.fetch || !window.ReadableStream || !window.TextDecoder) {
+        return false;
+    }
+
+    preview.textContent = '';
+    preview.classList.remove('d-none');
+
+    fetch(url, {
+        method: 'POST',
+        body: new FormData(form),
+        credentials: 'same-origin',
+        headers: {'Accept': 'text/event-stream'},
+    }).then(function(response) {
+        if (!response.ok || !response.body) {
+            // Rejected requests (e.g. 429 when generating too often) carry a JSON message
+            return response.json().catch(function() {
+                return {};
+            }).then(function(payload) {
+                throw new Error(payload.error || 'Generation failed (' + response.status + ')');
+            });
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function handleEvent(block) {
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(function(line) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            if (!data) {
+                return;
+            }
+            const payload = JSON.parse(data);
+            if (event === 'token') {
+                preview.textContent += payload.text;
+                preview.scrollTop = preview.scrollHeight;
+            } else if (event === 'done') {
+                window.location.href = payload.url;
+            } else if (event === 'error') {
+                onError(payload.message);
+            }
+        }
+
+        function read() {
+            return reader.read().then(function(result) {
+                if (result.done) {
+                    return;
+                }
+                buffer += decoder.decode(result.value, {stream: true});
+                let boundary = buffer.indexOf('\n\n');
+                while (boundary !== -1) {
+                    handleEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    boundary = buffer.indexOf('\n\n');
+                }
+                return read();
+            });
+        }
+
+        return read();
+    }).catch(function(error) {
+        onError(error.message);
+    });
+
+    return true;
+}